@@ -1,2 +1,3 @@
-python3 src/main.py
-cd public && python3 -m http.server 8888
+trap "kill 0" EXIT
+python3 src/main.py --incremental --watch &
+cd docs && python3 -m http.server 8888
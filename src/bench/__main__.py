@@ -0,0 +1,97 @@
+import argparse
+import sys
+
+from bench.corpus import CorpusConfig, generate_site
+from bench.micro import run_micro
+from bench.site import run_site
+from bench.results import (
+    make_results,
+    save_results,
+    load_results,
+    compare_results,
+)
+
+
+def main():
+    args = parse_args(sys.argv[1:])
+    if args.command == "compare":
+        return compare(args)
+
+    config = CorpusConfig(
+        seed=args.seed,
+        size=args.size,
+        link_density=args.link_density,
+        image_density=args.image_density,
+        list_depth=args.list_depth,
+        code_share=args.code_share,
+    )
+    if args.command == "corpus":
+        paths = generate_site(args.dir, args.pages, config)
+        print(f"Wrote {len(paths)} pages to {args.dir}")
+        return 0
+
+    benchmarks = run_micro(config, args.repeat)
+    benchmarks["site"] = run_site(config, args.pages, args.jobs)
+    for name, result in benchmarks.items():
+        print(f"{name:24} {result['min'] * 1000:10.3f} ms  "
+              f"(median {result['median'] * 1000:.3f} ms)")
+
+    if args.output:
+        save_results(args.output, make_results(benchmarks, config))
+        print(f"Results written to {args.output}")
+    return 0
+
+
+def compare(args):
+    rows = compare_results(
+        load_results(args.base), load_results(args.head), args.threshold)
+    regressions = 0
+    for name, base, head, ratio, status in rows:
+        if ratio is None:
+            print(f"{name:24} {'':>10}    {head * 1000:10.3f} ms  {status}")
+            continue
+        print(f"{name:24} {base * 1000:10.3f} -> {head * 1000:10.3f} ms  "
+              f"{ratio:5.2f}x  {status}")
+        if status == "regression":
+            regressions += 1
+    return 1 if regressions else 0
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(
+        prog="bench", description="Benchmark the static site generator")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run = commands.add_parser("run", help="run every benchmark")
+    corpus = commands.add_parser("corpus", help="write a synthetic content tree")
+    corpus.add_argument("dir")
+    for command in (run, corpus):
+        command.add_argument("--seed", type=int, default=0)
+        command.add_argument(
+            "--size", type=int, default=64 * 1024,
+            help="characters per generated document")
+        command.add_argument("--link-density", type=float, default=0.05)
+        command.add_argument("--image-density", type=float, default=0.01)
+        command.add_argument(
+            "--list-depth", type=int, default=1,
+            help="above 1, some lists get indented items and parse as "
+                 "paragraphs",
+        )
+        command.add_argument("--code-share", type=float, default=0.1)
+        command.add_argument(
+            "--pages", type=int, default=200,
+            help="pages in the full site build")
+    run.add_argument("--jobs", type=int, default=1)
+    run.add_argument("--repeat", type=int, default=5)
+    run.add_argument("--output", "-o", help="write results as JSON")
+
+    compare = commands.add_parser(
+        "compare", help="compare two results files, exit 1 on regressions")
+    compare.add_argument("base")
+    compare.add_argument("head")
+    compare.add_argument("--threshold", type=float, default=0.1)
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,123 @@
+import os
+import random
+
+WORDS = (
+    "the ring of power was forged in the fires of mount doom by sauron "
+    "lord of mordor while elves dwarves and men kept their own rings "
+    "hobbits of the shire lived quiet lives far from the wars of the west"
+).split()
+
+
+class CorpusConfig:
+
+    def __init__(
+        self,
+        seed=0,
+        size=64 * 1024,
+        link_density=0.05,
+        image_density=0.01,
+        list_depth=1,
+        code_share=0.1,
+    ):
+        # size is in characters per document, densities are per word and
+        # code_share is the fraction of blocks that are code blocks. The
+        # block parser has no nested lists, so a list_depth above 1 indents
+        # some items and turns their whole list into a paragraph: it adds
+        # paragraph noise, not deeper lists
+        self.seed = seed
+        self.size = size
+        self.link_density = link_density
+        self.image_density = image_density
+        self.list_depth = list_depth
+        self.code_share = code_share
+
+    def to_dict(self):
+        return {
+            "seed": self.seed,
+            "size": self.size,
+            "link_density": self.link_density,
+            "image_density": self.image_density,
+            "list_depth": self.list_depth,
+            "code_share": self.code_share,
+        }
+
+
+def generate_markdown(config, rng=None):
+    if rng is None:
+        rng = random.Random(config.seed)
+
+    blocks = [f"# {sentence(rng, 3, 8).capitalize()}"]
+    size = len(blocks[0])
+    while size < config.size:
+        block = generate_block(config, rng)
+        blocks.append(block)
+        size += len(block) + 2
+    return "\n\n".join(blocks) + "\n"
+
+
+def generate_block(config, rng):
+    if rng.random() < config.code_share:
+        lines = [sentence(rng, 2, 10) for _ in range(rng.randint(2, 12))]
+        return "```\n" + "\n".join(lines) + "\n```"
+
+    kind = rng.random()
+    if kind < 0.1:
+        return "#" * rng.randint(2, 6) + " " + sentence(rng, 2, 8)
+    if kind < 0.2:
+        return "\n".join(
+            "> " + inline(config, rng, 4, 16) for _ in range(rng.randint(1, 4)))
+    if kind < 0.35:
+        return "\n".join(list_lines(config, rng, "- ", 0))
+    if kind < 0.45:
+        return "\n".join(
+            f"{i + 1}. " + inline(config, rng, 2, 10)
+            for i in range(rng.randint(2, 9)))
+    return "\n".join(inline(config, rng, 8, 24) for _ in range(rng.randint(1, 6)))
+
+
+def list_lines(config, rng, marker, depth):
+    lines = []
+    for _ in range(rng.randint(2, 6)):
+        lines.append("  " * depth + marker + inline(config, rng, 2, 10))
+        if depth + 1 < config.list_depth and rng.random() < 0.3:
+            lines.extend(list_lines(config, rng, marker, depth + 1))
+    return lines
+
+
+def inline(config, rng, low, high):
+    words = []
+    for _ in range(rng.randint(low, high)):
+        roll = rng.random()
+        if roll < config.link_density:
+            words.append(f"[{sentence(rng, 1, 3)}](https://example.com/{rng.choice(WORDS)})")
+        elif roll < config.link_density + config.image_density:
+            words.append(f"![{sentence(rng, 1, 3)}](/images/{rng.choice(WORDS)}.png)")
+        elif roll < 0.95:
+            words.append(rng.choice(WORDS))
+        elif roll < 0.97:
+            words.append(f"**{rng.choice(WORDS)}**")
+        elif roll < 0.99:
+            words.append(f"_{rng.choice(WORDS)}_")
+        else:
+            words.append(f"`{rng.choice(WORDS)}`")
+    return " ".join(words)
+
+
+def sentence(rng, low, high):
+    return " ".join(rng.choice(WORDS) for _ in range(rng.randint(low, high)))
+
+
+def generate_site(root, pages, config):
+    # writes pages markdown files under root/content, spread over nested
+    # sections, and returns their paths
+    rng = random.Random(config.seed)
+    paths = []
+    for i in range(pages):
+        section = os.path.join(
+            root, "content", f"section{i % 10}", f"group{i % 100}")
+        path = os.path.join(section, f"page{i}", "index.md")
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w") as file:
+            file.write(generate_markdown(config, rng))
+        paths.append(path)
+    return paths
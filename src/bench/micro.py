@@ -0,0 +1,80 @@
+import os
+import statistics
+import tempfile
+import timeit
+
+from block_markdown import (
+    BlockType,
+    markdown_to_blocks,
+    block_to_block_type,
+    markdown_to_html_node,
+)
+from inline_markdown import text_to_textnodes
+from bench.corpus import generate_markdown
+
+TEMPLATE = """<!doctype html>
+<html>
+
+<head>
+  <meta charset="utf-8" />
+  <title>{{ Title }}</title>
+  <link href="/index.css" rel="stylesheet" />
+</head>
+
+<body>
+  <article>{{ Content }}</article>
+</body>
+
+</html>
+"""
+
+
+def measure(func, repeat=5):
+    timer = timeit.Timer(func)
+    number, _ = timer.autorange()
+    times = [total / number for total in timer.repeat(repeat, number)]
+    return {
+        "min": min(times),
+        "median": statistics.median(times),
+        "repeat": repeat,
+        "number": number,
+    }
+
+
+def run_micro(config, repeat=5):
+    # every benchmark processes one whole generated document, so results are
+    # seconds per document of config.size characters
+    from main import render_page
+
+    markdown = generate_markdown(config)
+    blocks = markdown_to_blocks(markdown)
+    paragraphs = [
+        block for block in blocks
+        if block_to_block_type(block) != BlockType.CODE
+    ]
+    node = markdown_to_html_node(markdown)
+
+    results = {
+        "text_to_textnodes": measure(
+            lambda: [text_to_textnodes(block) for block in paragraphs], repeat),
+        "markdown_to_blocks": measure(
+            lambda: markdown_to_blocks(markdown), repeat),
+        "block_to_block_type": measure(
+            lambda: [block_to_block_type(block) for block in blocks], repeat),
+        "to_html": measure(node.to_html, repeat),
+    }
+
+    with tempfile.TemporaryDirectory() as tmp:
+        src_path = os.path.join(tmp, "index.md")
+        template_path = os.path.join(tmp, "template.html")
+        dest_path = os.path.join(tmp, "docs", "index.html")
+        with open(src_path, "w") as file:
+            file.write(markdown)
+        with open(template_path, "w") as file:
+            file.write(TEMPLATE)
+        results["generate_page"] = measure(
+            lambda: render_page(src_path, template_path, dest_path, "/"),
+            repeat,
+        )
+
+    return results
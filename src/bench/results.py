@@ -0,0 +1,62 @@
+import json
+import platform
+import subprocess
+
+RESULTS_VERSION = 1
+
+
+def make_results(benchmarks, config):
+    return {
+        "version": RESULTS_VERSION,
+        "commit": current_commit(),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "corpus": config.to_dict(),
+        "benchmarks": benchmarks,
+    }
+
+
+def current_commit():
+    try:
+        result = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return result.stdout.strip()
+
+
+def save_results(path, results):
+    with open(path, "w") as file:
+        json.dump(results, file, indent=2, sort_keys=True)
+
+
+def load_results(path):
+    with open(path, "r") as file:
+        results = json.load(file)
+    if results.get("version") != RESULTS_VERSION:
+        raise ValueError(f"invalid results file: {path}")
+    return results
+
+
+def compare_results(base, head, threshold=0.1):
+    # compares the min times, the least noisy statistic, and flags every
+    # benchmark that got more than threshold slower
+    rows = []
+    for name, head_result in sorted(head["benchmarks"].items()):
+        base_result = base["benchmarks"].get(name)
+        if base_result is None:
+            rows.append((name, None, head_result["min"], None, "new"))
+            continue
+
+        ratio = head_result["min"] / base_result["min"]
+        status = "ok"
+        if ratio > 1 + threshold:
+            status = "regression"
+        elif ratio < 1 - threshold:
+            status = "improvement"
+        rows.append((name, base_result["min"], head_result["min"], ratio, status))
+    return rows
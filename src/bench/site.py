@@ -0,0 +1,44 @@
+import contextlib
+import io
+import os
+import shutil
+import statistics
+import tempfile
+import time
+
+from bench.corpus import generate_site
+from bench.micro import TEMPLATE
+
+
+def run_site(config, pages=200, jobs=1, repeat=3):
+    # times a cold build of every page, from discovery to the last write
+    import main
+
+    with tempfile.TemporaryDirectory() as tmp:
+        generate_site(tmp, pages, config)
+        with open(os.path.join(tmp, "template.html"), "w") as file:
+            file.write(TEMPLATE)
+
+        cwd = os.getcwd()
+        os.chdir(tmp)
+        try:
+            times = []
+            for _ in range(repeat):
+                shutil.rmtree(main.dir_path_public, ignore_errors=True)
+                start = time.perf_counter()
+                with contextlib.redirect_stdout(io.StringIO()):
+                    found = main.find_pages(
+                        main.dir_path_content, main.dir_path_public)
+                    main.build_pages(found, main.templat_path, "/", jobs)
+                times.append(time.perf_counter() - start)
+        finally:
+            os.chdir(cwd)
+
+    return {
+        "min": min(times),
+        "median": statistics.median(times),
+        "repeat": repeat,
+        "number": 1,
+        "pages": pages,
+        "jobs": jobs,
+    }
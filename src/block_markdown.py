@@ -5,6 +5,9 @@ from inline_markdown import text_to_textnodes
 from textnode import TextNode, TextType, text_node_to_html_node
 
 
+HEADING_RE = re.compile(r"#{1,6} ")
+
+
 class BlockType(Enum):
     PARAGRAPH = "paragraph"
     HEADING = "heading"
@@ -15,92 +18,179 @@ class BlockType(Enum):
 
 
 def extract_title(markdown):
-    blocks = markdown_to_blocks(markdown)
-    for block in blocks:
-        block_type = block_to_block_type(block)
-        if block_type == BlockType.HEADING and block.count("#", 0, 8) == 1:
-            return block.lstrip("#").strip()
-    raise ValueError("no title")
+    title = find_title(markdown.split("\n"))
+    if title is None:
+        raise ValueError("no title")
+    return title
+
+
+def find_title(lines):
+    # stops at the first h1, so a title near the top of a huge document only
+    # costs reading its first few lines
+    for block_type, block_lines in scan_blocks(lines):
+        if block_type == BlockType.HEADING:
+            title = heading_title(block_lines)
+            if title is not None:
+                return title
+    return None
+
+
+def heading_title(lines):
+    block = "\n".join(lines)
+    if block.count("#", 0, 8) == 1:
+        return block.lstrip("#").strip()
+    return None
+
+
+def parse_markdown(markdown, on_text=None):
+    # one scan of the document gives both the html tree and the title, which
+    # is None when the document has no h1; on_text, when given, is called
+    # with the text nodes of every block as they are produced
+    title = None
+    parentNodes = []
+    for block_type, lines in scan_blocks(markdown.split("\n")):
+        if title is None and block_type == BlockType.HEADING:
+            title = heading_title(lines)
+        parentNodes.append(block_to_html_node(block_type, lines, on_text))
+
+    return ParentNode("div", parentNodes), title
 
 
 def markdown_to_html_node(markdown):
-    blocks = markdown_to_blocks(markdown)
-    parentNodes = []
-    for block in blocks:
-        parentNodes.append(create_html_node_for_block(block))
+    return parse_markdown(markdown)[0]
+
 
-    return ParentNode("div", parentNodes)
+def iter_markdown_html(lines, on_text=None, on_node=None):
+    # yields the same html as markdown_to_html_node(...).to_html(), but only
+    # ever holds one block in memory; on_node may adjust each block's tree
+    # before it is serialized
+    yield "<div>"
+    for block_type, block_lines in scan_blocks(lines):
+        node = block_to_html_node(block_type, block_lines, on_text)
+        if on_node is not None:
+            on_node(node)
+        yield from node.iter_html()
+    yield "</div>"
+
+
+def file_lines(file):
+    for line in file:
+        if line.endswith("\n"):
+            line = line[:-1]
+        yield line
 
 
 def create_html_node_for_block(block):
-    block_type = block_to_block_type(block)
+    return block_to_html_node(block_to_block_type(block), block.split("\n"))
+
+
+def block_to_html_node(block_type, lines, on_text=None):
     match(block_type):
         case BlockType.HEADING:
-            tag = f"h{block.count("#", 0, 8)}"
+            block = "\n".join(lines)
+            level = block.count("#", 0, 8)
             block = block.lstrip("# ")
-            return ParentNode(tag, text_to_children(block))
+            return ParentNode(f"h{level}", text_to_children(block, on_text))
         case BlockType.CODE:
-            block = block.lstrip("```\n").rstrip("```")
-            code_block = text_node_to_html_node(TextNode(block, TextType.TEXT))
+            block = "\n".join(lines).lstrip("```\n").rstrip("```")
+            text_node = TextNode(block, TextType.TEXT)
+            if on_text is not None:
+                on_text([text_node])
+            code_block = text_node_to_html_node(text_node)
             code_node = ParentNode("code", [code_block])
             return ParentNode("pre", [code_node])
         case BlockType.QUOTE:
-            lines = []
-            for line in block.split("\n"):
-                lines.append(line.lstrip(">").strip())
-            block = " ".join(lines)
-            return ParentNode("blockquote", text_to_children(block))
+            quote_lines = []
+            for line in lines:
+                quote_lines.append(line.lstrip(">").strip())
+            block = " ".join(quote_lines)
+            return ParentNode("blockquote", text_to_children(block, on_text))
         case BlockType.ULIST:
             list_items = []
-            for line in block.split("\n"):
+            for line in lines:
                 line = line.lstrip("- ")
-                list_items.append(ParentNode("li", text_to_children(line)))
+                list_items.append(ParentNode("li", text_to_children(line, on_text)))
             return ParentNode("ul", list_items)
         case BlockType.OLIST:
             list_items = []
-            for line in block.split("\n"):
+            for line in lines:
                 # TODO for now just remove the numbers. Rather use Reqex
                 line = line[3:]
-                list_items.append(ParentNode("li", text_to_children(line)))
+                list_items.append(ParentNode("li", text_to_children(line, on_text)))
             return ParentNode("ol", list_items)
         case BlockType.PARAGRAPH:
-            block = " ".join(block.split("\n"))
-            return ParentNode("p", text_to_children(block))
+            block = " ".join(lines)
+            return ParentNode("p", text_to_children(block, on_text))
         case _:
             raise ValueError("invalid block type")
 
 
-def text_to_children(text):
+def text_to_children(text, on_text=None):
     children = []
     text_nodes = text_to_textnodes(text)
+    if on_text is not None:
+        on_text(text_nodes)
     for text_node in text_nodes:
         children.append(text_node_to_html_node(text_node))
     return children
 
 
 def markdown_to_blocks(markdown):
-    blocks = markdown.split("\n\n")
-    return list(filter(None, map(str.strip, blocks)))
+    blocks = []
+    for _, lines in scan_blocks(markdown.split("\n")):
+        blocks.append("\n".join(lines))
+    return blocks
+
+
+def scan_blocks(lines):
+    # splits on empty lines and strips each block like
+    # markdown.split("\n\n") followed by str.strip would, but works line by
+    # line so every block is classified as soon as it is complete
+    block = []
+    for line in lines:
+        if line == "":
+            if block:
+                yield close_block(block)
+                block = []
+            continue
+
+        if block:
+            block.append(line)
+        elif not line.isspace():
+            block.append(line.lstrip())
+
+    if block:
+        yield close_block(block)
+
+
+def close_block(lines):
+    while lines[-1].isspace():
+        lines.pop()
+    lines[-1] = lines[-1].rstrip()
+    return lines_to_block_type(lines), lines
 
 
 def block_to_block_type(block):
-    if re.match(r"#{1,6} ", block):
+    return lines_to_block_type(block.split("\n"))
+
+
+def lines_to_block_type(lines):
+    if HEADING_RE.match(lines[0]):
         return BlockType.HEADING
 
-    if block[:3] == "```" and block[-3:] == "```":
+    if lines[0][:3] == "```" and lines[-1][-3:] == "```":
         return BlockType.CODE
 
-    lines = block.split("\n")
-    quote_lines = list(filter(lambda line: line[0] == ">", lines))
-    if len(lines) == len(quote_lines):
-        return BlockType.QUOTE
+    quote = ulist = olist = True
+    for line in lines:
+        quote = quote and line[0] == ">"
+        ulist = ulist and line[0:2] == "- "
+        olist = olist and line[0:1].isdecimal() and line[1:2] == "."
+        if not (quote or ulist or olist):
+            return BlockType.PARAGRAPH
 
-    ulist_lines = list(filter(lambda line: line[0:2] == "- ", lines))
-    if len(lines) == len(ulist_lines):
+    if quote:
+        return BlockType.QUOTE
+    if ulist:
         return BlockType.ULIST
-
-    olist_lines = list(filter(lambda line: re.match(r"^\d\.", line), lines))
-    if len(lines) == len(olist_lines):
-        return BlockType.OLIST
-
-    return BlockType.PARAGRAPH
+    return BlockType.OLIST
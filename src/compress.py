@@ -0,0 +1,138 @@
+import gzip
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSIBLE_EXTENSIONS = {
+    ".html", ".css", ".js", ".json", ".svg", ".xml", ".txt", ".map",
+}
+SIDECAR_EXTENSIONS = (".gz", ".br")
+
+
+def available_formats():
+    formats = ["gz"]
+    if brotli is not None:
+        formats.append("br")
+    return formats
+
+
+def remove_sidecars(path):
+    # called whenever path is replaced, so a server that prefers sidecars
+    # never serves one made from the old contents, also when the build that
+    # replaced it did not compress
+    if os.path.splitext(path)[1] not in COMPRESSIBLE_EXTENSIONS:
+        return
+    for ext in SIDECAR_EXTENSIONS:
+        try:
+            os.remove(path + ext)
+        except FileNotFoundError:
+            pass
+
+
+def compress_data(data, fmt):
+    if fmt == "gz":
+        # a fixed mtime keeps the output identical between builds
+        return gzip.compress(data, compresslevel=9, mtime=0)
+    if fmt == "br":
+        return brotli.compress(data, quality=11)
+    raise ValueError(f"invalid compression format {fmt}")
+
+
+def find_compressible(root):
+    paths = []
+    for dir_path, dir_names, file_names in os.walk(root):
+        dir_names.sort()
+        for file_name in sorted(file_names):
+            if os.path.splitext(file_name)[1] in COMPRESSIBLE_EXTENSIONS:
+                paths.append(os.path.join(dir_path, file_name))
+    return paths
+
+
+def compress_file(path, formats):
+    # a sidecar carries the mtime of the file it was made from, so it is up
+    # to date exactly when the two mtimes match
+    stat = os.stat(path)
+    data = None
+    results = []
+    for fmt in formats:
+        sidecar_path = f"{path}.{fmt}"
+        try:
+            sidecar_stat = os.stat(sidecar_path)
+            if sidecar_stat.st_mtime_ns == stat.st_mtime_ns:
+                results.append((fmt, stat.st_size, sidecar_stat.st_size, False))
+                continue
+        except FileNotFoundError:
+            pass
+
+        if data is None:
+            with open(path, "rb") as file:
+                data = file.read()
+        compressed = compress_data(data, fmt)
+
+        tmp_path = f"{sidecar_path}.tmp"
+        with open(tmp_path, "wb") as file:
+            file.write(compressed)
+        os.utime(tmp_path, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+        os.replace(tmp_path, sidecar_path)
+        results.append((fmt, len(data), len(compressed), True))
+    return results
+
+
+class CompressStats:
+
+    def __init__(self, formats):
+        self.formats = formats
+        self.files = 0
+        self.written = 0
+        self.skipped = 0
+        self.original = dict((fmt, 0) for fmt in formats)
+        self.compressed = dict((fmt, 0) for fmt in formats)
+        self.seconds = 0.0
+
+    def add(self, results):
+        self.files += 1
+        for fmt, original, compressed, written in results:
+            self.original[fmt] += original
+            self.compressed[fmt] += compressed
+            if written:
+                self.written += 1
+            else:
+                self.skipped += 1
+
+    def ratio(self, fmt):
+        if self.original[fmt] == 0:
+            return 1.0
+        return self.compressed[fmt] / self.original[fmt]
+
+    def summary(self):
+        lines = [
+            f"Compressed {self.files} files in {self.seconds * 1000:.1f} ms "
+            f"({self.written} sidecars written, {self.skipped} up to date)"
+        ]
+        for fmt in self.formats:
+            lines.append(
+                f" * .{fmt}: {self.original[fmt]} -> {self.compressed[fmt]} bytes "
+                f"({self.ratio(fmt):.1%})")
+        return "\n".join(lines)
+
+
+def compress_tree(root, formats=None, jobs=None):
+    if formats is None:
+        formats = available_formats()
+
+    start = time.perf_counter()
+    stats = CompressStats(formats)
+    paths = find_compressible(root)
+    # zlib and brotli release the GIL while compressing, so threads scale
+    with ThreadPoolExecutor(max_workers=jobs) as executor:
+        for results in executor.map(
+            compress_file, paths, [formats] * len(paths)
+        ):
+            stats.add(results)
+    stats.seconds = time.perf_counter() - start
+    return stats
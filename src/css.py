@@ -0,0 +1,209 @@
+import os
+import re
+from urllib.parse import urljoin
+
+COMMENT_RE = re.compile(r"/\*.*?\*/", re.DOTALL)
+WHITESPACE_RE = re.compile(r"\s+")
+PUNCTUATION_RE = re.compile(r"\s*([;:{},])\s*")
+# everything in a selector that is not a type selector or a combinator
+SELECTOR_NOISE_RE = re.compile(r"::?[\w-]+(?:\([^()]*\))?|\[[^\]]*\]|[.#][\w-]+")
+COMBINATOR_RE = re.compile(r"[\s>+~]+")
+# urls in url() and @import, with what comes before them
+CSS_URL_RE = re.compile(r"""(url\(\s*['"]?|@import\s*['"])([^'"()\s]+)""")
+# urls that do not depend on where the css is: absolute and root relative
+# ones, data: and other schemes, and fragments
+FIXED_URL_RE = re.compile(r"[a-zA-Z][\w+.-]*:|[/#]")
+NESTED_AT_RULES = ("@media", "@supports", "@layer", "@container")
+# every tag the markdown renderer can produce
+MARKDOWN_TAGS = frozenset([
+    "div", "p", "h1", "h2", "h3", "h4", "h5", "h6", "blockquote", "ul", "ol",
+    "li", "pre", "code", "b", "i", "a", "img",
+])
+
+_stylesheets = {}
+
+
+class Rule:
+    __slots__ = ("selectors", "selector_tags", "declarations")
+
+    def __init__(self, prelude, body):
+        self.selectors = [
+            WHITESPACE_RE.sub(" ", selector).strip()
+            for selector in split_selectors(prelude)
+        ]
+        self.selector_tags = [
+            selector_tags(selector) for selector in self.selectors]
+        self.declarations = compact(body).rstrip(";")
+
+    def render(self, tags):
+        selectors = [
+            selector
+            for selector, needed in zip(self.selectors, self.selector_tags)
+            if needed <= tags
+        ]
+        if not selectors:
+            return ""
+        return ",".join(selectors) + "{" + self.declarations + "}"
+
+
+class AtRule:
+    __slots__ = ("prelude", "rules")
+
+    def __init__(self, prelude, rules=None):
+        # rules is None for at-rules that are kept whole, like @font-face
+        self.prelude = prelude
+        self.rules = rules
+
+    def render(self, tags):
+        if self.rules is None:
+            return self.prelude
+        inner = "".join(rule.render(tags) for rule in self.rules)
+        if not inner:
+            return ""
+        return self.prelude + "{" + inner + "}"
+
+
+class Stylesheet:
+
+    def __init__(self, rules):
+        self.rules = rules
+        self.critical_by_tags = {}
+
+    def critical(self, tags, href=None):
+        # the rules that can apply to a page using only these tags; pages of
+        # the same kind use the same tags, so the result is kept per set.
+        # Relative urls are resolved against href, the url the stylesheet is
+        # served from, as they would be in the stylesheet itself rather than
+        # against the page the rules are inlined in
+        key = (frozenset(tags), href)
+        css = self.critical_by_tags.get(key)
+        if css is None:
+            css = "".join(rule.render(key[0]) for rule in self.rules)
+            if href is not None:
+                css = rebase_urls(css, href)
+            self.critical_by_tags[key] = css
+        return css
+
+
+def parse_stylesheet(text):
+    text = COMMENT_RE.sub("", text)
+    return Stylesheet(parse_rules(text, 0, len(text)))
+
+
+def parse_rules(text, start, end):
+    rules = []
+    position = start
+    while position < end:
+        brace = text.find("{", position, end)
+        semicolon = text.find(";", position, end)
+        if semicolon != -1 and (brace == -1 or semicolon < brace):
+            # statements like @import and @charset
+            statement = text[position:semicolon + 1].strip()
+            if statement.startswith("@"):
+                rules.append(AtRule(compact(statement)))
+            position = semicolon + 1
+            continue
+        if brace == -1:
+            break
+
+        close = matching_brace(text, brace, end)
+        prelude = text[position:brace].strip()
+        if prelude.startswith(NESTED_AT_RULES):
+            rules.append(AtRule(
+                compact(prelude), parse_rules(text, brace + 1, close)))
+        elif prelude.startswith("@"):
+            rules.append(AtRule(compact(text[position:close + 1])))
+        elif prelude:
+            rules.append(Rule(prelude, text[brace + 1:close]))
+        position = close + 1
+    return rules
+
+
+def matching_brace(text, open_index, end):
+    depth = 0
+    for index in range(open_index, end):
+        char = text[index]
+        if char == "{":
+            depth += 1
+        elif char == "}":
+            depth -= 1
+            if depth == 0:
+                return index
+    return end
+
+
+def split_selectors(prelude):
+    # splits on the commas between selectors, not those inside :is(a, b)
+    selectors = []
+    depth = 0
+    start = 0
+    for index, char in enumerate(prelude):
+        if char == "(":
+            depth += 1
+        elif char == ")":
+            depth -= 1
+        elif char == "," and depth == 0:
+            selectors.append(prelude[start:index])
+            start = index + 1
+    selectors.append(prelude[start:])
+    return [selector for selector in selectors if selector.strip()]
+
+
+def selector_tags(selector):
+    # the type selectors a page needs for the selector to possibly match;
+    # classes, ids, attributes and pseudo classes are assumed to match
+    tags = set()
+    for name in COMBINATOR_RE.split(SELECTOR_NOISE_RE.sub(" ", selector)):
+        if name and name != "*":
+            tags.add(name.lower())
+    return frozenset(tags)
+
+
+def rebase_urls(css, href):
+    def rebase(match):
+        url = match.group(2)
+        if FIXED_URL_RE.match(url):
+            return match.group(0)
+        return match.group(1) + urljoin(href, url)
+
+    return CSS_URL_RE.sub(rebase, css)
+
+
+def compact(css):
+    css = PUNCTUATION_RE.sub(r"\1", WHITESPACE_RE.sub(" ", css)).strip()
+    return css.replace(";}", "}")
+
+
+def load_stylesheet(path):
+    mtime = os.stat(path).st_mtime_ns
+    cached = _stylesheets.get(path)
+    if cached is not None and cached[0] == mtime:
+        return cached[1]
+
+    with open(path, "r", encoding="utf-8") as file:
+        stylesheet = parse_stylesheet(file.read())
+    _stylesheets[path] = (mtime, stylesheet)
+    return stylesheet
+
+
+def collect_tags(node, tags):
+    stack = [node]
+    while stack:
+        node = stack.pop()
+        if node.tag is not None:
+            tags.add(node.tag)
+        if node.children is not None:
+            stack.extend(node.children)
+    return tags
+
+
+def critical_stylesheet_html(css, href):
+    # the critical rules render the page right away while the full
+    # stylesheet loads without blocking; noscript keeps it for browsers
+    # without javascript
+    return (
+        f"<style>{css}</style>"
+        f'<link rel="preload" href="{href}" as="style" '
+        "onload=\"this.onload=null;this.rel='stylesheet'\" />"
+        f'<noscript><link href="{href}" rel="stylesheet" /></noscript>'
+    )
@@ -0,0 +1,93 @@
+import json
+import os
+import socket
+import socketserver
+import threading
+
+
+class RequestHandler(socketserver.StreamRequestHandler):
+
+    def handle(self):
+        # one json object per line each way; a connection can send any
+        # number of requests and gets a response to each in turn
+        for line in self.rfile:
+            if not line.strip():
+                continue
+            response = self.server.respond(line)
+            self.wfile.write(json.dumps(response).encode() + b"\n")
+            self.wfile.flush()
+            if self.server.stopping:
+                return
+
+
+class BuildServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, path, dispatch):
+        # dispatch(request) returns the response to a request; requests all
+        # share the caches and state of this process, so they are handled
+        # one at a time while other connections wait their turn
+        self.path = path
+        self.dispatch = dispatch
+        self.lock = threading.Lock()
+        self.stopping = False
+        dir_path = os.path.dirname(path)
+        if dir_path != "":
+            os.makedirs(dir_path, exist_ok=True)
+        remove_stale_socket(path)
+        super().__init__(path, RequestHandler)
+
+    def respond(self, line):
+        try:
+            request = json.loads(line)
+            if not isinstance(request, dict):
+                raise ValueError("a request must be a json object")
+            command = request.get("command", "build")
+            if command == "ping":
+                return {"ok": True}
+            if command == "stop":
+                self.stop()
+                return {"ok": True}
+            with self.lock:
+                response = self.dispatch(request)
+        except Exception as e:
+            return {"ok": False, "error": str(e)}
+        response["ok"] = True
+        return response
+
+    def stop(self):
+        # shutdown waits for serve_forever to return, so it cannot run on
+        # the thread of the request that asked for it
+        self.stopping = True
+        threading.Thread(target=self.shutdown).start()
+
+    def server_close(self):
+        super().server_close()
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+
+def remove_stale_socket(path):
+    # a socket file is left behind when a daemon is killed; it is only
+    # removed once nothing answers on it
+    if not os.path.exists(path):
+        return
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.connect(path)
+    except ConnectionRefusedError:
+        os.remove(path)
+        return
+    raise OSError(f"a daemon is already listening on {path}")
+
+
+def send_request(path, request, timeout=None):
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.settimeout(timeout)
+        sock.connect(path)
+        sock.sendall(json.dumps(request).encode() + b"\n")
+        with sock.makefile("rb") as file:
+            line = file.readline()
+    if not line:
+        raise ConnectionError("the daemon closed the connection")
+    return json.loads(line)
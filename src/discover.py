@@ -0,0 +1,95 @@
+import fnmatch
+import os
+
+
+class PathFilter:
+
+    def __init__(self, include=None, exclude=None):
+        # glob patterns over paths relative to the walked root, with / as
+        # the separator; a pattern without a / matches the last component
+        # only, like a .gitignore line. Excluded directories are not entered
+        # at all, and when include patterns are given a file has to match
+        # one of them
+        self.include = list(include or [])
+        self.exclude = list(exclude or [])
+
+    def __bool__(self):
+        return bool(self.include or self.exclude)
+
+    def excludes(self, relative, name):
+        return matches_any(self.exclude, relative, name)
+
+    def includes_file(self, relative, name):
+        if self.excludes(relative, name):
+            return False
+        return not self.include or matches_any(self.include, relative, name)
+
+    def allows(self, relative, is_file):
+        # the same decision walk_files makes for a path, checking each of
+        # the directories above it
+        parts = relative.split("/")
+        for index in range(1, len(parts) if is_file else len(parts) + 1):
+            if self.excludes("/".join(parts[:index]), parts[index - 1]):
+                return False
+        return not is_file or self.includes_file(relative, parts[-1])
+
+
+def matches_any(patterns, relative, name):
+    for pattern in patterns:
+        if fnmatch.fnmatchcase(relative if "/" in pattern else name, pattern):
+            return True
+    return False
+
+
+def walk_files(root, path_filter=None, base=None, follow_symlinks=True):
+    # yields (path, relative) for every file below root, with relative to
+    # root, in name order as directories are read: nothing is listed ahead
+    # of what the caller has consumed. scandir tells files from directories
+    # without a stat, so only directories are stat'ed, to tell a symlink
+    # back to one of their parents from a real directory. path_filter sees
+    # paths relative to base, which is root by default
+    filter_prefix = ""
+    if base is not None:
+        filter_prefix = os.path.relpath(root, base).replace(os.sep, "/") + "/"
+        if filter_prefix == "./":
+            filter_prefix = ""
+    stat = os.stat(root)
+    yield from walk_dir(
+        root, "", filter_prefix, path_filter or None, follow_symlinks,
+        {(stat.st_dev, stat.st_ino)})
+
+
+def walk_dir(dir_path, prefix, filter_prefix, path_filter, follow_symlinks,
+             parents):
+    with os.scandir(dir_path) as scan:
+        entries = sorted(scan, key=lambda entry: entry.name)
+
+    for entry in entries:
+        relative = prefix + entry.name
+        try:
+            is_dir = entry.is_dir(follow_symlinks=follow_symlinks)
+        except OSError:
+            continue
+        if not is_dir:
+            if not entry.is_file():
+                # broken symlinks, sockets and the like
+                continue
+            if path_filter is not None and not path_filter.includes_file(
+                    filter_prefix + relative, entry.name):
+                continue
+            yield entry.path, relative.replace("/", os.sep)
+            continue
+
+        if path_filter is not None and path_filter.excludes(
+                filter_prefix + relative, entry.name):
+            continue
+        stat = entry.stat()
+        key = (stat.st_dev, stat.st_ino)
+        if key in parents:
+            # a symlink to a directory above it would loop forever
+            continue
+        parents.add(key)
+        yield from walk_dir(
+            entry.path, relative + "/", filter_prefix, path_filter,
+            follow_symlinks, parents)
+        parents.remove(key)
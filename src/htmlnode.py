@@ -1,5 +1,8 @@
 
 class HTMLNode():
+    # slots instead of a per instance __dict__, a document has one node for
+    # every inline span so this dominates the memory of a parsed page
+    __slots__ = ("tag", "value", "children", "props")
 
     def __init__(self, tag=None, value=None, children=None, props=None):
         self.tag = tag
@@ -10,6 +13,12 @@ class HTMLNode():
     def to_html(self):
         raise NotImplementedError("to_html method not implemented")
 
+    def iter_html(self):
+        yield self.to_html()
+
+    def write_to(self, file):
+        file.writelines(self.iter_html())
+
     def props_to_html(self):
         if self.props is None:
             return ""
@@ -24,6 +33,7 @@ class HTMLNode():
 
 
 class LeafNode(HTMLNode):
+    __slots__ = ()
 
     def __init__(self, tag, value, props=None):
         super().__init__(tag, value, None, props)
@@ -42,21 +52,25 @@ class LeafNode(HTMLNode):
 
 
 class ParentNode(HTMLNode):
+    __slots__ = ()
 
     def __init__(self, tag, children, props=None):
         super().__init__(tag, None, children, props)
 
     def to_html(self):
+        return "".join(self.iter_html())
+
+    def iter_html(self):
         if self.tag is None:
             raise ValueError("invalid HTML: no tag")
 
         if self.children is None:
             raise ValueError("invalid HTML: no children")
 
-        children = ""
+        yield f"<{self.tag}{self.props_to_html()}>"
         for node in self.children:
-            children += node.to_html()
-        return f"<{self.tag}{self.props_to_html()}>{children}</{self.tag}>"
+            yield from node.iter_html()
+        yield f"</{self.tag}>"
 
     def __repr__(self):
         return f"ParentNode({self.tag}, {self.children}, {self.props})"
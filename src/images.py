@@ -0,0 +1,155 @@
+import hashlib
+import json
+import os
+import struct
+from urllib.parse import urljoin, urlsplit
+from output import write_if_changed
+
+IMAGES_VERSION = 1
+IMAGE_EXTENSIONS = {".png", ".jpg", ".jpeg", ".gif", ".webp"}
+# every start of frame marker carries the size, except DHT, JPG and DAC
+JPEG_SOF_MARKERS = set(range(0xC0, 0xD0)) - {0xC4, 0xC8, 0xCC}
+
+
+def probe_image(path):
+    # reads just enough of the header for the intrinsic size, the pixel data
+    # is never decoded; returns None for anything it does not recognize
+    with open(path, "rb") as file:
+        header = file.read(32)
+        if header[:8] == b"\x89PNG\r\n\x1a\n" and header[12:16] == b"IHDR":
+            return struct.unpack(">II", header[16:24])
+        if header[:6] in (b"GIF87a", b"GIF89a"):
+            return struct.unpack("<HH", header[6:10])
+        if header[:4] == b"RIFF" and header[8:12] == b"WEBP":
+            return probe_webp(header)
+        if header[:2] == b"\xff\xd8":
+            return probe_jpeg(file)
+    return None
+
+
+def probe_webp(header):
+    chunk = header[12:16]
+    if chunk == b"VP8 " and header[23:26] == b"\x9d\x01\x2a":
+        width, height = struct.unpack("<HH", header[26:30])
+        return width & 0x3FFF, height & 0x3FFF
+    if chunk == b"VP8L" and header[20:21] == b"\x2f" and len(header) >= 25:
+        bits = int.from_bytes(header[21:25], "little")
+        return (bits & 0x3FFF) + 1, ((bits >> 14) & 0x3FFF) + 1
+    if chunk == b"VP8X" and len(header) >= 30:
+        width = int.from_bytes(header[24:27], "little") + 1
+        height = int.from_bytes(header[27:30], "little") + 1
+        return width, height
+    return None
+
+
+def probe_jpeg(file):
+    # walks the marker segments, seeking over their payloads, until the
+    # first start of frame
+    file.seek(2)
+    while True:
+        if file.read(1) != b"\xff":
+            return None
+        code = file.read(1)
+        while code == b"\xff":
+            code = file.read(1)
+        if not code:
+            return None
+        code = code[0]
+        if code == 0x01 or 0xD0 <= code <= 0xD8:
+            continue
+
+        length = file.read(2)
+        if len(length) < 2:
+            return None
+        if code in JPEG_SOF_MARKERS:
+            frame = file.read(5)
+            if len(frame) < 5:
+                return None
+            _, height, width = struct.unpack(">BHH", frame)
+            return width, height
+        file.seek(struct.unpack(">H", length)[0] - 2, os.SEEK_CUR)
+
+
+class ImageCache:
+
+    def __init__(self, state=None):
+        # images maps a file path to [mtime_ns, file size, [width, height]],
+        # with None instead of the dimensions when probing failed
+        if state is None or state.get("version") != IMAGES_VERSION:
+            state = {"version": IMAGES_VERSION, "images": {}}
+        self.state = state
+        self.probed = 0
+
+    def probe(self, path):
+        stat = os.stat(path)
+        entry = self.state["images"].get(path)
+        if entry is not None and entry[:2] == [stat.st_mtime_ns, stat.st_size]:
+            return entry[2]
+
+        try:
+            size = probe_image(path)
+        except (OSError, struct.error):
+            size = None
+        if size is not None:
+            size = list(size)
+        self.probed += 1
+        self.state["images"][path] = [stat.st_mtime_ns, stat.st_size, size]
+        return size
+
+    def sizes(self, root, files):
+        # maps the site url of every image among files, which are relative
+        # to root, to its size; entries of files that are gone are dropped
+        sizes = {}
+        paths = set()
+        for relative in files:
+            if os.path.splitext(relative)[1].lower() not in IMAGE_EXTENSIONS:
+                continue
+            path = os.path.join(root, relative)
+            paths.add(path)
+            size = self.probe(path)
+            if size is not None:
+                sizes["/" + relative.replace(os.sep, "/")] = tuple(size)
+
+        for path in list(self.state["images"]):
+            if path not in paths:
+                del self.state["images"][path]
+        return sizes
+
+    def save(self, path):
+        write_if_changed(path, json.dumps(self.state, separators=(",", ":")))
+
+
+def load_image_cache(path):
+    try:
+        with open(path, "r") as file:
+            return ImageCache(json.load(file))
+    except (FileNotFoundError, json.JSONDecodeError):
+        return ImageCache()
+
+
+def sizes_hash(sizes):
+    data = json.dumps(sorted(sizes.items()), separators=(",", ":"))
+    return hashlib.sha256(data.encode()).hexdigest()
+
+
+def resolve_image_url(src, page_url):
+    # the site path an img src points at, or None for images on other hosts
+    url = urlsplit(urljoin(page_url, src))
+    if url.scheme or url.netloc:
+        return None
+    return url.path
+
+
+def annotate_images(node, sizes, page_url):
+    stack = [node]
+    while stack:
+        node = stack.pop()
+        if node.children is not None:
+            stack.extend(node.children)
+        elif node.tag == "img":
+            size = sizes.get(resolve_image_url(node.props["src"], page_url))
+            if size is not None:
+                node.props["width"] = str(size[0])
+                node.props["height"] = str(size[1])
+            node.props["loading"] = "lazy"
+            node.props["decoding"] = "async"
@@ -2,16 +2,76 @@ import re
 from textnode import TextNode, TextType
 
 
+IMAGE_RE = re.compile(r"!\[([^\[\]]*)\]\(([^\(\)]*)\)")
+LINK_RE = re.compile(r"(?<!!)\[([^\[\]]*)\]\(([^\(\)]*)\)")
+
+# delimiters in the order the split passes apply them: a pair of an earlier
+# delimiter wins over any later delimiter found between its markers
+DELIMITERS = (
+    ("**", TextType.BOLD),
+    ("_", TextType.ITALIC),
+    ("`", TextType.CODE),
+)
+
+
 def text_to_textnodes(text):
-    nodes = [TextNode(text, TextType.TEXT)]
-    nodes = split_nodes_delimiter(nodes, "**", TextType.BOLD)
-    nodes = split_nodes_delimiter(nodes, "_", TextType.ITALIC)
-    nodes = split_nodes_delimiter(nodes, "`", TextType.CODE)
-    nodes = split_nodes_image(nodes)
-    nodes = split_nodes_link(nodes)
+    nodes = []
+    scan_delimiters(text, 0, len(text), 0, nodes)
     return nodes
 
 
+def scan_delimiters(text, start, end, level, nodes):
+    # emits the same nodes as split_nodes_delimiter, split_nodes_image and
+    # split_nodes_link applied in turn, without building the intermediate
+    # lists: every level only scans the plain text ranges of the one above
+    if level == len(DELIMITERS):
+        scan_images(text, start, end, nodes)
+        return
+
+    delimiter, text_type = DELIMITERS[level]
+    inside = False
+    while True:
+        index = text.find(delimiter, start, end)
+        if index == -1:
+            break
+
+        if index > start:
+            if inside:
+                nodes.append(TextNode(text[start:index], text_type))
+            else:
+                scan_delimiters(text, start, index, level + 1, nodes)
+        inside = not inside
+        start = index + len(delimiter)
+
+    if inside:
+        raise ValueError("invalid markdown, format section not closed")
+
+    if end > start:
+        scan_delimiters(text, start, end, level + 1, nodes)
+
+
+def scan_images(text, start, end, nodes):
+    for match in IMAGE_RE.finditer(text, start, end):
+        if match.start() > start:
+            scan_links(text, start, match.start(), nodes)
+        nodes.append(TextNode(match.group(1), TextType.IMAGE, match.group(2)))
+        start = match.end()
+
+    if end > start:
+        scan_links(text, start, end, nodes)
+
+
+def scan_links(text, start, end, nodes):
+    for match in LINK_RE.finditer(text, start, end):
+        if match.start() > start:
+            nodes.append(TextNode(text[start:match.start()], TextType.TEXT))
+        nodes.append(TextNode(match.group(1), TextType.LINK, match.group(2)))
+        start = match.end()
+
+    if end > start:
+        nodes.append(TextNode(text[start:end], TextType.TEXT))
+
+
 def split_nodes_delimiter(old_nodes, delimiter, text_type):
     new_nodes = []
     for old_node in old_nodes:
@@ -104,10 +164,10 @@ def split_nodes_link(old_nodes):
 
 
 def extract_markdown_images(text):
-    matches = re.findall(r"!\[([^\[\]]*)\]\(([^\(\)]*)\)", text)
+    matches = IMAGE_RE.findall(text)
     return matches
 
 
 def extract_markdown_links(text):
-    matches = re.findall(r"(?<!!)\[([^\[\]]*)\]\(([^\(\)]*)\)", text)
+    matches = LINK_RE.findall(text)
     return matches
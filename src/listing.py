@@ -0,0 +1,116 @@
+import os
+import re
+from htmlnode import LeafNode, ParentNode
+
+POSTS_PER_PAGE = 10
+SLUG_RE = re.compile(r"[^a-z0-9]+")
+
+
+def slugify(text):
+    return SLUG_RE.sub("-", text.lower()).strip("-")
+
+
+def sort_posts(posts):
+    # newest first, with undated posts last, in path order
+    dated = sorted(
+        (post for post in posts if post["date"] is not None),
+        key=lambda post: (post["date"], post["url"]),
+        reverse=True,
+    )
+    undated = sorted(
+        (post for post in posts if post["date"] is None),
+        key=lambda post: post["url"],
+    )
+    return dated + undated
+
+
+def listing_pages(posts, title, url, dest_dir_path, per_page=POSTS_PER_PAGE):
+    # the list of every post under url, then one list per tag under
+    # url/tags/<tag>/, each split into pages of per_page posts; posts are
+    # dicts of url, title, date and tags, and each page comes back as
+    # (dest_path, title, node)
+    posts = sort_posts(posts)
+    pages = paginate(posts, title, url, dest_dir_path, url, per_page)
+
+    tags = {}
+    for post in posts:
+        for tag in post["tags"]:
+            slug = slugify(tag)
+            if slug:
+                tags.setdefault(slug, (tag, []))[1].append(post)
+    for slug, (tag, tagged) in sorted(tags.items()):
+        pages.extend(paginate(
+            tagged,
+            f"Posts tagged {tag}",
+            f"{url}tags/{slug}/",
+            os.path.join(dest_dir_path, "tags", slug),
+            url,
+            per_page,
+        ))
+    return pages
+
+
+def paginate(posts, title, url, dest_dir_path, section_url, per_page):
+    chunks = [
+        posts[start:start + per_page]
+        for start in range(0, len(posts), per_page)
+    ] or [[]]
+
+    pages = []
+    for number, chunk in enumerate(chunks, 1):
+        page_title = title if number == 1 else f"{title}, page {number}"
+        children = [
+            LeafNode("h1", page_title),
+            ParentNode("ul", [
+                post_item(post, section_url) for post in chunk
+            ]) if chunk else LeafNode("p", "Nothing here yet."),
+        ]
+
+        links = []
+        if number > 1:
+            links.append(LeafNode(
+                "a", "&lt; Newer", {"href": page_url(url, number - 1)}))
+        if number < len(chunks):
+            links.append(LeafNode(
+                "a", "Older &gt;", {"href": page_url(url, number + 1)}))
+        if links:
+            children.append(ParentNode("p", join_nodes(links, " ")))
+
+        dest_path = os.path.join(dest_dir_path, "index.html")
+        if number > 1:
+            dest_path = os.path.join(
+                dest_dir_path, "page", str(number), "index.html")
+        pages.append((dest_path, page_title, ParentNode("div", children)))
+    return pages
+
+
+def post_item(post, section_url):
+    children = [LeafNode("a", post["title"], {"href": post["url"]})]
+    if post["date"] is not None:
+        children.append(LeafNode(None, " "))
+        children.append(LeafNode(
+            "time", post["date"][:10], {"datetime": post["date"]}))
+    tag_links = [
+        LeafNode("a", tag, {"href": f"{section_url}tags/{slugify(tag)}/"})
+        for tag in post["tags"]
+        if slugify(tag)
+    ]
+    if tag_links:
+        children.append(LeafNode(None, " "))
+        children.extend(join_nodes(tag_links, ", "))
+    return ParentNode("li", children)
+
+
+def page_url(url, number):
+    if number == 1:
+        return url
+    return f"{url}page/{number}/"
+
+
+def join_nodes(nodes, separator):
+    joined = []
+    for node in nodes:
+        if joined:
+            joined.append(LeafNode(None, separator))
+        joined.append(node)
+    return joined
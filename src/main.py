@@ -1,83 +1,1180 @@
 import os
 import sys
 import shutil
+import time
+import argparse
+import contextlib
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+import block_markdown
 from block_markdown import (
-    markdown_to_html_node,
-    extract_title,
+    parse_markdown,
+    iter_markdown_html,
+    file_lines,
+)
+from profiling import event_totals, profiler
+from template import (
+    load_template,
+    find_layout,
+    rewrite_urls,
+    rewrite_fragments,
+)
+from sync import sync_tree, sync_file
+from output import AtomicWriter, write_if_changed
+from pipeline import Pipeline
+from search import SearchIndex, TermCollector, load_index, page_path
+from images import annotate_images, load_image_cache, sizes_hash
+from css import (
+    MARKDOWN_TAGS,
+    collect_tags,
+    critical_stylesheet_html,
+    load_stylesheet,
+)
+from parse_cache import ParseCache, read_markdown
+from render import HtmlRenderer, markdown_to_html
+from metadata import (
+    MetadataIndex,
+    load_metadata_index,
+    read_header,
+    split_front_matter,
+    split_front_matter_lines,
+)
+from listing import listing_pages
+from discover import PathFilter, walk_files
+from compress import compress_tree, SIDECAR_EXTENSIONS
+from watch import Changes, create_watcher
+from daemon import BuildServer
+from shard import (
+    load_shard_manifests,
+    merge_manifests,
+    parse_shard,
+    select_shard,
+    shard_manifest_path,
+)
+from manifest import (
+    hash_paths,
+    load_manifest,
+    save_manifest,
+    plan_build,
+    page_entry,
 )
 
 dir_path_static = "./static"
 dir_path_public = "./docs"
 dir_path_content = "./content"
+dir_path_build = "./.build"
+dir_path_layouts = "./layouts"
+dir_path_partials = "./partials"
 templat_path = "./template.html"
+manifest_path = os.path.join(dir_path_build, "manifest.json")
+# each shard of a sharded build keeps its own manifest here
+dir_path_shards = os.path.join(dir_path_build, "shards")
+
+# how pages are rendered, the same in the process that owns the build and
+# in its workers, which get it whole when they start:
+# - profile: whether render stages are timed
+# - stream_threshold: pages larger than this are rendered block by block
+#   straight into the output instead of being read and parsed whole
+# - search: whether the words of each page are collected for the index
+# - image_sizes: the width and height of every static image by site url,
+#   when images get their size and lazy loading attributes
+# - minify: whether insignificant whitespace is collapsed
+# - critical_css: whether pages inline the css their tags need and load the
+#   rest later
+# - parse_cache_dir, keep_parse_cache: where parsed pages are cached on disk
+#   and whether they are also kept in memory, as in the daemon
+RenderSettings = namedtuple("RenderSettings", [
+    "profile",
+    "stream_threshold",
+    "search",
+    "image_sizes",
+    "minify",
+    "critical_css",
+    "parse_cache_dir",
+    "keep_parse_cache",
+], defaults=[False, 8 * 1024 * 1024, False, None, False, False, None, False])
+settings = RenderSettings()
+
+# what rendering a page gives back; events are the profiler spans of a page
+# rendered in another process, to be added to the build's own
+PageResult = namedtuple("PageResult", [
+    "src_path", "template_path", "dest_path", "title", "terms", "events",
+], defaults=[None])
+
+search_index_path = os.path.join(dir_path_build, "search.json")
+dir_path_search = os.path.join(dir_path_public, "search")
+# the index itself, in the process that owns the build
+search_index = None
+
+# parsed pages by the hash of their markdown, so pages whose source did not
+# change are only templated again
+dir_path_parse_cache = os.path.join(dir_path_build, "parse")
+parse_cache = None
+
+# the front matter and title of every page, read from the top of each file
+# and kept while the file's size and mtime stay the same
+metadata_index_path = os.path.join(dir_path_build, "metadata.json")
+metadata_index = MetadataIndex()
+
+# which files under content are pages, from --include and --exclude
+content_filter = PathFilter()
+
+# with --listings the posts in here get list, tag and pagination pages
+dir_path_blog = os.path.join(dir_path_content, "blog")
+
+image_cache_path = os.path.join(dir_path_build, "images.json")
+# the probe cache behind settings.image_sizes
+image_cache = None
+
+# whether worker pools outlive the build that made them, as in the daemon,
+# and the pool kept with the settings it was made for
+keep_worker_pool = False
+kept_worker_pool = None
 
 
 def main():
+    if sys.argv[1:2] == ["merge"]:
+        merge_shards(sys.argv[2:])
+        return
+
+    args = parse_args(sys.argv[1:])
     basepath = "/"
-    if sys.argv[1]:
-        basepath = sys.argv[1]
+    if args.basepath:
+        basepath = args.basepath
 
-    print("Deleting public directory...")
-    if os.path.exists(dir_path_public):
-        shutil.rmtree(dir_path_public)
+    # the daemon keeps parsed pages in memory between builds, on top of
+    # .build/parse when that is on too
+    init_worker(RenderSettings(
+        profile=args.profile is not None,
+        stream_threshold=args.stream_threshold,
+        search=args.search,
+        minify=args.minify,
+        critical_css=args.critical_css,
+        parse_cache_dir=dir_path_parse_cache if args.parse_cache else None,
+        keep_parse_cache=args.daemon is not None,
+    ))
 
-    print("Copying static files to public directory...")
-    copy(dir_path_static, dir_path_public)
+    build_manifest_path = manifest_path
+    if args.shard is not None:
+        build_manifest_path = shard_manifest_path(dir_path_shards, *args.shard)
 
-    generate_pages_recursive(
-        dir_path_content, templat_path, dir_path_public, basepath)
+    global metadata_index, content_filter
+    metadata_index = load_metadata_index(metadata_index_path)
+    content_filter = PathFilter(args.include, args.exclude)
+    previous = load_manifest(build_manifest_path)
+    if args.clean:
+        print("Deleting public directory...")
+        if os.path.exists(dir_path_public):
+            shutil.rmtree(dir_path_public)
+        previous = None
 
+    global search_index
+    if args.search:
+        search_index = SearchIndex() if args.clean else load_index(
+            search_index_path)
 
-def copy(src, dst):
-    if not os.path.exists(dst):
-        os.mkdir(dst)
+    print("Syncing static files to public directory...")
+    static_files = sync_static(previous, args)
 
-    for path in os.listdir(src):
-        src_path = os.path.join(src, path)
-        dst_path = os.path.join(dst, path)
+    global image_cache
+    if args.image_sizes:
+        image_cache = load_image_cache(image_cache_path)
+        refresh_image_sizes(static_files)
 
-        print(f" * {src_path} -> {dst_path}")
-        if os.path.isfile(src_path):
-            shutil.copy(src_path, dst)
-        else:
-            copy(src_path, dst_path)
+    manifest, stale, pages = build_site(
+        previous, basepath, args, args.incremental)
+    if args.incremental:
+        print(f"Rebuilt {len(stale)} of {len(pages)} pages")
+
+    manifest["static"] = static_files
+    if previous is not None and "listings" in previous:
+        manifest["listings"] = previous["listings"]
+    build_listings(manifest, basepath, args)
+    save_metadata_index()
+    if args.shard is not None:
+        manifest["shard"] = list(args.shard)
+        manifest["filter"] = {
+            "include": content_filter.include,
+            "exclude": content_filter.exclude,
+        }
+    save_manifest(build_manifest_path, manifest)
+
+    # other shards may share the cache, and this one only knows its pages
+    if parse_cache is not None and args.shard is None:
+        parse_cache.prune(
+            set(entry["hash"] for entry in manifest["pages"].values()))
 
+    if search_index is not None:
+        write_search_index(
+            basepath, full=args.clean or not args.incremental)
 
-def generate_pages_recursive(dir_path_content, template_path, dest_dir_path, basepath):
-    for path in os.listdir(dir_path_content):
-        src_path = os.path.join(dir_path_content, path)
-        dst_path = os.path.join(dest_dir_path, path.replace(".md", ".html"))
+    if args.compress:
+        print(compress_tree(dir_path_public).summary())
 
-        if os.path.isfile(src_path):
-            generate_page(src_path, templat_path, dst_path, basepath)
+    if args.profile:
+        profiler.write_trace(args.profile)
+        print(profiler.summary())
+        print(f"Trace written to {args.profile}")
+
+    if args.watch:
+        watch(manifest, basepath, args)
+    elif args.daemon is not None:
+        serve(manifest, basepath, args)
+
+
+def build_site(previous, basepath, args, incremental):
+    # without --incremental every page is rendered again, but the previous
+    # manifest still tells which outputs belong to deleted sources
+    # pages go through the draft and shard filters and get hashed as the
+    # content tree is walked, so no full listing is made up front
+    found = set()
+    pages = (
+        page for page in iter_found_pages(found)
+        if not is_draft(page[0], args)
+    )
+    if args.shard is not None:
+        pages = select_shard(pages, dir_path_content, *args.shard)
+    template_hash = hash_paths(
+        [templat_path, dir_path_layouts, dir_path_partials])
+    if settings.minify:
+        template_hash += ":minify"
+    if settings.critical_css:
+        template_hash += ":critical:" + hash_paths(find_stylesheets())
+    if settings.image_sizes is not None:
+        # a page has to be rendered again when an image it shows changes
+        # size, and which page shows which image is not tracked
+        template_hash += ":" + sizes_hash(settings.image_sizes)
+    manifest, stale, removed = plan_build(
+        previous, pages, template_hash, basepath, not incremental)
+    metadata_index.prune(found)
+    pages = [
+        (src_path, entry["dest"])
+        for src_path, entry in manifest["pages"].items()
+    ]
+
+    for dest_path in removed:
+        print(f" * removing {dest_path}")
+        remove_output(dest_path, dir_path_public)
+        unindex_page(dest_path)
+
+    if search_index is not None:
+        # pages that were built before search was turned on are not in the
+        # index yet, so render them even when they did not change
+        stale_paths = set(stale)
+        for page in pages:
+            if page not in stale_paths and page_path(
+                    page[1], dir_path_public) not in search_index:
+                stale.append(page)
+
+    build_pages(stale, templat_path, basepath, args.jobs, args.pipeline)
+    return manifest, stale, pages
+
+
+def watch(manifest, basepath, args):
+    watcher = create_watcher([
+        dir_path_content,
+        dir_path_static,
+        templat_path,
+        dir_path_layouts,
+        dir_path_partials,
+    ])
+    print("Watching for changes...")
+    try:
+        while True:
+            changes = watcher.wait()
+            start = time.perf_counter()
+            try:
+                rebuild_changes(changes, manifest, basepath, args)
+                build_listings(manifest, basepath, args)
+                save_metadata_index()
+                if search_index is not None:
+                    write_search_index(basepath)
+                if args.compress:
+                    compress_tree(dir_path_public)
+            except Exception as e:
+                print(f"Build failed: {e}")
+                continue
+            print(f"Rebuilt in {(time.perf_counter() - start) * 1000:.1f} ms")
+    except KeyboardInterrupt:
+        pass
+    finally:
+        watcher.close()
+        save_manifest(manifest_path, manifest)
+
+
+def merge_shards(argv):
+    parser = argparse.ArgumentParser(
+        prog="main.py merge",
+        description="Check that shard builds cover the site and combine them",
+    )
+    parser.add_argument(
+        "--shards",
+        default=dir_path_shards,
+        metavar="DIR",
+        help="the directory holding every shard's manifest",
+    )
+    parser.add_argument(
+        "--drafts",
+        action="store_true",
+        help="expect the pages marked draft to be built, as the shards did",
+    )
+    args = parser.parse_args(argv)
+
+    try:
+        manifests = load_shard_manifests(args.shards)
+    except ValueError as e:
+        sys.exit(f"Merge failed: {e}")
+
+    # the pages the shards were asked to build, found the way build_site
+    # finds them, with the --include and --exclude the shards recorded
+    global metadata_index, content_filter
+    metadata_index = load_metadata_index(metadata_index_path)
+    if manifests:
+        content_filter = PathFilter(**manifests[0].get("filter", {}))
+    pages = [
+        page for page in find_pages(dir_path_content, dir_path_public)
+        if not is_draft(page[0], args)
+    ]
+    manifest, problems = merge_manifests(manifests, pages)
+    if manifest is not None:
+        for entry in manifest["pages"].values():
+            if not os.path.exists(entry["dest"]):
+                problems.append(f"{entry['dest']} is missing from the output")
+    if problems:
+        for problem in problems:
+            print(f" * {problem}")
+        sys.exit(f"Merge failed with {len(problems)} problems")
+
+    # the merged manifest lets the next unsharded build be incremental
+    save_manifest(manifest_path, manifest)
+    print(f"Merged {len(manifests)} shards covering {len(pages)} pages")
+
+
+def serve(manifest, basepath, args):
+    # every build runs in this process, so templates, stylesheets, image
+    # sizes and parsed pages stay loaded from one request to the next; the
+    # profiler times each page for the responses
+    global settings
+    if not profiler.enabled:
+        profiler.enable()
+    settings = settings._replace(profile=True)
+    profiler.take_events()
+
+    def dispatch(request):
+        command = request.get("command", "build")
+        if command != "build":
+            raise ValueError(f"unknown command: {command}")
+
+        start = time.perf_counter()
+        paths = request.get("paths")
+        if paths is None:
+            rebuild_all(manifest, basepath, args)
         else:
-            generate_pages_recursive(
-                src_path, templat_path, dst_path, basepath)
+            # a partial build is handled like the changes a watcher reports
+            changes = Changes(set(
+                os.path.normpath(os.path.relpath(path)) for path in paths))
+            rebuild_changes(changes, manifest, basepath, args)
+        build_listings(manifest, basepath, args)
+        save_metadata_index()
+        if search_index is not None:
+            write_search_index(basepath)
+        if args.compress:
+            compress_tree(dir_path_public)
+        save_manifest(manifest_path, manifest)
+
+        response = build_report(
+            profiler.take_events(), time.perf_counter() - start)
+        print(f"Built {len(response['pages'])} pages "
+              f"in {response['ms']:.1f} ms")
+        return response
+
+    global keep_worker_pool
+    keep_worker_pool = True
+    server = BuildServer(args.daemon, dispatch)
+    print(f"Listening on {args.daemon}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        close_worker_pool()
+        keep_worker_pool = False
+
+
+def rebuild_all(manifest, basepath, args):
+    manifest["static"] = sync_static(manifest, args)
+    if image_cache is not None:
+        refresh_image_sizes(manifest["static"])
+    rebuild_site(manifest, basepath, args)
+    if parse_cache is not None:
+        parse_cache.prune(
+            set(entry["hash"] for entry in manifest["pages"].values()))
+
+
+def build_report(events, elapsed):
+    stages, pages = event_totals(events)
+    return {
+        "ms": round(elapsed * 1000, 3),
+        "pages": [
+            {"path": page, "ms": round(total / 1e6, 3)}
+            for page, total in sorted(pages.items())
+        ],
+        "stages": {
+            name: {"ms": round(total / 1e6, 3), "calls": count}
+            for name, (total, count) in sorted(stages.items())
+        },
+    }
+
+
+def rebuild_changes(changes, manifest, basepath, args):
+    content_root = os.path.normpath(dir_path_content)
+    static_root = os.path.normpath(dir_path_static)
+    template_roots = [
+        os.path.normpath(path)
+        for path in (templat_path, dir_path_layouts, dir_path_partials)
+    ]
+
+    content_paths = []
+    static_paths = []
+    rebuild_all = content_root in changes.rescan
+    for path in sorted(changes.paths):
+        if is_under(path, content_root):
+            content_paths.append(path)
+        elif is_under(path, static_root):
+            static_paths.append(path)
+        elif any(is_under(path, root) for root in template_roots):
+            rebuild_all = True
+
+    if rebuild_all:
+        # a template change touches every page, while a moved directory
+        # cannot be followed file by file; both go through the manifest
+        rebuild_site(manifest, basepath, args)
+    else:
+        rebuilt_dirs = []
+        for path in content_paths:
+            if any(is_under(path, dir_path) for dir_path in rebuilt_dirs):
+                continue
+            if os.path.isdir(path):
+                rebuilt_dirs.append(path)
+            rebuild_content_path(path, content_root, manifest, basepath, args)
+
+    if static_root in changes.rescan:
+        manifest["static"] = sync_static(manifest, args)
+    else:
+        for path in static_paths:
+            sync_static_path(path, static_root, manifest, args)
+
+    if image_cache is not None and refresh_image_sizes(manifest["static"]):
+        rebuild_site(manifest, basepath, args)
+    elif settings.critical_css and any(
+            path.endswith(".css") for path in static_paths):
+        rebuild_site(manifest, basepath, args)
+
+
+def rebuild_site(manifest, basepath, args):
+    static_files = manifest.get("static", [])
+    listings = manifest.get("listings")
+    manifest_update, _, _ = build_site(manifest, basepath, args, True)
+    manifest.clear()
+    manifest.update(manifest_update)
+    manifest["static"] = static_files
+    if listings is not None:
+        manifest["listings"] = listings
+
+
+def is_draft(src_path, args):
+    if args.drafts:
+        return False
+    return metadata_index.get(src_path)["meta"].get("draft", False)
+
+
+def page_layout(src_path, template_path):
+    # a layout named in the front matter wins over the section's layout
+    layout = metadata_index.get(src_path)["meta"].get("layout")
+    if layout is None:
+        return find_layout(
+            src_path, dir_path_content, dir_path_layouts, template_path)
+
+    layout_path = os.path.join(dir_path_layouts, f"{layout}.html")
+    if not os.path.isfile(layout_path):
+        raise ValueError(f"{src_path}: layout {layout_path} does not exist")
+    return layout_path
+
+
+def save_metadata_index():
+    metadata_index.save(metadata_index_path)
+
+
+def build_listings(manifest, basepath, args):
+    # the blog's list, tag and pagination pages are made from the metadata
+    # index alone, so no post is read past its header for them; a sharded
+    # build leaves them to its first shard
+    listings = []
+    if (args.listings and os.path.isdir(dir_path_blog)
+            and (args.shard is None or args.shard[0] == 1)):
+        dest_dir_path = os.path.join(dir_path_public, "blog")
+        posts = []
+        dest_paths = set()
+        for src_path, dest_path in find_pages(dir_path_blog, dest_dir_path):
+            dest_paths.add(os.path.normpath(dest_path))
+            if is_draft(src_path, args):
+                continue
+            page = metadata_index.get(src_path)
+            posts.append({
+                "url": "/" + page_path(dest_path, dir_path_public),
+                "title": page["title"],
+                "date": page["meta"].get("date"),
+                "tags": page["meta"].get("tags", []),
+            })
+
+        template_path = find_layout(
+            os.path.join(dir_path_blog, "index.md"),
+            dir_path_content, dir_path_layouts, templat_path)
+        for dest_path, title, node in listing_pages(
+                posts, "Blog", "/blog/", dest_dir_path):
+            if os.path.normpath(dest_path) in dest_paths:
+                raise ValueError(
+                    f"{dest_path} is both a page and a generated listing")
+            if write_if_changed(dest_path, render_listing(
+                    node, title, template_path, basepath)):
+                print(f" * listing -> {dest_path}")
+            listings.append(dest_path)
+
+    for dest_path in manifest.get("listings", []):
+        if dest_path not in listings:
+            print(f" * removing {dest_path}")
+            remove_output(dest_path, dir_path_public)
+    manifest["listings"] = listings
+
+
+def render_listing(node, title, template_path, basepath):
+    template = load_template(
+        template_path, basepath, settings.minify, settings.critical_css)
+    tags = None
+    if template.stylesheet is not None:
+        tags = collect_tags(node, set())
+    values = template_values(template, title, node.iter_html(), tags, basepath)
+    values["Content"] = "".join(values["Content"])
+    return template.render(values)
+
+
+def find_stylesheets():
+    paths = []
+    for dir_path, dir_names, file_names in os.walk(dir_path_static):
+        dir_names.sort()
+        for file_name in sorted(file_names):
+            if file_name.endswith(".css"):
+                paths.append(os.path.join(dir_path, file_name))
+    return paths
+
+
+def refresh_image_sizes(static_files):
+    global settings
+    sizes = image_cache.sizes(dir_path_static, static_files)
+    image_cache.save(image_cache_path)
+    if sizes == settings.image_sizes:
+        return False
+    settings = settings._replace(image_sizes=sizes)
+    return True
+
+
+def rebuild_content_path(path, content_root, manifest, basepath, args):
+    relative = os.path.relpath(path, content_root)
+    src_path = os.path.join(dir_path_content, relative)
+    relative = relative.replace(os.sep, "/")
+    if (os.path.isfile(src_path) and content_filter.allows(relative, True)
+            and not is_draft(src_path, args)):
+        dest_path = os.path.join(
+            dir_path_public,
+            os.path.relpath(src_path, dir_path_content).replace(".md", ".html"),
+        )
+        build_pages([(src_path, dest_path)], templat_path, basepath)
+        manifest["pages"][src_path] = page_entry(src_path, dest_path)
+        return
+
+    if os.path.isdir(src_path) and content_filter.allows(relative, False):
+        dest_dir_path = os.path.join(
+            dir_path_public,
+            os.path.relpath(src_path, dir_path_content).replace(".md", ".html"),
+        )
+        pages = [
+            page for page in find_pages(src_path, dest_dir_path)
+            if not is_draft(page[0], args)
+        ]
+        build_pages(pages, templat_path, basepath, args.jobs, args.pipeline)
+        for page_src_path, page_dest_path in pages:
+            manifest["pages"][page_src_path] = page_entry(
+                page_src_path, page_dest_path)
+        return
+
+    # the path is gone, as a file or as a whole directory, or it became a
+    # draft or excluded
+    for page_src_path in list(manifest["pages"]):
+        if is_under(page_src_path, src_path):
+            entry = manifest["pages"].pop(page_src_path)
+            print(f" * removing {entry['dest']}")
+            remove_output(entry["dest"], dir_path_public)
+            unindex_page(entry["dest"])
+
+
+def sync_static_path(path, static_root, manifest, args):
+    relative = os.path.relpath(path, static_root)
+    src_path = os.path.join(dir_path_static, relative)
+    dst_path = os.path.join(dir_path_public, relative)
+    static_files = set(manifest.get("static", []))
+
+    if os.path.isdir(src_path):
+        manifest["static"] = sync_static(manifest, args)
+        return
+
+    if os.path.isfile(src_path):
+        if sync_file(src_path, dst_path, args.checksum, args.hardlink):
+            print(f" * {src_path} -> {dst_path}")
+        static_files.add(relative)
+    else:
+        for static_path in list(static_files):
+            if is_under(static_path, relative):
+                static_files.remove(static_path)
+                dst_path = os.path.join(dir_path_public, static_path)
+                print(f" * removing {dst_path}")
+                remove_output(dst_path, dir_path_public)
+    manifest["static"] = sorted(static_files)
+
+
+def is_under(path, root):
+    return path == root or path.startswith(root + os.sep)
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description="Generate the static site")
+    parser.add_argument("basepath", nargs="?", default="/")
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="only rebuild pages whose inputs changed since the last build",
+    )
+    parser.add_argument(
+        "--clean",
+        action="store_true",
+        help="delete the output directory before building",
+    )
+    parser.add_argument(
+        "--jobs",
+        "-j",
+        type=int,
+        default=1,
+        metavar="N",
+        help="render pages in N worker processes (0 uses every CPU core)",
+    )
+    parser.add_argument(
+        "--checksum",
+        action="store_true",
+        help="compare static files by content when their mtime differs",
+    )
+    parser.add_argument(
+        "--hardlink",
+        action="store_true",
+        help="hardlink static files into the output instead of copying",
+    )
+    parser.add_argument(
+        "--watch",
+        action="store_true",
+        help="keep running and rebuild whatever changes",
+    )
+    parser.add_argument(
+        "--include",
+        action="append",
+        metavar="GLOB",
+        help="only build content files matching GLOB (may be repeated)",
+    )
+    parser.add_argument(
+        "--exclude",
+        action="append",
+        metavar="GLOB",
+        help="skip content files and directories matching GLOB (may be repeated)",
+    )
+    parser.add_argument(
+        "--drafts",
+        action="store_true",
+        help="also build pages marked draft in their front matter",
+    )
+    parser.add_argument(
+        "--listings",
+        action="store_true",
+        help="generate list, tag and pagination pages for content/blog",
+    )
+    parser.add_argument(
+        "--shard",
+        type=parse_shard,
+        metavar="K/N",
+        help="build only shard K of N, then combine the shards with 'merge'",
+    )
+    parser.add_argument(
+        "--daemon",
+        nargs="?",
+        const=os.path.join(dir_path_build, "daemon.sock"),
+        metavar="SOCKET",
+        help="keep running and build on requests sent to a unix socket",
+    )
+    parser.add_argument(
+        "--profile",
+        nargs="?",
+        const=os.path.join(dir_path_build, "trace.json"),
+        metavar="PATH",
+        help="time every build stage per page and write a Chrome trace",
+    )
+    parser.add_argument(
+        "--stream-threshold",
+        type=int,
+        default=RenderSettings().stream_threshold,
+        metavar="BYTES",
+        help="stream pages larger than this instead of parsing them whole",
+    )
+    parser.add_argument(
+        "--compress",
+        action="store_true",
+        help="write .gz (and .br when brotli is installed) next to text outputs",
+    )
+    parser.add_argument(
+        "--search",
+        action="store_true",
+        help="build a sharded full-text search index into docs/search",
+    )
+    parser.add_argument(
+        "--image-sizes",
+        action="store_true",
+        help="give images their width and height and load them lazily",
+    )
+    parser.add_argument(
+        "--minify",
+        action="store_true",
+        help="collapse insignificant whitespace in pages, outside of <pre>",
+    )
+    parser.add_argument(
+        "--parse-cache",
+        action="store_true",
+        help="keep parsed pages in .build/parse and reuse them while unchanged",
+    )
+    parser.add_argument(
+        "--pipeline",
+        action="store_true",
+        help="overlap reading, rendering and writing pages with asyncio",
+    )
+    parser.add_argument(
+        "--critical-css",
+        action="store_true",
+        help="inline the css rules each page needs and load the stylesheet async",
+    )
+    args = parser.parse_args(argv)
+    if args.shard is not None and (
+            args.watch or args.daemon is not None or args.search):
+        # these need every page in one process
+        parser.error("--shard cannot be used with --watch, --daemon or --search")
+    return args
+
+
+def sync_static(previous, args):
+    previous_files = None
+    if previous is not None:
+        previous_files = previous.get("static", [])
+
+    files, copied, removed = sync_tree(
+        dir_path_static,
+        dir_path_public,
+        previous_files,
+        checksum=args.checksum,
+        link=args.hardlink,
+    )
+    for src_path, dst_path in copied:
+        print(f" * {src_path} -> {dst_path}")
+    for dst_path in removed:
+        print(f" * removing {dst_path}")
+        remove_output(dst_path, dir_path_public)
+    return files
+
+
+def find_pages(dir_path, dest_dir_path):
+    return list(iter_pages(dir_path, dest_dir_path))
+
+
+def iter_pages(dir_path, dest_dir_path):
+    # pages come out as the tree is read, so a caller can start on them
+    # before a huge tree has been listed; dir_path is the content directory
+    # or one below it, and the filter always sees paths relative to the
+    # content directory
+    for src_path, relative in walk_files(
+            dir_path, content_filter, dir_path_content):
+        yield src_path, os.path.join(
+            dest_dir_path, relative.replace(".md", ".html"))
+
+
+def iter_found_pages(found):
+    # every page of the site, drafts included, adding each source to found
+    for page in iter_pages(dir_path_content, dir_path_public):
+        found.add(page[0])
+        yield page
+
+
+def build_pages(pages, template_path, basepath, jobs=1, pipeline=False):
+    if jobs == 0:
+        jobs = os.cpu_count() or 1
+
+    template_paths = [
+        page_layout(src_path, template_path) for src_path, _ in pages
+    ]
+
+    if pipeline and pages:
+        build_pages_pipeline(pages, template_paths, basepath, jobs)
+        return
+
+    if jobs == 1 or len(pages) < 2:
+        for (src_path, dest_path), page_template_path in zip(pages, template_paths):
+            result = generate_page(
+                src_path, page_template_path, dest_path, basepath)
+            index_page(result)
+        return
+
+    # results come back in submission order, so the log stays deterministic
+    # no matter which worker finishes first
+    chunksize = max(1, len(pages) // (jobs * 4))
+    with worker_pool(jobs) as executor:
+        for result in executor.map(
+            render_page_in_worker,
+            [src_path for src_path, _ in pages],
+            template_paths,
+            [dest_path for _, dest_path in pages],
+            [basepath] * len(pages),
+            chunksize=chunksize,
+        ):
+            print(f" * {result.src_path} {result.template_path} -> "
+                  f"{result.dest_path}")
+            profiler.events.extend(result.events)
+            index_page(result)
+
+
+def build_pages_pipeline(pages, template_paths, basepath, jobs):
+    # reading, rendering and writing overlap, so the cpu keeps rendering
+    # while slow storage serves the next files; pages are logged as they
+    # are written, which is not always the order they were found in
+    results = {}
+
+    def on_done(result, changed):
+        print(f" * {result.src_path} {result.template_path} -> "
+              f"{result.dest_path}")
+        profiler.events.extend(result.events)
+        results[result.dest_path] = result._replace(events=None)
+
+    items = [
+        (src_path, page_template_path, dest_path, basepath)
+        for (src_path, dest_path), page_template_path in zip(pages, template_paths)
+    ]
+    if jobs == 1:
+        Pipeline(read_page, render_page_data, None, on_done).run(items)
+    else:
+        # one page waiting per process hides the time spent passing pages
+        # to and from the workers
+        with worker_pool(jobs) as executor:
+            Pipeline(read_page, render_page_data, executor, on_done).run(
+                items, jobs * 2)
+
+    # the search index numbers pages as they are added, so add them in
+    # their own order to get the same ids on every build
+    for _, dest_path in pages:
+        index_page(results[dest_path])
+
+
+def worker_pool(jobs):
+    if not keep_worker_pool:
+        return ProcessPoolExecutor(
+            max_workers=jobs, initializer=init_worker, initargs=(settings,))
+
+    # the daemon keeps its workers, and with them their templates and
+    # parsed pages, from one request to the next; they are only replaced
+    # when a setting they were started with changes, like image sizes
+    global kept_worker_pool
+    key = (jobs, settings)
+    if kept_worker_pool is None or kept_worker_pool[0] != key:
+        close_worker_pool()
+        kept_worker_pool = (key, ProcessPoolExecutor(
+            max_workers=jobs, initializer=init_worker, initargs=(settings,)))
+    return contextlib.nullcontext(kept_worker_pool[1])
+
+
+def close_worker_pool():
+    global kept_worker_pool
+    if kept_worker_pool is not None:
+        kept_worker_pool[1].shutdown()
+        kept_worker_pool = None
+
+
+def init_worker(render_settings):
+    global settings, parse_cache
+    settings = render_settings
+    parse_cache = None
+    if settings.parse_cache_dir is not None or settings.keep_parse_cache:
+        parse_cache = ParseCache(
+            settings.parse_cache_dir, keep=settings.keep_parse_cache)
+
+    if settings.profile and not profiler.enabled:
+        profiler.enable()
+        profiler.instrument(block_markdown, "text_to_textnodes")
+        # pages that need no tree skip text_to_textnodes; the renderer they
+        # go through is timed by its block scan and its inline parsing,
+        # and already writes html, so their to_html is only a join
+        profiler.instrument(HtmlRenderer, "scan_blocks")
+        profiler.instrument(HtmlRenderer, "render_inline")
+
+
+def index_page(result):
+    if search_index is not None and result.terms is not None:
+        search_index.update(
+            page_path(result.dest_path, dir_path_public), result.title,
+            result.terms)
+
+
+def unindex_page(dest_path):
+    if search_index is not None:
+        search_index.remove(page_path(dest_path, dir_path_public))
+
+
+def write_search_index(basepath, full=False):
+    search_index.write_shards(dir_path_search, basepath, full)
+    search_index.save(search_index_path)
+
+
+def remove_output(dest_path, root):
+    for path in [dest_path] + [dest_path + ext for ext in SIDECAR_EXTENSIONS]:
+        if os.path.exists(path):
+            os.remove(path)
+
+    # prune directories left empty by the removal, but never the root itself
+    dir_path = os.path.dirname(dest_path)
+    root = os.path.normpath(root)
+    while os.path.normpath(dir_path) != root and os.path.isdir(dir_path):
+        if os.listdir(dir_path):
+            break
+        os.rmdir(dir_path)
+        dir_path = os.path.dirname(dir_path)
 
 
 def generate_page(from_path, template_path, dest_path, basepath):
     print(f" * {from_path} {template_path} -> {dest_path}")
+    return render_page(from_path, template_path, dest_path, basepath)
+
+
+def render_page(from_path, template_path, dest_path, basepath):
+    if os.path.getsize(from_path) > settings.stream_threshold:
+        return stream_page(from_path, template_path, dest_path, basepath)
+
+    profiler.page = from_path
+    with profiler.span("generate_page"):
+        with profiler.span("read"):
+            markdown, digest = read_page_markdown(from_path)
+
+        template, values, title, terms = render_markdown(
+            markdown, template_path, dest_path, basepath, digest)
+
+        page = None
+        if profiler.enabled:
+            # the normal build streams serializing, templating and writing
+            # together; split them up here so each stage gets its own time
+            with profiler.span("to_html"):
+                values["Content"] = "".join(values["Content"])
+            with profiler.span("template"):
+                page = template.render(values)
+
+        with profiler.span("write"):
+            with AtomicWriter(dest_path) as file:
+                if page is None:
+                    template.write_to(file, values)
+                else:
+                    file.write(page)
+
+    return PageResult(from_path, template_path, dest_path, title, terms)
+
+
+def render_markdown(markdown, template_path, dest_path, basepath, digest=None):
+    # everything between reading a page and writing it: the template and
+    # the values to fill it with, where Content is a stream of fragments
+    with profiler.span("template"):
+        template = load_template(
+            template_path, basepath, settings.minify, settings.critical_css)
+    meta, markdown = split_front_matter(markdown)
+
+    # only --image-sizes changes the tree after parsing; without it pages go
+    # straight from markdown to html
+    need_tree = settings.image_sizes is not None
+    cached = None
+    if parse_cache is not None and digest is not None:
+        with profiler.span("parse_cache"):
+            cached = parse_cache.get(digest)
+        # an entry made without search has no terms to index, and one made
+        # by the fast renderer has no tree
+        if cached is not None and (
+                (cached.terms is None and settings.search)
+                or (cached.tree is None and need_tree)):
+            cached = None
+
+    if cached is not None:
+        node = cached.node() if need_tree else None
+        html, tags = cached.html, cached.tags
+        title, terms = cached.title, cached.terms
+    else:
+        node, html, tags, title, terms = parse_page(markdown, digest, need_tree)
+    title = meta.get("title", title)
+    if title is None:
+        raise ValueError("no title")
+
+    fragments = [html]
+    if node is not None:
+        annotate_page_images(node, dest_path)
+        fragments = node.iter_html()
+        if tags is None and template.stylesheet is not None:
+            tags = collect_tags(node, set())
+
+    values = template_values(template, title, fragments, tags, basepath)
+    return template, values, title, terms
+
+
+def template_values(template, title, fragments, tags, basepath):
+    values = {
+        "Title": rewrite_urls(title, basepath),
+        "Content": rewrite_fragments(fragments, basepath),
+    }
+    if template.stylesheet is not None:
+        with profiler.span("critical_css"):
+            add_stylesheet(values, template, template.tags | tags, basepath)
+    return values
+
+
+def parse_page(markdown, digest, need_tree):
+    node = html = tags = None
+    if need_tree:
+        collector = TermCollector() if settings.search else None
+        with profiler.span("markdown_to_html_node"):
+            node, title = parse_markdown(markdown, collector)
+        terms = collected_terms(collector)
+    else:
+        texts = [] if settings.search else None
+        tags = set()
+        with profiler.span("markdown_to_html"):
+            html, title = markdown_to_html(markdown, texts, tags)
+        terms = None
+        if texts is not None:
+            collector = TermCollector()
+            collector.add_texts(texts)
+            terms = collector.terms
+
+    if parse_cache is not None and digest is not None:
+        parse_cache.put(digest, node, title, terms, html, tags)
+    return node, html, tags, title, terms
+
+
+def read_page_markdown(from_path):
+    if parse_cache is None:
+        with open(from_path, "r", encoding="utf-8") as file:
+            return file.read(), None
+    return read_markdown(from_path)
+
+
+def read_page(page):
+    # pages that are streamed read their own input while rendering
+    from_path = page[0]
+    if os.path.getsize(from_path) > settings.stream_threshold:
+        return None
+    return read_page_markdown(from_path)
+
+
+def render_page_data(page, data):
+    from_path, template_path, dest_path, basepath = page
+    if data is None:
+        result = render_page(from_path, template_path, dest_path, basepath)
+        return dest_path, None, result._replace(events=profiler.take_events())
+
+    profiler.page = from_path
+    with profiler.span("generate_page"):
+        template, values, title, terms = render_markdown(
+            data[0], template_path, dest_path, basepath, data[1])
+        with profiler.span("to_html"):
+            values["Content"] = "".join(values["Content"])
+        with profiler.span("template"):
+            page = template.render(values).encode()
+
+    result = PageResult(
+        from_path, template_path, dest_path, title, terms,
+        profiler.take_events())
+    return dest_path, page, result
+
+
+def stream_page(from_path, template_path, dest_path, basepath):
+    profiler.page = from_path
+    with profiler.span("generate_page"):
+        template = load_template(
+            template_path, basepath, settings.minify, settings.critical_css)
+
+        # the title goes into the template before the content, so look for
+        # it first; it is normally within the first few lines
+        _, title = read_header(from_path)
+        if title is None:
+            raise ValueError("no title")
+
+        collector = TermCollector() if settings.search else None
+        on_node = None
+        if settings.image_sizes is not None:
+            def on_node(node):
+                annotate_page_images(node, dest_path)
+
+        with (open(from_path, "r", encoding="utf-8") as src,
+              AtomicWriter(dest_path) as dest):
+            values = {
+                "Title": rewrite_urls(title, basepath),
+                "Content": rewrite_fragments(
+                    iter_markdown_html(
+                        split_front_matter_lines(file_lines(src))[1],
+                        collector, on_node),
+                    basepath),
+            }
+            if template.stylesheet is not None:
+                # the head is written before the body is parsed, so assume
+                # the page uses everything markdown can produce
+                add_stylesheet(
+                    values, template, template.tags | MARKDOWN_TAGS, basepath)
+            template.write_to(dest, values)
+
+    return PageResult(
+        from_path, template_path, dest_path, title, collected_terms(collector))
+
+
+def add_stylesheet(values, template, tags, basepath):
+    path = os.path.join(dir_path_static, template.stylesheet.lstrip("/"))
+    if not os.path.isfile(path):
+        return
+    # the stylesheet's own url, basepath included, since rewrite_urls leaves
+    # the urls inside the css alone
+    href = basepath + template.stylesheet.lstrip("/")
+    css = load_stylesheet(path).critical(tags, href)
+    values["Stylesheet"] = rewrite_urls(
+        critical_stylesheet_html(css, template.stylesheet), basepath)
 
-    with open(from_path, "r") as file:
-        markdown = file.read()
 
-    with open(template_path, "r") as file:
-        template = file.read()
+def annotate_page_images(node, dest_path):
+    # image urls are resolved against the page's own url, before the
+    # basepath is added to them
+    page_url = "/" + page_path(dest_path, dir_path_public)
+    annotate_images(node, settings.image_sizes, page_url)
 
-    content = markdown_to_html_node(markdown).to_html()
-    title = extract_title(markdown)
 
-    template = template.replace("{{ Title }}", title)
-    template = template.replace("{{ Content }}", content)
-    template = template.replace('href="/', f'href="{basepath}')
-    template = template.replace('src="/', f'src="{basepath}')
+def collected_terms(collector):
+    if collector is None:
+        return None
+    return collector.terms
 
-    dest_dir_path = os.path.dirname(dest_path)
-    if dest_dir_path != "":
-        os.makedirs(dest_dir_path, exist_ok=True)
 
-    with open(dest_path, "w") as file:
-        file.write(template)
+def render_page_in_worker(from_path, template_path, dest_path, basepath):
+    result = render_page(from_path, template_path, dest_path, basepath)
+    return result._replace(events=profiler.take_events())
 
 
-main()
+if __name__ == "__main__":
+    main()
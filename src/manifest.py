@@ -0,0 +1,120 @@
+import hashlib
+import json
+import os
+
+MANIFEST_VERSION = 1
+
+
+def hash_file(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as file:
+        for chunk in iter(lambda: file.read(1 << 16), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def hash_paths(paths):
+    # a combined hash over files and every file below directories, so adding,
+    # removing or editing any of them changes the result
+    digest = hashlib.sha256()
+    for path in paths:
+        if os.path.isdir(path):
+            for dir_path, dir_names, file_names in os.walk(path):
+                dir_names.sort()
+                for file_name in sorted(file_names):
+                    file_path = os.path.join(dir_path, file_name)
+                    digest.update(file_path.encode())
+                    digest.update(hash_file(file_path).encode())
+        elif os.path.isfile(path):
+            digest.update(path.encode())
+            digest.update(hash_file(path).encode())
+    return digest.hexdigest()
+
+
+def new_manifest(template_hash, basepath):
+    return {
+        "version": MANIFEST_VERSION,
+        "template": template_hash,
+        "basepath": basepath,
+        "pages": {},
+    }
+
+
+def load_manifest(path):
+    try:
+        with open(path, "r") as file:
+            manifest = json.load(file)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+
+    if manifest.get("version") != MANIFEST_VERSION:
+        return None
+    return manifest
+
+
+def save_manifest(path, manifest):
+    dir_path = os.path.dirname(path)
+    if dir_path != "":
+        os.makedirs(dir_path, exist_ok=True)
+
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as file:
+        json.dump(manifest, file, indent=1, sort_keys=True)
+    os.replace(tmp_path, path)
+
+
+def page_entry(src_path, dest_path, previous=None):
+    # an unchanged size and mtime means the file was not touched, so the old
+    # hash can be reused without reading the file again
+    stat = os.stat(src_path)
+    if (
+        previous is not None
+        and previous["size"] == stat.st_size
+        and previous["mtime"] == stat.st_mtime_ns
+    ):
+        content_hash = previous["hash"]
+    else:
+        content_hash = hash_file(src_path)
+
+    return {
+        "hash": content_hash,
+        "dest": dest_path,
+        "size": stat.st_size,
+        "mtime": stat.st_mtime_ns,
+    }
+
+
+def plan_build(previous, pages, template_hash, basepath, rebuild_all=False):
+    # pages is read once, in order, so it can be the discovery itself: each
+    # page is hashed as soon as it is found
+    manifest = new_manifest(template_hash, basepath)
+    rebuild_all = (
+        rebuild_all
+        or previous is None
+        or previous["template"] != template_hash
+        or previous["basepath"] != basepath
+    )
+    previous_pages = {} if previous is None else previous["pages"]
+
+    stale = []
+    for src_path, dest_path in pages:
+        old = previous_pages.get(src_path)
+        entry = page_entry(src_path, dest_path, old)
+        manifest["pages"][src_path] = entry
+
+        if (
+            rebuild_all
+            or old is None
+            or old["hash"] != entry["hash"]
+            or old["dest"] != dest_path
+            or not os.path.exists(dest_path)
+        ):
+            stale.append((src_path, dest_path))
+
+    dest_paths = set(entry["dest"] for entry in manifest["pages"].values())
+    removed = []
+    for src_path, old in previous_pages.items():
+        if src_path not in manifest["pages"] and old["dest"] not in dest_paths:
+            removed.append(old["dest"])
+
+    return manifest, stale, removed
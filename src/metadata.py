@@ -0,0 +1,163 @@
+import itertools
+import json
+import os
+import re
+from datetime import datetime
+from block_markdown import file_lines, find_title
+from output import write_if_changed
+
+METADATA_VERSION = 1
+FENCE = "---"
+LAYOUT_RE = re.compile(r"^[\w-]+$")
+TRUE_VALUES = ("true", "yes", "on")
+FALSE_VALUES = ("false", "no", "off")
+
+
+def split_front_matter(markdown):
+    # front matter is a block of "key: value" lines between two --- lines at
+    # the very top of a page; pages without one come back unchanged
+    first_end = markdown.find("\n")
+    first = markdown if first_end == -1 else markdown[:first_end]
+    if first.rstrip() != FENCE:
+        return {}, markdown
+
+    if first_end == -1:
+        raise ValueError("front matter is not closed")
+    start = position = first_end + 1
+    while True:
+        end = markdown.find("\n", position)
+        line = markdown[position:] if end == -1 else markdown[position:end]
+        if line.rstrip() == FENCE:
+            meta = parse_front_matter(markdown[start:position].splitlines())
+            return meta, "" if end == -1 else markdown[end + 1:]
+        if end == -1:
+            raise ValueError("front matter is not closed")
+        position = end + 1
+
+
+def split_front_matter_lines(lines):
+    # the same over an iterator of lines, which is read only up to the end
+    # of the front matter; returns the metadata and the remaining lines
+    lines = iter(lines)
+    first = next(lines, None)
+    if first is None:
+        return {}, lines
+    if first.rstrip() != FENCE:
+        return {}, itertools.chain([first], lines)
+
+    header = []
+    for line in lines:
+        if line.rstrip() == FENCE:
+            return parse_front_matter(header), lines
+        header.append(line)
+    raise ValueError("front matter is not closed")
+
+
+def parse_front_matter(lines):
+    meta = {}
+    for number, line in enumerate(lines, 1):
+        if not line.strip() or line.lstrip().startswith("#"):
+            continue
+        key, separator, value = line.partition(":")
+        if not separator:
+            raise ValueError(f"front matter line {number} is not 'key: value'")
+        key = key.strip().lower()
+        meta[key] = parse_value(key, value.strip())
+    return meta
+
+
+def parse_value(key, value):
+    match key:
+        case "date":
+            try:
+                return datetime.fromisoformat(unquote(value)).isoformat()
+            except ValueError:
+                raise ValueError(f"invalid date in front matter: {value!r}")
+        case "tags":
+            if value.startswith("[") and value.endswith("]"):
+                value = value[1:-1]
+            tags = [unquote(tag.strip()) for tag in value.split(",")]
+            return [tag for tag in tags if tag]
+        case "draft":
+            if value.lower() in TRUE_VALUES:
+                return True
+            if value.lower() in FALSE_VALUES:
+                return False
+            raise ValueError(f"invalid draft in front matter: {value!r}")
+        case "layout":
+            value = unquote(value)
+            if not LAYOUT_RE.match(value):
+                raise ValueError(f"invalid layout in front matter: {value!r}")
+            return value
+        case _:
+            return unquote(value)
+
+
+def unquote(value):
+    if len(value) >= 2 and value[0] == value[-1] and value[0] in "\"'":
+        return value[1:-1]
+    return value
+
+
+def read_header(path):
+    # the front matter and the title, reading no further than the first h1
+    # (or just the front matter when it has a title), so the body of a long
+    # page is never read
+    with open(path, "r", encoding="utf-8") as file:
+        meta, lines = split_front_matter_lines(file_lines(file))
+        title = meta.get("title")
+        if title is None:
+            title = find_title(lines)
+    return meta, title
+
+
+class MetadataIndex:
+
+    def __init__(self, state=None):
+        # pages maps a source path to its size, mtime, title and front
+        # matter; entries are read again when the size or mtime changes
+        if state is None or state.get("version") != METADATA_VERSION:
+            state = {"version": METADATA_VERSION, "pages": {}}
+        self.state = state
+        self.scanned = 0
+
+    def get(self, src_path):
+        stat = os.stat(src_path)
+        entry = self.state["pages"].get(src_path)
+        if (
+            entry is not None
+            and entry["size"] == stat.st_size
+            and entry["mtime"] == stat.st_mtime_ns
+        ):
+            return entry
+
+        try:
+            meta, title = read_header(src_path)
+        except ValueError as e:
+            raise ValueError(f"{src_path}: {e}")
+        entry = {
+            "size": stat.st_size,
+            "mtime": stat.st_mtime_ns,
+            "title": title,
+            "meta": meta,
+        }
+        self.scanned += 1
+        self.state["pages"][src_path] = entry
+        return entry
+
+    def prune(self, src_paths):
+        pages = self.state["pages"]
+        for src_path in list(pages):
+            if src_path not in src_paths:
+                del pages[src_path]
+
+    def save(self, path):
+        write_if_changed(path, json.dumps(self.state, separators=(",", ":")))
+
+
+def load_metadata_index(path):
+    try:
+        with open(path, "r") as file:
+            return MetadataIndex(json.load(file))
+    except (FileNotFoundError, json.JSONDecodeError):
+        return MetadataIndex()
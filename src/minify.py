@@ -0,0 +1,89 @@
+import re
+
+# whitespace that changes when collapsed: runs of two or more, or a single
+# character other than a space
+WHITESPACE_RE = re.compile(r"[ \t\n\r\f]{2,}|[\t\n\r\f]")
+# a line break between two tags, with the names of both; comments and
+# doctypes have no name
+BETWEEN_TAGS_RE = re.compile(
+    r"(<(?:/?([a-zA-Z][\w-]*)|!)[^<>]*>)[ \t\r\f]*\n[ \t\n\r\f]*"
+    r"(?=<(?:/?([a-zA-Z][\w-]*)|!))")
+# elements that break the line, so whitespace next to them is not rendered
+BLOCK_TAGS = {
+    "address", "article", "aside", "base", "blockquote", "body", "br",
+    "caption", "col", "colgroup", "dd", "details", "div", "dl", "dt",
+    "fieldset", "figcaption", "figure", "footer", "form", "h1", "h2", "h3",
+    "h4", "h5", "h6", "head", "header", "hr", "html", "li", "link", "main",
+    "meta", "nav", "noscript", "ol", "option", "p", "pre", "script",
+    "section", "source", "style", "summary", "table", "tbody", "td",
+    "template", "tfoot", "th", "thead", "title", "tr", "ul",
+}
+# elements whose contents are rendered or run as written
+RAW_TAG_RE = re.compile(r"<(/?)(pre|textarea|script|style)\b[^>]*>", re.IGNORECASE)
+
+
+class Minifier:
+
+    def __init__(self):
+        # the number of raw elements the text fed so far is inside of
+        self.raw_depth = 0
+
+    def feed(self, text):
+        if "<" not in text:
+            if self.raw_depth:
+                return text
+            return collapse_whitespace(text)
+
+        # runs outside of raw elements are collapsed together with the raw
+        # tags at their ends, so whitespace next to a <pre> is seen as
+        # sitting between two tags
+        parts = []
+        start = 0
+        for match in RAW_TAG_RE.finditer(text):
+            if not match.group(1):
+                if not self.raw_depth:
+                    parts.append(self.collapse(text[start:match.end()]))
+                    start = match.end()
+                self.raw_depth += 1
+            elif self.raw_depth:
+                self.raw_depth -= 1
+                if not self.raw_depth:
+                    parts.append(text[start:match.start()])
+                    start = match.start()
+        if self.raw_depth:
+            parts.append(text[start:])
+        else:
+            parts.append(self.collapse(text[start:]))
+        return "".join(parts)
+
+    def collapse(self, text):
+        return collapse_whitespace(BETWEEN_TAGS_RE.sub(between_tags, text))
+
+
+def between_tags(match):
+    # a line break next to a block tag goes, but between inline ones, as in
+    # <a>One</a>\n<a>Two</a>, it renders as a space; comments count as
+    # inline, so the space around them stays
+    if is_block(match.group(2)) or is_block(match.group(3)):
+        return match.group(1)
+    return match.group(1) + " "
+
+
+def is_block(tag):
+    return tag is not None and tag.lower() in BLOCK_TAGS
+
+
+def collapse_whitespace(text):
+    return WHITESPACE_RE.sub(" ", text)
+
+
+def minify_fragments(fragments):
+    # html is minified as it streams past, a fragment at a time, so pages
+    # are never held whole just to be minified
+    minifier = Minifier()
+    for fragment in fragments:
+        yield minifier.feed(fragment)
+
+
+def minify_html(html):
+    return Minifier().feed(html)
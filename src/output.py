@@ -0,0 +1,80 @@
+import os
+from compress import remove_sidecars
+
+
+class AtomicWriter:
+
+    def __init__(self, path, mode="w"):
+        # output goes to a temporary file next to path; on close it replaces
+        # path only when the bytes differ, so unchanged outputs keep their
+        # inode and mtime and readers never see a half written file
+        self.path = path
+        self.mode = mode
+        dir_path, file_name = os.path.split(path)
+        self.tmp_path = os.path.join(dir_path, f".{file_name}.{os.getpid()}.tmp")
+        self.file = None
+        self.changed = None
+
+    def __enter__(self):
+        dir_path = os.path.dirname(self.path)
+        if dir_path != "":
+            os.makedirs(dir_path, exist_ok=True)
+        # text is always written as utf-8, like write_if_changed, so a page
+        # comes out the same whichever way it was rendered
+        encoding = None if "b" in self.mode else "utf-8"
+        self.file = open(self.tmp_path, self.mode, encoding=encoding)
+        return self.file
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.file.close()
+        if exc_type is not None:
+            os.remove(self.tmp_path)
+            return False
+
+        if same_contents(self.tmp_path, self.path):
+            os.remove(self.tmp_path)
+            self.changed = False
+        else:
+            os.replace(self.tmp_path, self.path)
+            remove_sidecars(self.path)
+            self.changed = True
+        return False
+
+
+def same_contents(path_a, path_b, chunk_size=1 << 16):
+    try:
+        if os.path.getsize(path_a) != os.path.getsize(path_b):
+            return False
+    except FileNotFoundError:
+        return False
+
+    with open(path_a, "rb") as file_a, open(path_b, "rb") as file_b:
+        while True:
+            chunk_a = file_a.read(chunk_size)
+            if chunk_a != file_b.read(chunk_size):
+                return False
+            if not chunk_a:
+                return True
+
+
+def write_if_changed(path, data, make_dirs=True):
+    if isinstance(data, str):
+        data = data.encode()
+
+    try:
+        if os.path.getsize(path) == len(data):
+            with open(path, "rb") as file:
+                if file.read() == data:
+                    return False
+    except FileNotFoundError:
+        pass
+
+    dir_path, file_name = os.path.split(path)
+    if make_dirs and dir_path != "":
+        os.makedirs(dir_path, exist_ok=True)
+    tmp_path = os.path.join(dir_path, f".{file_name}.{os.getpid()}.tmp")
+    with open(tmp_path, "wb") as file:
+        file.write(data)
+    os.replace(tmp_path, path)
+    remove_sidecars(path)
+    return True
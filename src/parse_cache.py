@@ -0,0 +1,157 @@
+import hashlib
+import marshal
+import os
+import shutil
+import block_markdown
+import css
+import htmlnode
+import inline_markdown
+import metadata
+import render
+import search
+import textnode
+from css import collect_tags
+from htmlnode import LeafNode, ParentNode
+from output import write_if_changed
+
+PARSE_CACHE_VERSION = 1
+
+
+def parser_version():
+    # any edit to the parser modules gives a new version, so a cache is
+    # never read by code that would have parsed differently; search and css
+    # make the terms and tags that are cached with the html
+    digest = hashlib.sha256(str(PARSE_CACHE_VERSION).encode())
+    for module in (block_markdown, inline_markdown, textnode, htmlnode,
+                   render, metadata, search, css):
+        with open(module.__file__, "rb") as file:
+            digest.update(file.read())
+    return digest.hexdigest()[:16]
+
+
+def read_markdown(path):
+    # the digest is the sha256 of the file, the same hash the manifest
+    # keeps; newlines are translated like a file opened in text mode
+    with open(path, "rb") as file:
+        data = file.read()
+    markdown = data.decode()
+    if "\r" in markdown:
+        markdown = markdown.replace("\r\n", "\n").replace("\r", "\n")
+    return markdown, hashlib.sha256(data).hexdigest()
+
+
+def node_to_data(node):
+    # leaves become (tag, value, props) and parents (tag, children, props),
+    # with children a tuple; plain tuples are what marshal is fastest at
+    if node.children is None:
+        return (node.tag, node.value, node.props)
+    return (node.tag, tuple(node_to_data(child) for child in node.children),
+            node.props)
+
+
+def data_to_node(data):
+    tag, value, props = data
+    if isinstance(value, tuple):
+        return ParentNode(tag, [data_to_node(child) for child in value], props)
+    return LeafNode(tag, value, props)
+
+
+class CachedPage:
+    __slots__ = ("html", "tags", "title", "terms", "tree")
+
+    def __init__(self, html, tags, title, terms, tree):
+        # html and tags are enough to template the page again; the tree is
+        # only unpacked for callers that have to change it
+        self.html = html
+        self.tags = tags
+        self.title = title
+        self.terms = terms
+        self.tree = tree
+
+    def node(self):
+        if self.tree is None:
+            return None
+        return data_to_node(marshal.loads(self.tree))
+
+
+class ParseCache:
+
+    def __init__(self, root, keep=False):
+        # entries live in root/<parser version>/<digest[:2]>/<digest>; with
+        # keep they are also held in memory once read or written, and with a
+        # root of None they are only held in memory
+        self.root = root
+        self.dir_path = None
+        if root is not None:
+            self.dir_path = os.path.join(root, parser_version())
+        self.entries = {} if keep or root is None else None
+
+    def path(self, digest):
+        return os.path.join(self.dir_path, digest[:2], digest)
+
+    def get(self, digest):
+        if self.entries is not None:
+            cached = self.entries.get(digest)
+            if cached is not None or self.root is None:
+                return cached
+
+        try:
+            with open(self.path(digest), "rb") as file:
+                html, tags, title, terms, tree = marshal.load(file)
+        except (OSError, EOFError, ValueError, TypeError):
+            return None
+        if terms is not None:
+            terms = set(terms)
+        cached = CachedPage(html, set(tags), title, terms, tree)
+        if self.entries is not None:
+            self.entries[digest] = cached
+        return cached
+
+    def put(self, digest, node, title, terms, html=None, tags=None):
+        # node may be None when the page was rendered without a tree, in
+        # which case html and tags are required; the tree is marshalled on
+        # its own, so reading an entry copies it as one bytes object instead
+        # of building all of its tuples
+        tree = None
+        if node is not None:
+            if html is None:
+                html = node.to_html()
+            if tags is None:
+                tags = collect_tags(node, set())
+            tree = marshal.dumps(node_to_data(node))
+        if self.entries is not None:
+            self.entries[digest] = CachedPage(
+                html, set(tags), title, None if terms is None else set(terms),
+                tree)
+        if self.root is None:
+            return
+
+        if terms is not None:
+            terms = sorted(terms)
+        write_if_changed(self.path(digest), marshal.dumps(
+            (html, sorted(tags), title, terms, tree)))
+
+    def prune(self, digests):
+        # drops other parser versions and every entry not in digests
+        if self.entries is not None:
+            for digest in list(self.entries):
+                if digest not in digests:
+                    del self.entries[digest]
+        if self.root is None:
+            return
+
+        if os.path.isdir(self.root):
+            for name in os.listdir(self.root):
+                path = os.path.join(self.root, name)
+                if path != self.dir_path:
+                    shutil.rmtree(path, ignore_errors=True)
+        if not os.path.isdir(self.dir_path):
+            return
+
+        for prefix in os.listdir(self.dir_path):
+            prefix_path = os.path.join(self.dir_path, prefix)
+            for digest in os.listdir(prefix_path):
+                if digest not in digests:
+                    os.remove(os.path.join(prefix_path, digest))
+            if not os.listdir(prefix_path):
+                os.rmdir(prefix_path)
@@ -0,0 +1,132 @@
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
+from output import write_if_changed
+
+DONE = object()
+
+
+class Pipeline:
+
+    def __init__(self, read, render, render_executor, on_done=None,
+                 io_workers=8, depth=16, batch_size=32):
+        # read(item) runs on the io threads and render(item, data) on the
+        # render executor, or on the event loop when that is None; render
+        # returns (dest_path, data, info), and data is written to dest_path
+        # unless it is None, after which on_done(info, changed) is called
+        # on the event loop
+        self.read = read
+        self.render = render
+        self.render_executor = render_executor
+        self.on_done = on_done
+        self.io_workers = io_workers
+        self.depth = depth
+        self.batch_size = batch_size
+        self.created_dirs = set()
+
+    def run(self, items, render_workers=1):
+        self.created_dirs = set()
+        with ThreadPoolExecutor(max_workers=self.io_workers) as io_executor:
+            asyncio.run(self.run_stages(items, render_workers, io_executor))
+
+    async def run_stages(self, items, render_workers, io_executor):
+        # both queues are bounded, so when rendering or writing falls behind
+        # the stages before it wait instead of piling up pages in memory
+        read_queue = asyncio.Queue(self.depth)
+        write_queue = asyncio.Queue(self.depth)
+        items = iter(items)
+
+        readers = [
+            asyncio.create_task(self.read_stage(items, read_queue, io_executor))
+            for _ in range(self.io_workers)
+        ]
+        renderers = [
+            asyncio.create_task(self.render_stage(read_queue, write_queue))
+            for _ in range(render_workers)
+        ]
+        writer = asyncio.create_task(self.write_stage(write_queue, io_executor))
+
+        async def finish_reading():
+            await asyncio.gather(*readers)
+            for _ in renderers:
+                await read_queue.put(DONE)
+
+        async def finish_rendering():
+            await asyncio.gather(*renderers)
+            await write_queue.put(DONE)
+
+        # a failing stage would leave the others waiting on its queue
+        # forever, so everything is cancelled once any of them fails
+        try:
+            await asyncio.gather(finish_reading(), finish_rendering(), writer)
+        except BaseException:
+            for task in readers + renderers + [writer]:
+                task.cancel()
+            raise
+
+    async def read_stage(self, items, read_queue, io_executor):
+        loop = asyncio.get_running_loop()
+        for item in items:
+            data = await loop.run_in_executor(io_executor, self.read, item)
+            await read_queue.put((item, data))
+
+    async def render_stage(self, read_queue, write_queue):
+        loop = asyncio.get_running_loop()
+        while True:
+            entry = await read_queue.get()
+            if entry is DONE:
+                return
+            if self.render_executor is None:
+                # rendering on the loop itself saves handing every page to a
+                # thread and back; reads and writes still run alongside it
+                result = self.render(*entry)
+            else:
+                result = await loop.run_in_executor(
+                    self.render_executor, self.render, *entry)
+            await write_queue.put(result)
+
+    async def write_stage(self, write_queue, io_executor):
+        loop = asyncio.get_running_loop()
+        done = False
+        while not done:
+            batch = [await write_queue.get()]
+            while len(batch) < self.batch_size and not write_queue.empty():
+                batch.append(write_queue.get_nowait())
+            if batch[-1] is DONE:
+                batch.pop()
+                done = True
+            if not batch:
+                continue
+
+            # directories are created once per batch instead of once per
+            # page, which saves a round trip per file on network mounts, and
+            # the batch is written by one thread while rendering goes on
+            dir_paths = set()
+            for dest_path, data, _ in batch:
+                dir_path = os.path.dirname(dest_path)
+                if data is not None and dir_path not in self.created_dirs:
+                    dir_paths.add(dir_path)
+            if dir_paths:
+                await loop.run_in_executor(io_executor, make_dirs, dir_paths)
+                self.created_dirs.update(dir_paths)
+
+            changed = await loop.run_in_executor(io_executor, write_batch, batch)
+            if self.on_done is not None:
+                for (_, _, info), was_changed in zip(batch, changed):
+                    self.on_done(info, was_changed)
+
+
+def make_dirs(dir_paths):
+    for dir_path in sorted(dir_paths):
+        if dir_path != "":
+            os.makedirs(dir_path, exist_ok=True)
+
+
+def write_batch(batch):
+    changed = []
+    for dest_path, data, _ in batch:
+        if data is None:
+            changed.append(None)
+        else:
+            changed.append(write_if_changed(dest_path, data, make_dirs=False))
+    return changed
@@ -0,0 +1,119 @@
+import json
+import os
+import time
+
+
+class Span:
+    __slots__ = ("profiler", "name", "start")
+
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc_info):
+        end = time.perf_counter_ns()
+        self.profiler.events.append(
+            (self.name, self.profiler.page, self.start, end - self.start, os.getpid()))
+        return False
+
+
+class NullSpan:
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+NULL_SPAN = NullSpan()
+
+
+class Profiler:
+
+    def __init__(self):
+        self.enabled = False
+        self.page = None
+        self.events = []
+
+    def enable(self):
+        self.enabled = True
+
+    def span(self, name):
+        if not self.enabled:
+            return NULL_SPAN
+        return Span(self, name)
+
+    def instrument(self, module, name):
+        # wraps a module level function in a span named after it; nothing is
+        # wrapped unless profiling is on, so a normal build pays no overhead
+        func = getattr(module, name)
+
+        def wrapper(*args, **kwargs):
+            with self.span(name):
+                return func(*args, **kwargs)
+
+        setattr(module, name, wrapper)
+
+    def take_events(self):
+        events = self.events
+        self.events = []
+        return events
+
+    def to_trace(self):
+        trace_events = []
+        for name, page, start, duration, pid in self.events:
+            trace_events.append({
+                "name": name,
+                "cat": "build",
+                "ph": "X",
+                "ts": start / 1000,
+                "dur": duration / 1000,
+                "pid": pid,
+                "tid": pid,
+                "args": {"page": page},
+            })
+        trace_events.sort(key=lambda event: (event["ts"], -event["dur"]))
+        return {"traceEvents": trace_events, "displayTimeUnit": "ms"}
+
+    def write_trace(self, path):
+        dir_path = os.path.dirname(path)
+        if dir_path != "":
+            os.makedirs(dir_path, exist_ok=True)
+        with open(path, "w") as file:
+            json.dump(self.to_trace(), file)
+
+    def summary(self, top=10):
+        stages, pages = event_totals(self.events)
+        lines = ["Stages by total time:"]
+        for name, (total, count) in sorted(
+                stages.items(), key=lambda item: item[1][0], reverse=True):
+            lines.append(
+                f" * {name:24} {total / 1e6:10.2f} ms total  "
+                f"{count:7} calls  {total / count / 1e3:10.1f} us each")
+
+        lines.append(f"Slowest {min(top, len(pages))} pages:")
+        for page, total in sorted(
+                pages.items(), key=lambda item: item[1], reverse=True)[:top]:
+            lines.append(f" * {total / 1e6:10.2f} ms  {page}")
+        return "\n".join(lines)
+
+
+def event_totals(events):
+    # the total time and call count of every stage, and the total time of
+    # every page, all in nanoseconds
+    stages = {}
+    pages = {}
+    for name, page, _, duration, _ in events:
+        total, count = stages.get(name, (0, 0))
+        stages[name] = (total + duration, count + 1)
+        if name == "generate_page":
+            pages[page] = pages.get(page, 0) + duration
+    return stages, pages
+
+
+profiler = Profiler()
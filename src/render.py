@@ -0,0 +1,163 @@
+from block_markdown import BlockType, heading_title, scan_blocks
+from inline_markdown import DELIMITERS, IMAGE_RE, LINK_RE
+from textnode import TEXT_TYPE_TAGS
+
+# the open and close tag of every delimiter level, in DELIMITERS order
+DELIMITER_TAGS = tuple(
+    (TEXT_TYPE_TAGS[text_type], f"<{TEXT_TYPE_TAGS[text_type]}>",
+     f"</{TEXT_TYPE_TAGS[text_type]}>")
+    for _, text_type in DELIMITERS
+)
+LIST_TAGS = {BlockType.ULIST: "ul", BlockType.OLIST: "ol"}
+
+
+class HtmlRenderer:
+
+    def __init__(self, texts=None, tags=None):
+        # renders markdown straight into a list of strings, producing the
+        # same html as markdown_to_html_node(...).to_html() without any
+        # TextNode or HTMLNode in between; texts and tags, when given,
+        # collect every piece of text and every tag used on the way
+        self.out = []
+        self.texts = texts
+        self.tags = tags
+
+    def render(self, markdown):
+        title = None
+        out = self.out
+        out.append("<div>")
+        for block_type, lines in self.scan_blocks(markdown):
+            if title is None and block_type == BlockType.HEADING:
+                title = heading_title(lines)
+            self.render_block(block_type, lines)
+        out.append("</div>")
+        if self.tags is not None:
+            self.tags.add("div")
+        return "".join(out), title
+
+    def scan_blocks(self, markdown):
+        # the blocks are listed up front, which costs little next to
+        # rendering them, so that --profile can time scanning on its own
+        return list(scan_blocks(markdown.split("\n")))
+
+    def render_block(self, block_type, lines):
+        out = self.out
+        match(block_type):
+            case BlockType.HEADING:
+                block = "\n".join(lines)
+                tag = f"h{block.count('#', 0, 8)}"
+                self.render_element(tag, block.lstrip("# "))
+            case BlockType.CODE:
+                block = "\n".join(lines).lstrip("```\n").rstrip("```")
+                out.append("<pre><code>")
+                out.append(block)
+                out.append("</code></pre>")
+                if self.texts is not None:
+                    self.texts.append(block)
+                if self.tags is not None:
+                    self.tags.update(("pre", "code"))
+            case BlockType.QUOTE:
+                block = " ".join(line.lstrip(">").strip() for line in lines)
+                self.render_element("blockquote", block)
+            case BlockType.ULIST | BlockType.OLIST:
+                tag = LIST_TAGS[block_type]
+                out.append(f"<{tag}>")
+                for line in lines:
+                    if block_type == BlockType.ULIST:
+                        line = line.lstrip("- ")
+                    else:
+                        line = line[3:]
+                    self.render_element("li", line)
+                out.append(f"</{tag}>")
+                if self.tags is not None:
+                    self.tags.add(tag)
+            case BlockType.PARAGRAPH:
+                self.render_element("p", " ".join(lines))
+            case _:
+                raise ValueError("invalid block type")
+
+    def render_element(self, tag, text):
+        self.out.append(f"<{tag}>")
+        self.render_inline(text)
+        self.out.append(f"</{tag}>")
+        if self.tags is not None:
+            self.tags.add(tag)
+
+    def render_inline(self, text):
+        self.render_delimiters(text, 0, len(text), 0)
+
+    def render_delimiters(self, text, start, end, level):
+        # the same scan as inline_markdown.scan_delimiters, writing html
+        # where that appends text nodes
+        if level == len(DELIMITERS):
+            self.render_images(text, start, end)
+            return
+
+        delimiter = DELIMITERS[level][0]
+        inside = False
+        while True:
+            index = text.find(delimiter, start, end)
+            if index == -1:
+                break
+
+            if index > start:
+                if inside:
+                    tag, open_tag, close_tag = DELIMITER_TAGS[level]
+                    value = text[start:index]
+                    self.out.append(open_tag)
+                    self.out.append(value)
+                    self.out.append(close_tag)
+                    if self.texts is not None:
+                        self.texts.append(value)
+                    if self.tags is not None:
+                        self.tags.add(tag)
+                else:
+                    self.render_delimiters(text, start, index, level + 1)
+            inside = not inside
+            start = index + len(delimiter)
+
+        if inside:
+            raise ValueError("invalid markdown, format section not closed")
+
+        if end > start:
+            self.render_delimiters(text, start, end, level + 1)
+
+    def render_images(self, text, start, end):
+        for match in IMAGE_RE.finditer(text, start, end):
+            if match.start() > start:
+                self.render_links(text, start, match.start())
+            alt, url = match.groups()
+            self.out.append(f'<img src="{url}" alt="{alt}"></img>')
+            if self.texts is not None:
+                self.texts.append(alt)
+            if self.tags is not None:
+                self.tags.add("img")
+            start = match.end()
+
+        if end > start:
+            self.render_links(text, start, end)
+
+    def render_links(self, text, start, end):
+        out = self.out
+        for match in LINK_RE.finditer(text, start, end):
+            if match.start() > start:
+                self.render_text(text[start:match.start()])
+            value, url = match.groups()
+            out.append(f'<a href="{url}">{value}</a>')
+            if self.texts is not None:
+                self.texts.append(value)
+            if self.tags is not None:
+                self.tags.add("a")
+            start = match.end()
+
+        if end > start:
+            self.render_text(text[start:end])
+
+    def render_text(self, value):
+        self.out.append(value)
+        if self.texts is not None:
+            self.texts.append(value)
+
+
+def markdown_to_html(markdown, texts=None, tags=None):
+    return HtmlRenderer(texts, tags).render(markdown)
@@ -0,0 +1,154 @@
+import json
+import os
+import re
+from compress import remove_sidecars
+from output import write_if_changed
+
+SEARCH_VERSION = 1
+TERM_RE = re.compile(r"\w+")
+PREFIX_LENGTH = 2
+
+
+class TermCollector:
+
+    def __init__(self):
+        self.terms = set()
+
+    def __call__(self, text_nodes):
+        self.add_texts(text_node.text for text_node in text_nodes)
+
+    def add_texts(self, texts):
+        for text in texts:
+            self.terms.update(text_to_terms(text))
+
+
+def text_to_terms(text):
+    return [term for term in TERM_RE.findall(text.lower()) if len(term) > 1]
+
+
+def term_prefix(term):
+    return term[:PREFIX_LENGTH]
+
+
+class SearchIndex:
+
+    def __init__(self, state=None):
+        # pages maps a page path relative to the site root to its stable id,
+        # title and terms; postings is the inverted index built from them
+        if state is None or state.get("version") != SEARCH_VERSION:
+            state = {"version": SEARCH_VERSION, "next_id": 0, "pages": {}}
+        self.state = state
+        self.postings = {}
+        for page in state["pages"].values():
+            for term in page["terms"]:
+                self.postings.setdefault(term, set()).add(page["id"])
+        self.dirty = set()
+        self.pages_dirty = False
+
+    def __contains__(self, path):
+        return path in self.state["pages"]
+
+    def update(self, path, title, terms):
+        old = self.state["pages"].get(path)
+        terms = sorted(terms)
+        if old is not None and old["title"] == title and old["terms"] == terms:
+            return
+
+        if old is None:
+            page_id = self.state["next_id"]
+            self.state["next_id"] += 1
+            old_terms = set()
+        else:
+            page_id = old["id"]
+            old_terms = set(old["terms"])
+
+        self.state["pages"][path] = {"id": page_id, "title": title, "terms": terms}
+        self.pages_dirty = True
+        new_terms = set(terms)
+        for term in old_terms - new_terms:
+            self.remove_posting(term, page_id)
+        for term in new_terms - old_terms:
+            self.postings.setdefault(term, set()).add(page_id)
+            self.dirty.add(term_prefix(term))
+
+    def remove(self, path):
+        old = self.state["pages"].pop(path, None)
+        if old is None:
+            return
+        self.pages_dirty = True
+        for term in old["terms"]:
+            self.remove_posting(term, old["id"])
+
+    def remove_posting(self, term, page_id):
+        ids = self.postings.get(term)
+        if ids is None:
+            return
+        ids.discard(page_id)
+        if not ids:
+            del self.postings[term]
+        self.dirty.add(term_prefix(term))
+
+    def write_shards(self, out_dir, basepath="/", full=False):
+        # only shards whose terms changed since the last write are rebuilt;
+        # every shard is a separate file so the browser fetches just the
+        # prefixes of the words it searches for
+        terms_dir = os.path.join(out_dir, "terms")
+        if full:
+            self.dirty.update(term_prefix(term) for term in self.postings)
+            if os.path.isdir(terms_dir):
+                for file_name in os.listdir(terms_dir):
+                    # shards and their compressed sidecars alike
+                    self.dirty.add(file_name.split(".")[0])
+            self.pages_dirty = True
+
+        shards = dict((prefix, {}) for prefix in self.dirty)
+        for term, ids in self.postings.items():
+            terms = shards.get(term_prefix(term))
+            if terms is not None:
+                terms[term] = sorted(ids)
+
+        for prefix, terms in sorted(shards.items()):
+            path = os.path.join(terms_dir, f"{prefix}.json")
+            if terms:
+                write_if_changed(path, json.dumps(
+                    terms, separators=(",", ":"), sort_keys=True))
+            else:
+                if os.path.exists(path):
+                    os.remove(path)
+                # with the sidecars compress made of it, which would be
+                # served in its place
+                remove_sidecars(path)
+        self.dirty = set()
+
+        if self.pages_dirty or self.state.get("basepath") != basepath:
+            pages = {}
+            for path, page in self.state["pages"].items():
+                pages[page["id"]] = [path, page["title"]]
+            write_if_changed(
+                os.path.join(out_dir, "pages.json"),
+                json.dumps({
+                    "basepath": basepath,
+                    "prefix_length": PREFIX_LENGTH,
+                    "pages": pages,
+                }, separators=(",", ":"), sort_keys=True),
+            )
+            self.state["basepath"] = basepath
+            self.pages_dirty = False
+
+    def save(self, path):
+        write_if_changed(path, json.dumps(self.state, separators=(",", ":")))
+
+
+def page_path(dest_path, root):
+    path = os.path.relpath(dest_path, root).replace(os.sep, "/")
+    if path == "index.html" or path.endswith("/index.html"):
+        path = path[:-len("index.html")]
+    return path
+
+
+def load_index(path):
+    try:
+        with open(path, "r") as file:
+            return SearchIndex(json.load(file))
+    except (FileNotFoundError, json.JSONDecodeError):
+        return SearchIndex()
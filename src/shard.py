@@ -0,0 +1,102 @@
+import argparse
+import glob
+import hashlib
+import json
+import os
+from manifest import load_manifest, new_manifest
+
+
+def parse_shard(text):
+    # "K/N" with shards counted from 1, as CI matrices usually number them
+    try:
+        index, count = (int(part) for part in text.split("/"))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected K/N, got {text!r}")
+    if count < 1 or not 1 <= index <= count:
+        raise argparse.ArgumentTypeError(f"shard {text} is out of range")
+    return index, count
+
+
+def shard_of(src_path, content_root, count):
+    # hashing the path relative to the content directory, with / as the
+    # separator, gives every machine the same answer for the same tree;
+    # python's own hash() is salted per process
+    relative = os.path.relpath(src_path, content_root).replace(os.sep, "/")
+    digest = hashlib.sha256(relative.encode()).digest()
+    return int.from_bytes(digest[:8], "big") % count + 1
+
+
+def select_shard(pages, content_root, index, count):
+    return (
+        page for page in pages
+        if shard_of(page[0], content_root, count) == index
+    )
+
+
+def shard_manifest_path(dir_path, index, count):
+    return os.path.join(dir_path, f"{index}-of-{count}.json")
+
+
+def load_shard_manifests(dir_path):
+    manifests = []
+    for path in sorted(glob.glob(os.path.join(dir_path, "*-of-*.json"))):
+        manifest = load_manifest(path)
+        if manifest is None or "shard" not in manifest:
+            raise ValueError(f"{path} is not a shard manifest")
+        manifests.append(manifest)
+    manifests.sort(key=lambda manifest: manifest["shard"])
+    return manifests
+
+
+def merge_manifests(manifests, pages):
+    # returns the manifest of the whole site and a list of problems; the
+    # shards must be every shard of one build, and together build every
+    # page exactly once
+    if not manifests:
+        return None, ["no shard manifests found"]
+
+    problems = []
+    count = manifests[0]["shard"][1]
+    found = set()
+    for manifest in manifests:
+        index, shard_count = manifest["shard"]
+        if shard_count != count:
+            problems.append(
+                f"shard {index}/{shard_count} is not one of {count} shards")
+        elif index in found:
+            problems.append(f"shard {index}/{count} appears more than once")
+        found.add(index)
+    for index in range(1, count + 1):
+        if index not in found:
+            problems.append(f"shard {index}/{count} is missing")
+    for key in ("template", "basepath"):
+        if len(set(manifest[key] for manifest in manifests)) > 1:
+            problems.append(f"shards were built with different {key}s")
+    filters = set(
+        json.dumps(manifest.get("filter"), sort_keys=True)
+        for manifest in manifests)
+    if len(filters) > 1:
+        problems.append("shards were built with different --include/--exclude")
+
+    owners = {}
+    for manifest in manifests:
+        for src_path in manifest["pages"]:
+            owners.setdefault(src_path, []).append(manifest["shard"][0])
+    src_paths = set(src_path for src_path, _ in pages)
+    for src_path in sorted(src_paths):
+        if src_path not in owners:
+            problems.append(f"{src_path} was not built by any shard")
+    for src_path, indexes in sorted(owners.items()):
+        if len(indexes) > 1:
+            shards = ", ".join(str(index) for index in indexes)
+            problems.append(f"{src_path} was built by shards {shards}")
+        if src_path not in src_paths:
+            problems.append(f"{src_path} was built but is not in the content")
+
+    merged = new_manifest(manifests[0]["template"], manifests[0]["basepath"])
+    for manifest in manifests:
+        merged["pages"].update(manifest["pages"])
+    merged["static"] = manifests[0].get("static", [])
+    # only the first shard generates listings
+    merged["listings"] = manifests[0].get("listings", [])
+    return merged, problems
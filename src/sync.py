@@ -0,0 +1,124 @@
+import os
+import shutil
+from concurrent.futures import ThreadPoolExecutor
+from compress import remove_sidecars
+from discover import walk_files
+from manifest import hash_file
+
+
+def list_files(root):
+    # symlinked directories are not followed, as with os.walk
+    if not os.path.isdir(root):
+        return []
+    return [
+        relative
+        for _, relative in walk_files(root, follow_symlinks=False)
+    ]
+
+
+def needs_copy(src_path, dst_path, checksum=False):
+    try:
+        dst_stat = os.stat(dst_path)
+    except FileNotFoundError:
+        return True
+
+    src_stat = os.stat(src_path)
+    if src_stat.st_size != dst_stat.st_size:
+        return True
+    if src_stat.st_mtime_ns == dst_stat.st_mtime_ns:
+        return False
+    if not checksum:
+        return True
+
+    if hash_file(src_path) != hash_file(dst_path):
+        return True
+    # same bytes, only the mtime drifted: fix it so the next sync can skip the
+    # file without hashing it again
+    os.utime(dst_path, ns=(src_stat.st_atime_ns, src_stat.st_mtime_ns))
+    return False
+
+
+def copy_file(src_path, dst_path, link=False):
+    # the copy is made next to dst_path and renamed over it, so the old file
+    # stays in place until the new one is complete
+    dir_path, file_name = os.path.split(dst_path)
+    if dir_path != "":
+        os.makedirs(dir_path, exist_ok=True)
+    tmp_path = os.path.join(dir_path, f".{file_name}.{os.getpid()}.tmp")
+
+    try:
+        place_file(src_path, tmp_path, link)
+        os.replace(tmp_path, dst_path)
+        remove_sidecars(dst_path)
+    finally:
+        if os.path.lexists(tmp_path):
+            os.remove(tmp_path)
+
+
+def place_file(src_path, dst_path, link):
+    if link:
+        try:
+            os.link(src_path, dst_path)
+            return
+        except OSError:
+            # e.g. the output lives on another filesystem
+            pass
+
+    if hasattr(os, "copy_file_range"):
+        try:
+            copy_range(src_path, dst_path)
+            shutil.copystat(src_path, dst_path)
+            return
+        except OSError:
+            pass
+
+    shutil.copy2(src_path, dst_path)
+
+
+def copy_range(src_path, dst_path):
+    # lets the kernel copy (or reflink) the data without moving it through
+    # user space
+    with open(src_path, "rb") as src, open(dst_path, "wb") as dst:
+        remaining = os.fstat(src.fileno()).st_size
+        while remaining > 0:
+            copied = os.copy_file_range(src.fileno(), dst.fileno(), remaining)
+            if copied == 0:
+                break
+            remaining -= copied
+
+
+def sync_file(src_path, dst_path, checksum=False, link=False):
+    if not needs_copy(src_path, dst_path, checksum):
+        return False
+    copy_file(src_path, dst_path, link)
+    return True
+
+
+def sync_tree(src, dst, previous=None, checksum=False, link=False, jobs=None):
+    files = list_files(src)
+    src_paths = [os.path.join(src, path) for path in files]
+    dst_paths = [os.path.join(dst, path) for path in files]
+
+    # stats, hashes and copies are I/O bound, so threads overlap them well
+    with ThreadPoolExecutor(max_workers=jobs) as executor:
+        copied = executor.map(
+            sync_file,
+            src_paths,
+            dst_paths,
+            [checksum] * len(files),
+            [link] * len(files),
+        )
+        changed = [
+            (src_path, dst_path)
+            for src_path, dst_path, was_copied in zip(src_paths, dst_paths, copied)
+            if was_copied
+        ]
+
+    removed = []
+    if previous is not None:
+        current = set(files)
+        for path in previous:
+            if path not in current:
+                removed.append(os.path.join(dst, path))
+
+    return files, changed, removed
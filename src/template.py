@@ -0,0 +1,211 @@
+import os
+import re
+from minify import Minifier, minify_fragments, minify_html
+
+PLACEHOLDER_RE = re.compile(r"\{\{ *(\w+)(?: +([^{}]*?))? *\}\}")
+URL_RE = re.compile(r'(href|src)="/')
+STYLESHEET_RE = re.compile(r'<link\b[^>]*\brel="stylesheet"[^>]*>')
+HREF_RE = re.compile(r'\bhref="(/[^"]*)"')
+TAG_RE = re.compile(r"<([a-zA-Z][a-zA-Z0-9-]*)")
+
+_templates = {}
+
+
+class Template:
+
+    def __init__(self, parts, slots, dependencies, minified=None,
+                 stylesheet=None, tags=None):
+        self.parts = parts
+        self.slots = slots
+        self.dependencies = dependencies
+        self.values_by_index = {
+            index: (name, raw) for index, name, raw in slots
+        }
+        # indices of the slots whose values are minified as they are filled
+        self.minified = set() if minified is None else minified
+        # the href of the stylesheet link turned into the Stylesheet slot,
+        # and the tags the template itself uses
+        self.stylesheet = stylesheet
+        self.tags = set() if tags is None else tags
+
+    def render(self, values):
+        parts = self.parts.copy()
+        for index, name, raw in self.slots:
+            value = values.get(name, raw)
+            if index in self.minified:
+                value = minify_html(value)
+            parts[index] = value
+        return "".join(parts)
+
+    def write_to(self, file, values):
+        # values may be strings or iterables of fragments, which are written
+        # as they are produced instead of being joined first
+        for index, part in enumerate(self.parts):
+            value = self.values_by_index.get(index)
+            if value is None:
+                file.write(part)
+                continue
+
+            name, raw = value
+            value = values.get(name, raw)
+            if index in self.minified:
+                if isinstance(value, str):
+                    value = minify_html(value)
+                else:
+                    value = minify_fragments(value)
+            if isinstance(value, str):
+                file.write(value)
+            else:
+                file.writelines(value)
+
+    def __repr__(self):
+        return f"Template({self.parts}, {self.slots})"
+
+
+def load_template(template_path, basepath="/", minify=False, critical=False):
+    key = (template_path, basepath, minify, critical)
+    template = _templates.get(key)
+    if template is not None and not is_modified(template):
+        return template
+
+    template = compile_template(template_path, basepath, minify, critical)
+    _templates[key] = template
+    return template
+
+
+def is_modified(template):
+    for path, mtime in template.dependencies.items():
+        try:
+            if os.stat(path).st_mtime_ns != mtime:
+                return True
+        except FileNotFoundError:
+            return True
+    return False
+
+
+def compile_template(template_path, basepath="/", minify=False, critical=False):
+    dependencies = {}
+    segments = []
+    read_segments(template_path, segments, dependencies, [])
+
+    stylesheet = None
+    tags = set()
+    if critical:
+        # the first local stylesheet link becomes a slot, so each page can
+        # put its critical css there and load the rest without blocking
+        stylesheet = extract_stylesheet(segments, basepath)
+        for segment in segments:
+            if isinstance(segment, str):
+                tags.update(tag.lower() for tag in TAG_RE.findall(segment))
+
+    # merge neighbouring literals so that each page is a single join over as
+    # few parts as possible; when minifying, the literals are minified here
+    # once, and only slots outside of raw elements like <pre> are minified
+    # when a page fills them
+    minifier = Minifier() if minify else None
+    parts = []
+    slots = []
+    minified = set()
+    literal = []
+    for segment in segments:
+        if isinstance(segment, str):
+            literal.append(segment)
+            continue
+
+        if literal:
+            parts.append(compile_literal(literal, basepath, minifier))
+            literal = []
+        if minifier is not None and not minifier.raw_depth:
+            minified.add(len(parts))
+        slots.append((len(parts), segment[0], segment[1]))
+        parts.append(segment[1])
+
+    if literal:
+        parts.append(compile_literal(literal, basepath, minifier))
+
+    if minifier is not None and parts:
+        slot_indices = set(index for index, _, _ in slots)
+        if 0 not in slot_indices:
+            parts[0] = parts[0].lstrip()
+        if len(parts) - 1 not in slot_indices:
+            parts[-1] = parts[-1].rstrip()
+
+    return Template(parts, slots, dependencies, minified, stylesheet, tags)
+
+
+def extract_stylesheet(segments, basepath):
+    for index, segment in enumerate(segments):
+        if not isinstance(segment, str):
+            continue
+        for match in STYLESHEET_RE.finditer(segment):
+            href = HREF_RE.search(match.group(0))
+            if href is None:
+                continue
+            segments[index:index + 1] = [
+                segment[:match.start()],
+                ("Stylesheet", rewrite_urls(match.group(0), basepath)),
+                segment[match.end():],
+            ]
+            return href.group(1)
+    return None
+
+
+def compile_literal(literal, basepath, minifier):
+    html = rewrite_urls("".join(literal), basepath)
+    if minifier is not None:
+        html = minifier.feed(html)
+    return html
+
+
+def read_segments(path, segments, dependencies, stack):
+    if path in stack:
+        raise ValueError(f"invalid template: {path} includes itself")
+
+    with open(path, "r", encoding="utf-8") as file:
+        text = file.read()
+    dependencies[path] = os.stat(path).st_mtime_ns
+
+    position = 0
+    for match in PLACEHOLDER_RE.finditer(text):
+        if match.start() > position:
+            segments.append(text[position:match.start()])
+        position = match.end()
+
+        name, argument = match.groups()
+        if name != "include":
+            segments.append((name, match.group(0)))
+            continue
+
+        if not argument:
+            raise ValueError(f"invalid template: include without a path in {path}")
+        include_path = os.path.join(os.path.dirname(path), argument)
+        read_segments(include_path, segments, dependencies, stack + [path])
+
+    if position < len(text):
+        segments.append(text[position:])
+
+
+def rewrite_urls(html, basepath):
+    if basepath == "/":
+        return html
+    return URL_RE.sub(lambda match: f'{match.group(1)}="{basepath}', html)
+
+
+def rewrite_fragments(fragments, basepath):
+    if basepath == "/":
+        return fragments
+    return (rewrite_urls(fragment, basepath) for fragment in fragments)
+
+
+def find_layout(src_path, dir_path_content, dir_path_layouts, default_path):
+    # pages use the layout named after their top level section, e.g.
+    # content/blog/tom/index.md renders with layouts/blog.html when it exists
+    relative = os.path.relpath(src_path, dir_path_content)
+    section = relative.split(os.sep)[0]
+    if section == relative:
+        return default_path
+
+    layout_path = os.path.join(dir_path_layouts, f"{section}.html")
+    if os.path.isfile(layout_path):
+        return layout_path
+    return default_path
@@ -0,0 +1,82 @@
+import unittest
+
+from block_markdown import (
+    BlockType,
+    block_to_block_type,
+    markdown_to_blocks,
+    parse_markdown,
+)
+from bench.corpus import CorpusConfig, generate_markdown
+from bench.results import compare_results
+
+
+class TestCorpus(unittest.TestCase):
+
+    def test_deterministic(self):
+        config = CorpusConfig(seed=3, size=4096)
+        self.assertEqual(generate_markdown(config), generate_markdown(config))
+        self.assertNotEqual(
+            generate_markdown(config),
+            generate_markdown(CorpusConfig(seed=4, size=4096)),
+        )
+
+    def test_size(self):
+        markdown = generate_markdown(CorpusConfig(size=10000))
+        self.assertGreaterEqual(len(markdown), 10000)
+        self.assertLess(len(markdown), 12000)
+
+    def test_parses(self):
+        markdown = generate_markdown(CorpusConfig(
+            size=20000, link_density=0.2, image_density=0.1, code_share=0.3))
+        _, title = parse_markdown(markdown)
+        self.assertIsNotNone(title)
+        self.assertIn("<a href=", parse_markdown(markdown)[0].to_html())
+
+    def block_shares(self, config):
+        blocks = markdown_to_blocks(generate_markdown(config))[1:]
+        shares = dict((block_type, 0) for block_type in BlockType)
+        for block in blocks:
+            shares[block_to_block_type(block)] += 1 / len(blocks)
+        return shares
+
+    def test_block_types_follow_config(self):
+        # code blocks take code_share, and the other blocks are split
+        # between headings (10%), quotes (10%), unordered (15%) and ordered
+        # (10%) lists and paragraphs
+        shares = self.block_shares(CorpusConfig(size=200000, code_share=0.3))
+        expected = {
+            BlockType.CODE: 0.3,
+            BlockType.HEADING: 0.07,
+            BlockType.QUOTE: 0.07,
+            BlockType.ULIST: 0.105,
+            BlockType.OLIST: 0.07,
+            BlockType.PARAGRAPH: 0.385,
+        }
+        for block_type, share in expected.items():
+            self.assertAlmostEqual(shares[block_type], share, delta=0.04)
+
+        # indented items make paragraphs of some of the lists
+        deep = self.block_shares(
+            CorpusConfig(size=200000, code_share=0.3, list_depth=3))
+        self.assertLess(deep[BlockType.ULIST], shares[BlockType.ULIST])
+
+
+class TestResults(unittest.TestCase):
+
+    def test_compare_results(self):
+        base = {"benchmarks": {
+            "a": {"min": 1.0}, "b": {"min": 1.0}, "c": {"min": 1.0},
+        }}
+        head = {"benchmarks": {
+            "a": {"min": 1.05}, "b": {"min": 1.5}, "c": {"min": 0.5},
+            "d": {"min": 1.0},
+        }}
+        self.assertEqual(
+            [(name, status) for name, _, _, _, status
+             in compare_results(base, head, 0.1)],
+            [("a", "ok"), ("b", "regression"), ("c", "improvement"), ("d", "new")],
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
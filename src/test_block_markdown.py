@@ -1,3 +1,7 @@
+import os
+import random
+import re
+import tempfile
 import unittest
 
 from block_markdown import (
@@ -5,6 +9,10 @@ from block_markdown import (
     block_to_block_type,
     markdown_to_html_node,
     extract_title,
+    file_lines,
+    iter_markdown_html,
+    parse_markdown,
+    scan_blocks,
     BlockType
 )
 
@@ -216,3 +224,105 @@ the **same** even with inline stuff
 
         title = extract_title(md)
         self.assertEqual("But this", title)
+
+    def test_extract_title_none(self):
+        self.assertRaises(ValueError, extract_title, "## Only an h2")
+
+    def test_parse_markdown(self):
+        md = """
+## First an h2
+
+# The title
+
+Some text
+"""
+        node, title = parse_markdown(md)
+        self.assertEqual("The title", title)
+        self.assertEqual(
+            node.to_html(),
+            "<div><h2>First an h2</h2><h1>The title</h1><p>Some text</p></div>",
+        )
+
+    def test_parse_markdown_no_title(self):
+        _, title = parse_markdown("just text")
+        self.assertIsNone(title)
+
+    def test_scan_blocks(self):
+        md = "# Title\n\n- one\n- two\n\n```\ncode\n```"
+        self.assertEqual(
+            list(scan_blocks(md.split("\n"))),
+            [
+                (BlockType.HEADING, ["# Title"]),
+                (BlockType.ULIST, ["- one", "- two"]),
+                (BlockType.CODE, ["```", "code", "```"]),
+            ]
+        )
+
+
+def split_blocks(markdown):
+    blocks = markdown.split("\n\n")
+    return list(filter(None, map(str.strip, blocks)))
+
+
+def classify_block(block):
+    if re.match(r"#{1,6} ", block):
+        return BlockType.HEADING
+    if block[:3] == "```" and block[-3:] == "```":
+        return BlockType.CODE
+    lines = block.split("\n")
+    if all(line[0] == ">" for line in lines):
+        return BlockType.QUOTE
+    if all(line[0:2] == "- " for line in lines):
+        return BlockType.ULIST
+    if all(re.match(r"^\d\.", line) for line in lines):
+        return BlockType.OLIST
+    return BlockType.PARAGRAPH
+
+
+class TestBlockScanner(unittest.TestCase):
+
+    pieces = [
+        "\n", "\n\n", "\n\n\n", " ", "  ", "\t", "text", "# ", "## ",
+        "#", "```", "`", ">", "- ", "-", "1.", "2. ", "x.",
+    ]
+
+    def test_differential(self):
+        rng = random.Random(1234)
+        for _ in range(5000):
+            md = "".join(rng.choice(self.pieces)
+                         for _ in range(rng.randint(0, 30)))
+            expected = split_blocks(md)
+            scanned = list(scan_blocks(md.split("\n")))
+            self.assertEqual(
+                expected, ["\n".join(lines) for _, lines in scanned], repr(md))
+            self.assertEqual(
+                [classify_block(block) for block in expected],
+                [block_type for block_type, _ in scanned],
+                repr(md),
+            )
+
+
+class TestStreaming(unittest.TestCase):
+
+    documents = [
+        "# Title\n\nSome **bold** text\n\n- one\n- two\n",
+        "# Title\n\nno trailing newline",
+        "# Title\r\n\r\nwindows _line_ endings\r\n\r\n> quoted\r\n",
+        "# Title\n\n```\ncode at the end\n```",
+        "# Title\n\n```\ncode at the end\n```\n",
+        "# Title\r\n\r\n```\r\ncode with\r\ncrlf\r\n```\r\n",
+        "# Title\n\n\n\n1. first\n2. second\n\n\n",
+    ]
+
+    def test_matches_tree_renderer(self):
+        # what stream_page does with a file, against rendering it whole
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "page.md")
+            for markdown in self.documents:
+                with open(path, "w", newline="") as file:
+                    file.write(markdown)
+                with open(path, "r") as file:
+                    expected = markdown_to_html_node(file.read()).to_html()
+                with open(path, "r") as file:
+                    streamed = "".join(iter_markdown_html(file_lines(file)))
+                self.assertEqual(streamed, expected, repr(markdown))
@@ -0,0 +1,66 @@
+import gzip
+import os
+import tempfile
+import unittest
+
+from compress import compress_tree, compress_file, find_compressible
+
+
+class TestCompress(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.dir = self.tmp.name
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def write(self, name, data):
+        path = os.path.join(self.dir, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "wb") as file:
+            file.write(data)
+        return path
+
+    def test_find_compressible(self):
+        self.write("index.html", b"<p></p>")
+        self.write("index.css", b"p {}")
+        self.write("images/a.png", b"png")
+        self.assertEqual(
+            find_compressible(self.dir),
+            [os.path.join(self.dir, "index.css"),
+             os.path.join(self.dir, "index.html")],
+        )
+
+    def test_gzip_sidecar(self):
+        data = b"<p>hello</p>" * 100
+        path = self.write("index.html", data)
+        results = compress_file(path, ["gz"])
+        self.assertEqual(results[0][:2], ("gz", len(data)))
+        self.assertTrue(results[0][3])
+        with open(f"{path}.gz", "rb") as file:
+            self.assertEqual(gzip.decompress(file.read()), data)
+
+    def test_up_to_date_sidecar_is_skipped(self):
+        path = self.write("index.html", b"<p>hello</p>")
+        compress_file(path, ["gz"])
+        self.assertFalse(compress_file(path, ["gz"])[0][3])
+
+        self.write("index.html", b"<p>changed</p>")
+        os.utime(path, ns=(0, 0))
+        self.assertTrue(compress_file(path, ["gz"])[0][3])
+
+    def test_compress_tree(self):
+        self.write("index.html", b"<p>hello</p>" * 100)
+        self.write("blog/index.html", b"<p>post</p>" * 100)
+        stats = compress_tree(self.dir, ["gz"])
+        self.assertEqual(stats.files, 2)
+        self.assertEqual(stats.written, 2)
+        self.assertLess(stats.ratio("gz"), 0.5)
+
+        stats = compress_tree(self.dir, ["gz"])
+        self.assertEqual(stats.skipped, 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,127 @@
+import os
+import tempfile
+import unittest
+
+from block_markdown import markdown_to_html_node
+from css import (
+    collect_tags,
+    critical_stylesheet_html,
+    load_stylesheet,
+    parse_stylesheet,
+    selector_tags,
+)
+
+STYLESHEET = """
+@charset "utf-8";
+/* the page */
+body {
+  color: #f0e6d1;
+  margin: 0;
+}
+
+h1,
+h2, h3 {
+  color: #dda15e;
+}
+
+pre code { padding: 0; }
+a:hover, .nav > li a { color: #f4a261; }
+:is(p, li) { margin: 0; }
+* { scrollbar-width: thin; }
+
+@media (max-width: 600px) {
+  h2 { font-size: 1em; }
+  p { font-size: 0.9em; }
+}
+
+@font-face {
+  font-family: "Luminari";
+  src: url(/luminari.woff2);
+}
+"""
+
+
+class TestCss(unittest.TestCase):
+
+    def test_selector_tags(self):
+        self.assertEqual(selector_tags("pre code"), {"pre", "code"})
+        self.assertEqual(selector_tags("a:hover"), {"a"})
+        self.assertEqual(selector_tags(".nav > LI a[href]"), {"li", "a"})
+        self.assertEqual(selector_tags("::-webkit-scrollbar"), set())
+        self.assertEqual(selector_tags("*"), set())
+        self.assertEqual(selector_tags("p:not(.x) + ul ~ ol"), {"p", "ul", "ol"})
+
+    def test_critical(self):
+        stylesheet = parse_stylesheet(STYLESHEET)
+        self.assertEqual(
+            stylesheet.critical({"html", "body", "h1", "a"}),
+            '@charset "utf-8";'
+            "body{color:#f0e6d1;margin:0}"
+            "h1{color:#dda15e}"
+            "a:hover{color:#f4a261}"
+            ":is(p, li){margin:0}"
+            "*{scrollbar-width:thin}"
+            '@font-face{font-family:"Luminari";src:url(/luminari.woff2)}',
+        )
+
+    def test_critical_nested(self):
+        stylesheet = parse_stylesheet(STYLESHEET)
+        css = stylesheet.critical({"h2", "pre", "code", "li", "a"})
+        self.assertIn("h2{color:#dda15e}", css)
+        self.assertIn("pre code{padding:0}", css)
+        self.assertIn("a:hover,.nav > li a{color:#f4a261}", css)
+        self.assertIn("@media (max-width:600px){h2{font-size:1em}}", css)
+        self.assertNotIn("body", css)
+
+    def test_critical_is_cached(self):
+        stylesheet = parse_stylesheet(STYLESHEET)
+        css = stylesheet.critical(["p"])
+        self.assertIs(stylesheet.critical({"p"}), css)
+
+    def test_critical_rebases_relative_urls(self):
+        stylesheet = parse_stylesheet(
+            "@import 'print.css';"
+            "body { background: url( 'images/bg.png' ) }"
+            "p { background: url(../dots.svg), url(data:image/png;base64,AA) }"
+            "a { background: url(/top.png), url(https://x.org/a.png) }")
+        self.assertEqual(
+            stylesheet.critical({"body", "p", "a"}, "/boots/css/index.css"),
+            "@import '/boots/css/print.css';"
+            "body{background:url( '/boots/css/images/bg.png' )}"
+            "p{background:url(/boots/dots.svg),url(data:image/png;base64,AA)}"
+            "a{background:url(/top.png),url(https://x.org/a.png)}",
+        )
+        # the same rules inlined for another href are resolved again
+        self.assertIn(
+            "url(/dots.svg)", stylesheet.critical({"p"}, "/css/index.css"))
+
+    def test_load_stylesheet_cache(self):
+        with tempfile.TemporaryDirectory() as dir_path:
+            path = os.path.join(dir_path, "index.css")
+            with open(path, "w") as file:
+                file.write("p { color: red; }")
+            stylesheet = load_stylesheet(path)
+            self.assertIs(load_stylesheet(path), stylesheet)
+
+            with open(path, "w") as file:
+                file.write("p { color: blue; }")
+            os.utime(path, ns=(0, 0))
+            self.assertEqual(load_stylesheet(path).critical({"p"}), "p{color:blue}")
+
+    def test_collect_tags(self):
+        node = markdown_to_html_node("# Title\n\n- a **b**\n\n```\ncode\n```")
+        self.assertEqual(
+            collect_tags(node, {"html"}),
+            {"html", "div", "h1", "ul", "li", "b", "pre", "code"},
+        )
+
+    def test_critical_stylesheet_html(self):
+        html = critical_stylesheet_html("p{color:red}", "/index.css")
+        self.assertTrue(html.startswith("<style>p{color:red}</style>"))
+        self.assertIn('<link rel="preload" href="/index.css" as="style"', html)
+        self.assertIn(
+            '<noscript><link href="/index.css" rel="stylesheet" /></noscript>', html)
+
+
+if __name__ == "__main__":
+    unittest.main()
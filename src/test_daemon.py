@@ -0,0 +1,87 @@
+import os
+import socket
+import tempfile
+import threading
+import unittest
+
+from daemon import BuildServer, send_request
+
+
+class TestDaemon(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "daemon.sock")
+        self.requests = []
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def dispatch(self, request):
+        self.requests.append(request)
+        if "fail" in request:
+            raise ValueError("build failed")
+        return {"pages": request.get("paths", [])}
+
+    def start(self):
+        server = BuildServer(self.path, self.dispatch)
+        thread = threading.Thread(target=server.serve_forever, args=(0.05,))
+        thread.start()
+
+        def stop():
+            server.shutdown()
+            thread.join()
+            server.server_close()
+
+        self.addCleanup(stop)
+        return server
+
+    def test_requests(self):
+        self.start()
+        self.assertEqual(send_request(self.path, {"command": "ping"}), {"ok": True})
+        self.assertEqual(
+            send_request(self.path, {"paths": ["content/index.md"]}),
+            {"pages": ["content/index.md"], "ok": True},
+        )
+        self.assertEqual(
+            send_request(self.path, {"fail": True}),
+            {"ok": False, "error": "build failed"},
+        )
+        self.assertEqual(
+            send_request(self.path, ["not", "an", "object"])["ok"], False)
+        self.assertEqual(len(self.requests), 2)
+
+    def test_several_requests_on_one_connection(self):
+        self.start()
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.connect(self.path)
+            sock.sendall(b'{"paths": ["a.md"]}\n\n{"paths": ["b.md"]}\n')
+            with sock.makefile("rb") as file:
+                self.assertIn(b'"a.md"', file.readline())
+                self.assertIn(b'"b.md"', file.readline())
+
+    def test_stop(self):
+        server = BuildServer(self.path, self.dispatch)
+        thread = threading.Thread(target=server.serve_forever, args=(0.05,))
+        thread.start()
+        self.assertEqual(send_request(self.path, {"command": "stop"}), {"ok": True})
+        thread.join(5)
+        self.assertFalse(thread.is_alive())
+        server.server_close()
+        self.assertFalse(os.path.exists(self.path))
+
+    def test_stale_socket(self):
+        # a socket left by a daemon that is gone is replaced
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.bind(self.path)
+        self.start()
+        self.assertEqual(send_request(self.path, {"command": "ping"}), {"ok": True})
+
+    def test_running_daemon(self):
+        self.start()
+        with self.assertRaises(OSError):
+            BuildServer(self.path, self.dispatch)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,93 @@
+import os
+import tempfile
+import unittest
+
+from discover import PathFilter, walk_files
+
+
+class TestDiscover(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = os.path.join(self.tmp.name, "content")
+        for path in (
+            "index.md",
+            "blog/tom/index.md",
+            "blog/tom/notes.tmp",
+            "blog/_drafts/idea.md",
+            "contact/index.md",
+        ):
+            self.write(path)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def write(self, path):
+        path = os.path.join(self.root, path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w") as file:
+            file.write("# Title")
+
+    def relatives(self, root=None, path_filter=None, **kwargs):
+        return [
+            relative.replace(os.sep, "/")
+            for _, relative in walk_files(
+                root or self.root, path_filter, **kwargs)
+        ]
+
+    def test_walk_files(self):
+        self.assertEqual(self.relatives(), [
+            "blog/_drafts/idea.md",
+            "blog/tom/index.md",
+            "blog/tom/notes.tmp",
+            "contact/index.md",
+            "index.md",
+        ])
+        path, relative = next(walk_files(self.root))
+        self.assertEqual(path, os.path.join(self.root, relative))
+
+    def test_filter(self):
+        path_filter = PathFilter(include=["*.md"], exclude=["_*", "contact/*"])
+        self.assertEqual(
+            self.relatives(path_filter=path_filter),
+            ["blog/tom/index.md", "index.md"],
+        )
+
+    def test_filter_is_relative_to_base(self):
+        path_filter = PathFilter(exclude=["blog/tom"])
+        blog = os.path.join(self.root, "blog")
+        self.assertEqual(
+            self.relatives(blog, path_filter, base=self.root),
+            ["_drafts/idea.md"],
+        )
+
+    def test_allows(self):
+        path_filter = PathFilter(include=["*.md"], exclude=["_*"])
+        self.assertTrue(path_filter.allows("blog/tom/index.md", True))
+        self.assertFalse(path_filter.allows("blog/tom/notes.tmp", True))
+        self.assertFalse(path_filter.allows("blog/_drafts/idea.md", True))
+        self.assertFalse(path_filter.allows("blog/_drafts", False))
+        self.assertTrue(path_filter.allows("blog", False))
+        self.assertFalse(PathFilter())
+
+    def test_symlink_loop(self):
+        os.symlink(self.root, os.path.join(self.root, "blog", "loop"))
+        os.symlink(
+            os.path.join(self.root, "contact"),
+            os.path.join(self.root, "blog", "contact"))
+        relatives = self.relatives()
+        self.assertIn("blog/contact/index.md", relatives)
+        self.assertFalse(any("loop" in relative for relative in relatives))
+
+        relatives = self.relatives(follow_symlinks=False)
+        self.assertNotIn("blog/contact/index.md", relatives)
+
+    def test_broken_symlink(self):
+        os.symlink(
+            os.path.join(self.root, "missing.md"),
+            os.path.join(self.root, "broken.md"))
+        self.assertNotIn("broken.md", self.relatives())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,3 +1,4 @@
+import io
 import unittest
 
 from htmlnode import HTMLNode, ParentNode, LeafNode
@@ -145,6 +146,35 @@ class TestHTMLNode(unittest.TestCase):
             "<h2><b>Bold text</b>Normal text<i>Italic text</i>Normal text</h2>"
         )
 
+    def test_iter_html(self):
+        node = ParentNode(
+            "p",
+            [
+                LeafNode("b", "Bold text"),
+                ParentNode("i", [LeafNode(None, "Italic text")]),
+            ]
+        )
+        self.assertEqual(
+            list(node.iter_html()),
+            ["<p>", "<b>Bold text</b>", "<i>", "Italic text", "</i>", "</p>"]
+        )
+
+    def test_write_to(self):
+        node = ParentNode(
+            "div",
+            [
+                ParentNode("span", [LeafNode("b", "grandchild")]),
+                LeafNode("a", "link", {"href": "https://boot.dev"}),
+            ]
+        )
+        file = io.StringIO()
+        node.write_to(file)
+        self.assertEqual(file.getvalue(), node.to_html())
+
+    def test_parent_without_children(self):
+        node = ParentNode("div", None)
+        self.assertRaises(ValueError, node.to_html)
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,145 @@
+import os
+import struct
+import tempfile
+import unittest
+
+from block_markdown import iter_markdown_html, markdown_to_html_node
+from images import (
+    ImageCache,
+    annotate_images,
+    load_image_cache,
+    probe_image,
+    resolve_image_url,
+)
+
+
+def png_header(width, height):
+    return (
+        b"\x89PNG\r\n\x1a\n" + struct.pack(">I", 13) + b"IHDR"
+        + struct.pack(">II", width, height) + b"\x08\x06\x00\x00\x00"
+    )
+
+
+def jpeg_header(width, height):
+    app0 = b"JFIF\x00\x01\x01\x00\x00\x01\x00\x01\x00\x00"
+    return (
+        b"\xff\xd8"
+        + b"\xff\xe0" + struct.pack(">H", len(app0) + 2) + app0
+        + b"\xff\xff\xc2" + struct.pack(">HBHH", 17, 8, height, width)
+        + b"\x03" + b"\x00" * 9
+    )
+
+
+def webp_header(chunk, payload):
+    return b"RIFF" + struct.pack("<I", 100) + b"WEBP" + chunk + payload
+
+
+class TestImages(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.dir = self.tmp.name
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def write(self, name, data):
+        path = os.path.join(self.dir, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "wb") as file:
+            file.write(data)
+        return path
+
+    def probe(self, data):
+        return probe_image(self.write("image", data))
+
+    def test_probe_png(self):
+        self.assertEqual(self.probe(png_header(1100, 438)), (1100, 438))
+
+    def test_probe_gif(self):
+        self.assertEqual(self.probe(b"GIF89a" + struct.pack("<HH", 16, 9)), (16, 9))
+
+    def test_probe_jpeg(self):
+        self.assertEqual(self.probe(jpeg_header(640, 480)), (640, 480))
+
+    def test_probe_webp(self):
+        vp8 = struct.pack("<I", 20) + b"\x00\x00\x00\x9d\x01\x2a" + struct.pack(
+            "<HH", 320, 200)
+        self.assertEqual(self.probe(webp_header(b"VP8 ", vp8)), (320, 200))
+
+        bits = (320 - 1) | ((200 - 1) << 14)
+        vp8l = struct.pack("<I", 5) + b"\x2f" + bits.to_bytes(4, "little")
+        self.assertEqual(self.probe(webp_header(b"VP8L", vp8l)), (320, 200))
+
+        vp8x = struct.pack("<I", 10) + b"\x00" * 4 + (319).to_bytes(
+            3, "little") + (199).to_bytes(3, "little")
+        self.assertEqual(self.probe(webp_header(b"VP8X", vp8x)), (320, 200))
+
+    def test_probe_unknown(self):
+        self.assertIsNone(self.probe(b"not an image"))
+        self.assertIsNone(self.probe(b"\xff\xd8\xff"))
+
+    def test_probe_static_image(self):
+        path = os.path.join(
+            os.path.dirname(__file__), "..", "static", "images", "tom.png")
+        if not os.path.exists(path):
+            self.skipTest("no static images")
+        self.assertEqual(probe_image(path), (928, 468))
+
+    def test_cache_skips_unchanged_images(self):
+        self.write("images/a.png", png_header(10, 20))
+        self.write("images/b.gif", b"GIF87a" + struct.pack("<HH", 3, 4))
+        self.write("index.css", b"body {}")
+        files = ["images/a.png", "images/b.gif", "index.css"]
+        cache = ImageCache()
+        sizes = cache.sizes(self.dir, files)
+        self.assertEqual(sizes, {"/images/a.png": (10, 20), "/images/b.gif": (3, 4)})
+        self.assertEqual(cache.probed, 2)
+
+        cache_path = os.path.join(self.dir, "images.json")
+        cache.save(cache_path)
+        cache = load_image_cache(cache_path)
+        self.assertEqual(cache.sizes(self.dir, files), sizes)
+        self.assertEqual(cache.probed, 0)
+
+        path = self.write("images/a.png", png_header(30, 40))
+        os.utime(path, ns=(0, 0))
+        self.assertEqual(
+            cache.sizes(self.dir, ["images/a.png"]), {"/images/a.png": (30, 40)})
+        self.assertEqual(cache.probed, 1)
+        self.assertEqual(
+            list(cache.state["images"]), [os.path.join(self.dir, "images/a.png")])
+
+    def test_resolve_image_url(self):
+        self.assertEqual(resolve_image_url("/images/a.png", "/blog/tom/"), "/images/a.png")
+        self.assertEqual(resolve_image_url("a.png?v=2", "/blog/tom/"), "/blog/tom/a.png")
+        self.assertEqual(resolve_image_url("../a.png", "/blog/tom/"), "/blog/a.png")
+        self.assertIsNone(resolve_image_url("https://example.com/a.png", "/"))
+        self.assertIsNone(resolve_image_url("//example.com/a.png", "/"))
+
+    def test_annotate_images(self):
+        node = markdown_to_html_node(
+            "# Title\n\n![a](/images/a.png) and ![b](https://example.com/b.png)")
+        annotate_images(node, {"/images/a.png": (10, 20)}, "/")
+        self.assertEqual(
+            node.to_html(),
+            '<div><h1>Title</h1><p><img src="/images/a.png" alt="a" width="10" '
+            'height="20" loading="lazy" decoding="async"></img> and <img '
+            'src="https://example.com/b.png" alt="b" loading="lazy" '
+            'decoding="async"></img></p></div>',
+        )
+
+    def test_annotate_streamed_blocks(self):
+        markdown = "# Title\n\n- ![a](a.png)\n\n> quote"
+        sizes = {"/blog/a.png": (1, 2)}
+        node = markdown_to_html_node(markdown)
+        annotate_images(node, sizes, "/blog/")
+        streamed = "".join(iter_markdown_html(
+            markdown.split("\n"),
+            on_node=lambda block: annotate_images(block, sizes, "/blog/"),
+        ))
+        self.assertEqual(streamed, node.to_html())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,3 +1,4 @@
+import random
 import unittest
 from inline_markdown import (
     text_to_textnodes,
@@ -244,3 +245,49 @@ class TestInlineMarkdown(unittest.TestCase):
             ],
             new_nodes
         )
+
+
+def five_pass_textnodes(text):
+    nodes = [TextNode(text, TextType.TEXT)]
+    nodes = split_nodes_delimiter(nodes, "**", TextType.BOLD)
+    nodes = split_nodes_delimiter(nodes, "_", TextType.ITALIC)
+    nodes = split_nodes_delimiter(nodes, "`", TextType.CODE)
+    nodes = split_nodes_image(nodes)
+    nodes = split_nodes_link(nodes)
+    return nodes
+
+
+class TestSinglePassTokenizer(unittest.TestCase):
+
+    pieces = [
+        "a", "word", " ", "!", "[", "]", "(", ")", "*", "**", "_", "`",
+        "[link](https://boot.dev)", "![image](/images/tom.png)",
+        "[a](x![b)](c)", "!![i](u)",
+    ]
+
+    def assertSameNodes(self, text):
+        try:
+            expected = five_pass_textnodes(text)
+        except ValueError:
+            self.assertRaises(ValueError, text_to_textnodes, text)
+            return
+        self.assertEqual(expected, text_to_textnodes(text), text)
+
+    def test_empty(self):
+        self.assertEqual([], text_to_textnodes(""))
+
+    def test_nested_delimiters(self):
+        self.assertSameNodes("**bold _not italic_** and _italic `not code`_")
+        self.assertSameNodes("_a **b** c_")
+        self.assertSameNodes("`a **b** c`")
+
+    def test_links_inside_delimiters(self):
+        self.assertSameNodes("**[bold](https://boot.dev)** [x](y)")
+        self.assertSameNodes("[snake_case_link](https://boot.dev)")
+
+    def test_differential(self):
+        rng = random.Random(1234)
+        for _ in range(5000):
+            text = "".join(rng.choice(self.pieces)
+                           for _ in range(rng.randint(0, 20)))
+            self.assertSameNodes(text)
@@ -0,0 +1,62 @@
+import os
+import unittest
+
+from listing import listing_pages, slugify, sort_posts
+
+
+def post(name, date=None, tags=()):
+    return {"url": f"/blog/{name}/", "title": name.title(), "date": date,
+            "tags": list(tags)}
+
+
+class TestListing(unittest.TestCase):
+
+    def test_slugify(self):
+        self.assertEqual(slugify("Middle_Earth"), "middle-earth")
+        self.assertEqual(slugify("  C++ "), "c")
+
+    def test_sort_posts(self):
+        posts = [post("b"), post("old", "2023-01-01"), post("a"),
+                 post("new", "2024-01-01")]
+        self.assertEqual(
+            [p["title"] for p in sort_posts(posts)], ["New", "Old", "A", "B"])
+
+    def test_listing_pages(self):
+        posts = [post(f"p{index}", f"2024-01-{index + 1:02d}", ["tolkien"])
+                 for index in range(5)]
+        posts.append(post("tom", "2023-01-01T10:00:00", ["opinion", "Tolkien"]))
+        pages = listing_pages(posts, "Blog", "/blog/", "docs/blog", per_page=2)
+
+        dest_paths = [dest_path for dest_path, _, _ in pages]
+        self.assertEqual(dest_paths, [
+            os.path.join("docs/blog", "index.html"),
+            os.path.join("docs/blog", "page", "2", "index.html"),
+            os.path.join("docs/blog", "page", "3", "index.html"),
+            os.path.join("docs/blog", "tags", "opinion", "index.html"),
+            os.path.join("docs/blog", "tags", "tolkien", "index.html"),
+            os.path.join("docs/blog", "tags", "tolkien", "page", "2", "index.html"),
+            os.path.join("docs/blog", "tags", "tolkien", "page", "3", "index.html"),
+        ])
+        self.assertEqual(pages[1][1], "Blog, page 2")
+
+        html = pages[0][2].to_html()
+        self.assertIn('<a href="/blog/p4/">P4</a>', html)
+        self.assertIn('<time datetime="2024-01-05">2024-01-05</time>', html)
+        self.assertIn('<a href="/blog/page/2/">Older &gt;</a>', html)
+        self.assertNotIn("Newer", html)
+
+        html = pages[2][2].to_html()
+        self.assertIn('<a href="/blog/page/2/">&lt; Newer</a>', html)
+        self.assertIn(
+            '<a href="/blog/tags/opinion/">opinion</a>, '
+            '<a href="/blog/tags/tolkien/">Tolkien</a>', html)
+        self.assertNotIn("Older", html)
+
+    def test_empty_listing(self):
+        pages = listing_pages([], "Blog", "/blog/", "docs/blog")
+        self.assertEqual(len(pages), 1)
+        self.assertIn("Nothing here yet.", pages[0][2].to_html())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,251 @@
+import contextlib
+import io
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+
+import main
+from watch import Changes
+
+TEMPLATE = "<title>{{ Title }}</title><body>{{ Content }}</body>"
+PAGES = {
+    "index.md": "# Home\n\nWelcome",
+    "blog/tom/index.md": "# Tom\n\nA post",
+    "blog/glorfindel/index.md": "# Glorfindel\n\nAnother post",
+    "contact/index.md": "# Contact\n\nCall me",
+}
+# module state that main() and the worker initializer set
+STATE = (
+    "settings", "search_index", "parse_cache", "image_cache",
+    "metadata_index", "content_filter",
+)
+
+
+class SiteTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.cwd = os.getcwd()
+        os.chdir(self.tmp.name)
+        self.state = {name: getattr(main, name) for name in STATE}
+        self.write("template.html", TEMPLATE)
+        for path, text in PAGES.items():
+            self.write(os.path.join("content", path), text)
+
+    def tearDown(self):
+        for name, value in self.state.items():
+            setattr(main, name, value)
+        os.chdir(self.cwd)
+        self.tmp.cleanup()
+
+    def write(self, path, text):
+        dir_path = os.path.dirname(path)
+        if dir_path != "":
+            os.makedirs(dir_path, exist_ok=True)
+        with open(path, "w") as file:
+            file.write(text)
+
+    def read(self, path):
+        with open(path) as file:
+            return file.read()
+
+    def run_main(self, *argv):
+        output = io.StringIO()
+        argv_before = sys.argv
+        sys.argv = ["main.py", "/"] + list(argv)
+        try:
+            with contextlib.redirect_stdout(output):
+                main.main()
+        finally:
+            sys.argv = argv_before
+        return output.getvalue()
+
+    def logged_pages(self, output):
+        return [
+            line.split()[1] for line in output.splitlines()
+            if line.startswith(" * ./content")
+        ]
+
+
+class TestBuildPages(SiteTestCase):
+
+    def test_process_pool(self):
+        pages = main.find_pages(main.dir_path_content, main.dir_path_public)
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            main.build_pages(pages, main.templat_path, "/", jobs=2)
+
+        # pages are logged in the order they were found, whichever worker
+        # finished first
+        self.assertEqual(
+            self.logged_pages(output.getvalue()),
+            [src_path for src_path, _ in pages])
+        for src_path, dest_path in pages:
+            self.assertTrue(os.path.isfile(dest_path), dest_path)
+        self.assertEqual(
+            self.read(os.path.join("docs", "blog", "tom", "index.html")),
+            "<title>Tom</title><body><div><h1>Tom</h1><p>A post</p></div></body>",
+        )
+
+    def test_kept_worker_pool(self):
+        main.keep_worker_pool = True
+        try:
+            pages = main.find_pages(main.dir_path_content, main.dir_path_public)
+            with contextlib.redirect_stdout(io.StringIO()):
+                main.build_pages(pages, main.templat_path, "/", jobs=2)
+            with main.worker_pool(2) as first:
+                pass
+            with main.worker_pool(2) as second:
+                pass
+            # the daemon's requests share workers until their settings change
+            self.assertIs(first, second)
+            main.settings = main.settings._replace(image_sizes={})
+            with main.worker_pool(2) as third:
+                pass
+            self.assertIsNot(first, third)
+            self.assertIs(main.kept_worker_pool[1], third)
+        finally:
+            main.close_worker_pool()
+            main.keep_worker_pool = False
+        self.assertIsNone(main.kept_worker_pool)
+
+    def test_init_worker(self):
+        main.init_worker(main.RenderSettings(search=True, keep_parse_cache=True))
+        self.assertTrue(main.settings.search)
+        self.assertEqual(main.settings.stream_threshold, 8 * 1024 * 1024)
+        # the daemon's workers keep parsed pages in memory only
+        self.assertIsNone(main.parse_cache.root)
+        self.assertEqual(main.parse_cache.entries, {})
+
+        main.init_worker(main.RenderSettings())
+        self.assertIsNone(main.parse_cache)
+
+    def test_stream_page(self):
+        path = os.path.join("content", "long.md")
+        self.write(path, "intro\n\n## Sub\n\n# The Title\n\n```\ncode\n```")
+        dest_path = os.path.join("docs", "long.html")
+        result = main.stream_page(path, main.templat_path, dest_path, "/")
+        self.assertEqual(result.title, "The Title")
+        self.assertEqual(
+            self.read(dest_path),
+            "<title>The Title</title><body><div><p>intro</p><h2>Sub</h2>"
+            "<h1>The Title</h1><pre><code>code\n</code></pre></div></body>",
+        )
+
+
+class TestMain(SiteTestCase):
+
+    def test_rebuild_without_compress(self):
+        self.run_main("--compress")
+        contact = os.path.join("docs", "contact", "index.html")
+        home = os.path.join("docs", "index.html")
+        self.assertTrue(os.path.isfile(contact + ".gz"))
+
+        # a sidecar left next to a replaced page would be served in its place
+        self.write(os.path.join("content", "contact", "index.md"), "# Moved")
+        self.run_main("--incremental")
+        self.assertIn("<h1>Moved</h1>", self.read(contact))
+        self.assertFalse(os.path.exists(contact + ".gz"))
+        self.assertTrue(os.path.isfile(home + ".gz"))
+
+    def test_non_utf8_locale(self):
+        # pages are read and written as utf-8 whatever the locale, by every
+        # render path; here the locale's encoding is ascii
+        self.write(os.path.join("content", "index.md"), "# Café\n\nNaïve")
+        env = dict(
+            os.environ, LC_ALL="C", PYTHONCOERCECLOCALE="0", PYTHONUTF8="0")
+        outputs = []
+        for argv in ([], ["--parse-cache"], ["--pipeline"],
+                     ["--stream-threshold", "0"]):
+            subprocess.run(
+                [sys.executable, os.path.abspath(main.__file__), "/", "--clean"]
+                + argv, env=env, check=True, capture_output=True)
+            with open(os.path.join("docs", "index.html"), "rb") as file:
+                outputs.append(file.read())
+        self.assertIn("<h1>Café</h1>".encode(), outputs[0])
+        self.assertEqual(outputs, [outputs[0]] * 4)
+
+    def test_incremental(self):
+        output = self.run_main("--incremental")
+        self.assertIn("Rebuilt 4 of 4 pages", output)
+        self.assertIn("Rebuilt 0 of 4 pages", self.run_main("--incremental"))
+
+        self.write(os.path.join("content", "contact", "index.md"), "# Moved")
+        output = self.run_main("--incremental")
+        self.assertEqual(
+            self.logged_pages(output), ["./content/contact/index.md"])
+
+        os.remove(os.path.join("content", "contact", "index.md"))
+        output = self.run_main("--incremental", "-j", "2")
+        self.assertIn("Rebuilt 0 of 3 pages", output)
+        self.assertFalse(os.path.exists(os.path.join("docs", "contact")))
+
+    def test_rebuild_changes(self):
+        self.run_main()
+        args = main.parse_args(["/"])
+        manifest = main.load_manifest(main.manifest_path)
+
+        path = os.path.join("content", "blog", "new.md")
+        self.write(path, "# New")
+        os.remove(os.path.join("content", "index.md"))
+        with contextlib.redirect_stdout(io.StringIO()):
+            main.rebuild_changes(
+                Changes({path, os.path.join("content", "index.md")}),
+                manifest, "/", args)
+
+        self.assertTrue(os.path.isfile(os.path.join("docs", "blog", "new.html")))
+        self.assertFalse(os.path.exists(os.path.join("docs", "index.html")))
+        self.assertIn("./content/blog/new.md", manifest["pages"])
+        self.assertNotIn("./content/index.md", manifest["pages"])
+
+    def test_listings(self):
+        self.write(
+            os.path.join("content", "blog", "tom", "index.md"),
+            "---\ndate: 2024-03-01\ntags: tolkien\n---\n# Tom\n")
+        self.run_main("--listings")
+        listing = self.read(os.path.join("docs", "blog", "index.html"))
+        self.assertIn('<a href="/blog/tom/">Tom</a>', listing)
+        self.assertIn('<a href="/blog/glorfindel/">Glorfindel</a>', listing)
+        self.assertTrue(os.path.isfile(os.path.join(
+            "docs", "blog", "tags", "tolkien", "index.html")))
+
+        self.run_main()
+        self.assertFalse(os.path.exists(os.path.join("docs", "blog", "tags")))
+
+
+class TestMerge(SiteTestCase):
+
+    def merge(self, *argv):
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            try:
+                main.merge_shards(list(argv))
+            except SystemExit as e:
+                return output.getvalue() + str(e)
+        return output.getvalue()
+
+    def test_merge(self):
+        self.write(
+            os.path.join("content", "draft.md"), "---\ndraft: true\n---\n# D")
+        for shard in ("1/2", "2/2"):
+            self.run_main("--shard", shard)
+        self.assertIn("Merged 2 shards covering 4 pages", self.merge())
+        self.assertIn(
+            "./content/draft.md was not built by any shard",
+            self.merge("--drafts"))
+
+    def test_merge_with_filter(self):
+        for shard in ("1/2", "2/2"):
+            self.run_main("--shard", shard, "--exclude", "contact")
+        self.assertIn("Merged 2 shards covering 3 pages", self.merge())
+
+        self.run_main("--shard", "2/2")
+        self.assertIn(
+            "shards were built with different --include/--exclude",
+            self.merge())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,112 @@
+import os
+import tempfile
+import unittest
+
+from manifest import (
+    hash_file,
+    load_manifest,
+    save_manifest,
+    plan_build,
+)
+
+
+class TestManifest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.dir = self.tmp.name
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def write(self, name, text):
+        path = os.path.join(self.dir, name)
+        with open(path, "w") as file:
+            file.write(text)
+        return path
+
+    def test_hash_file(self):
+        path_a = self.write("a.md", "# A")
+        path_b = self.write("b.md", "# A")
+        path_c = self.write("c.md", "# C")
+        self.assertEqual(hash_file(path_a), hash_file(path_b))
+        self.assertNotEqual(hash_file(path_a), hash_file(path_c))
+
+    def test_load_missing(self):
+        path = os.path.join(self.dir, "manifest.json")
+        self.assertIsNone(load_manifest(path))
+
+    def test_save_and_load(self):
+        src = self.write("a.md", "# A")
+        manifest, _, _ = plan_build(None, [(src, "a.html")], "t", "/")
+        path = os.path.join(self.dir, "build", "manifest.json")
+        save_manifest(path, manifest)
+        self.assertEqual(manifest, load_manifest(path))
+
+    def test_first_build_is_full(self):
+        src_a = self.write("a.md", "# A")
+        src_b = self.write("b.md", "# B")
+        pages = [(src_a, "a.html"), (src_b, "b.html")]
+        _, stale, removed = plan_build(None, pages, "t", "/")
+        self.assertEqual(pages, stale)
+        self.assertEqual([], removed)
+
+    def test_only_changed_pages_are_stale(self):
+        src_a = self.write("a.md", "# A")
+        src_b = self.write("b.md", "# B")
+        dest_a = self.write("a.html", "")
+        dest_b = self.write("b.html", "")
+        pages = [(src_a, dest_a), (src_b, dest_b)]
+        manifest, _, _ = plan_build(None, pages, "t", "/")
+
+        self.write("b.md", "# B changed")
+        _, stale, removed = plan_build(manifest, pages, "t", "/")
+        self.assertEqual([(src_b, dest_b)], stale)
+        self.assertEqual([], removed)
+
+    def test_pages_are_read_once(self):
+        src_a = self.write("a.md", "# A")
+        src_b = self.write("b.md", "# B")
+        manifest, _, _ = plan_build(
+            None, [(src_a, "a.html"), (src_b, "b.html")], "t", "/")
+
+        # a generator, like the walk of the content tree
+        pages = (page for page in [(src_a, "a.html")])
+        new, _, removed = plan_build(manifest, pages, "t", "/")
+        self.assertEqual(list(new["pages"]), [src_a])
+        self.assertEqual(removed, ["b.html"])
+
+    def test_template_or_basepath_change_is_full(self):
+        src = self.write("a.md", "# A")
+        dest = self.write("a.html", "")
+        pages = [(src, dest)]
+        manifest, _, _ = plan_build(None, pages, "t", "/")
+
+        _, stale, _ = plan_build(manifest, pages, "t2", "/")
+        self.assertEqual(pages, stale)
+        _, stale, _ = plan_build(manifest, pages, "t", "/boots/")
+        self.assertEqual(pages, stale)
+
+    def test_missing_output_is_stale(self):
+        src = self.write("a.md", "# A")
+        dest = os.path.join(self.dir, "a.html")
+        pages = [(src, dest)]
+        manifest, _, _ = plan_build(None, pages, "t", "/")
+
+        _, stale, _ = plan_build(manifest, pages, "t", "/")
+        self.assertEqual(pages, stale)
+
+    def test_removed_source(self):
+        src_a = self.write("a.md", "# A")
+        src_b = self.write("b.md", "# B")
+        dest_a = self.write("a.html", "")
+        pages = [(src_a, dest_a), (src_b, "b.html")]
+        manifest, _, _ = plan_build(None, pages, "t", "/")
+
+        _, stale, removed = plan_build(manifest, pages[:1], "t", "/")
+        self.assertEqual([], stale)
+        self.assertEqual(["b.html"], removed)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,113 @@
+import os
+import tempfile
+import unittest
+
+from metadata import (
+    MetadataIndex,
+    load_metadata_index,
+    parse_front_matter,
+    read_header,
+    split_front_matter,
+    split_front_matter_lines,
+)
+
+PAGE = """---
+title: "A Post"
+date: 2024-03-01
+tags: [tolkien, 'opinion', ]
+draft: yes
+layout: post
+# a comment
+---
+# Heading
+
+body
+"""
+
+
+class TestMetadata(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "page.md")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def write(self, text):
+        with open(self.path, "w") as file:
+            file.write(text)
+
+    def test_split_front_matter(self):
+        meta, body = split_front_matter(PAGE)
+        self.assertEqual(meta, {
+            "title": "A Post",
+            "date": "2024-03-01T00:00:00",
+            "tags": ["tolkien", "opinion"],
+            "draft": True,
+            "layout": "post",
+        })
+        self.assertEqual(body, "# Heading\n\nbody\n")
+
+    def test_without_front_matter(self):
+        self.assertEqual(split_front_matter("# Title\n---\n"), ({}, "# Title\n---\n"))
+        self.assertEqual(split_front_matter(""), ({}, ""))
+        self.assertEqual(split_front_matter("---\n---"), ({}, ""))
+
+    def test_split_front_matter_lines(self):
+        meta, lines = split_front_matter_lines(iter(PAGE.split("\n")))
+        self.assertEqual(meta, split_front_matter(PAGE)[0])
+        self.assertEqual(list(lines), ["# Heading", "", "body", ""])
+
+        meta, lines = split_front_matter_lines(iter(["# Title", "text"]))
+        self.assertEqual((meta, list(lines)), ({}, ["# Title", "text"]))
+
+    def test_invalid_front_matter(self):
+        for lines in (
+            ["date: tomorrow"],
+            ["draft: maybe"],
+            ["layout: ../secret"],
+            ["no separator"],
+        ):
+            with self.assertRaises(ValueError):
+                parse_front_matter(lines)
+        with self.assertRaises(ValueError):
+            split_front_matter("---\ntitle: open\n")
+        with self.assertRaises(ValueError):
+            split_front_matter_lines(iter(["---", "title: open"]))
+
+    def test_read_header(self):
+        self.write(PAGE)
+        self.assertEqual(read_header(self.path)[1], "A Post")
+        self.write("---\ndate: 2024-03-01\n---\n\nintro\n\n# Heading\n\nbody")
+        self.assertEqual(
+            read_header(self.path), ({"date": "2024-03-01T00:00:00"}, "Heading"))
+
+    def test_index(self):
+        self.write(PAGE)
+        index = MetadataIndex()
+        self.assertEqual(index.get(self.path)["title"], "A Post")
+        self.assertEqual(index.get(self.path)["meta"]["layout"], "post")
+        self.assertEqual(index.scanned, 1)
+
+        save_path = os.path.join(self.tmp.name, "metadata.json")
+        index.save(save_path)
+        index = load_metadata_index(save_path)
+        index.get(self.path)
+        self.assertEqual(index.scanned, 0)
+
+        self.write("# Changed title\n")
+        self.assertEqual(index.get(self.path)["title"], "Changed title")
+        self.assertEqual(index.scanned, 1)
+
+        index.prune(set())
+        self.assertEqual(index.state["pages"], {})
+
+    def test_index_names_the_page_on_errors(self):
+        self.write("---\ndraft: maybe\n---\n# Title\n")
+        with self.assertRaisesRegex(ValueError, "page.md"):
+            MetadataIndex().get(self.path)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,66 @@
+import unittest
+
+from minify import Minifier, minify_fragments, minify_html
+
+
+class TestMinify(unittest.TestCase):
+
+    def test_collapse_whitespace(self):
+        self.assertEqual(minify_html("<p>a \t\n b</p>"), "<p>a b</p>")
+        self.assertEqual(minify_html("<p>a\nb</p>"), "<p>a b</p>")
+        self.assertEqual(minify_html("<b>a</b> <i>b</i>"), "<b>a</b> <i>b</i>")
+
+    def test_remove_line_breaks_between_tags(self):
+        self.assertEqual(
+            minify_html("<ul>\n  <li>a</li>\n\n  <li>b</li>\n</ul>"),
+            "<ul><li>a</li><li>b</li></ul>",
+        )
+        self.assertEqual(minify_html("<b>a</b>  <i>b</i>"), "<b>a</b> <i>b</i>")
+        self.assertEqual(
+            minify_html("<!DOCTYPE html>\n<html>\n<!-- x -->\n<HEAD>"),
+            "<!DOCTYPE html><html><!-- x --><HEAD>",
+        )
+
+    def test_keep_space_between_inline_tags(self):
+        self.assertEqual(
+            minify_html("<p>\n<a>One</a>\n  <a>Two</a>\n</p>"),
+            "<p><a>One</a> <a>Two</a></p>",
+        )
+        self.assertEqual(
+            minify_html("<li><b>a</b>\n<br>\n<img src=\"x\">\n</li>"),
+            "<li><b>a</b><br><img src=\"x\"></li>",
+        )
+        self.assertEqual(
+            minify_html("<b>a</b>\n<!-- x -->\n<i>b</i>"),
+            "<b>a</b> <!-- x --> <i>b</i>",
+        )
+
+    def test_keep_raw_elements(self):
+        for tag in ("pre", "textarea", "script", "style"):
+            html = f"<{tag} class=\"x\">\n  a  b\n</{tag}>"
+            self.assertEqual(minify_html(f"<div>\n  {html}\n</div>"), f"<div>{html}</div>")
+
+    def test_nested_raw_elements(self):
+        self.assertEqual(
+            minify_html("<pre>  <pre> a </pre>  b  </pre>  c  d"),
+            "<pre>  <pre> a </pre>  b  </pre> c d",
+        )
+
+    def test_fragments_share_state(self):
+        fragments = ["<div>", "<pre>", "<code>", "x  =  1\n", "</code>", "</pre>", "a  b", "</div>"]
+        self.assertEqual(
+            "".join(minify_fragments(fragments)),
+            "<div><pre><code>x  =  1\n</code></pre>a b</div>",
+        )
+
+    def test_raw_depth(self):
+        minifier = Minifier()
+        minifier.feed("<PRE>")
+        self.assertEqual(minifier.raw_depth, 1)
+        self.assertEqual(minifier.feed("  a  "), "  a  ")
+        minifier.feed("</pre></pre>")
+        self.assertEqual(minifier.raw_depth, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
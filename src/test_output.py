@@ -0,0 +1,93 @@
+import os
+import tempfile
+import unittest
+
+from output import AtomicWriter, same_contents, write_if_changed
+
+
+class TestOutput(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.dir = self.tmp.name
+        self.path = os.path.join(self.dir, "blog", "index.html")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def read(self):
+        with open(self.path) as file:
+            return file.read()
+
+    def test_atomic_writer_creates_file(self):
+        writer = AtomicWriter(self.path)
+        with writer as file:
+            file.write("<p>hello</p>")
+        self.assertTrue(writer.changed)
+        self.assertEqual(self.read(), "<p>hello</p>")
+        self.assertEqual(os.listdir(os.path.dirname(self.path)), ["index.html"])
+
+    def test_atomic_writer_keeps_unchanged_file(self):
+        with AtomicWriter(self.path) as file:
+            file.write("<p>hello</p>")
+        os.utime(self.path, ns=(0, 0))
+        inode = os.stat(self.path).st_ino
+
+        writer = AtomicWriter(self.path)
+        with writer as file:
+            file.write("<p>hello</p>")
+        self.assertFalse(writer.changed)
+        stat = os.stat(self.path)
+        self.assertEqual(stat.st_mtime_ns, 0)
+        self.assertEqual(stat.st_ino, inode)
+
+        writer = AtomicWriter(self.path)
+        with writer as file:
+            file.write("<p>changed</p>")
+        self.assertTrue(writer.changed)
+        self.assertEqual(self.read(), "<p>changed</p>")
+
+    def test_atomic_writer_error_keeps_old_file(self):
+        with AtomicWriter(self.path) as file:
+            file.write("<p>hello</p>")
+
+        with self.assertRaises(ValueError):
+            with AtomicWriter(self.path) as file:
+                file.write("<p>half")
+                raise ValueError("invalid markdown")
+        self.assertEqual(self.read(), "<p>hello</p>")
+        self.assertEqual(os.listdir(os.path.dirname(self.path)), ["index.html"])
+
+    def test_same_contents(self):
+        self.assertTrue(write_if_changed(self.path, "abc"))
+        other = os.path.join(self.dir, "other.html")
+        write_if_changed(other, "abc")
+        self.assertTrue(same_contents(self.path, other))
+        write_if_changed(other, "abd")
+        self.assertFalse(same_contents(self.path, other))
+        self.assertFalse(same_contents(self.path, os.path.join(self.dir, "none")))
+
+    def test_write_if_changed(self):
+        self.assertTrue(write_if_changed(self.path, "abc"))
+        self.assertFalse(write_if_changed(self.path, "abc"))
+        self.assertTrue(write_if_changed(self.path, b"abcd"))
+        self.assertEqual(self.read(), "abcd")
+
+    def test_replacing_removes_sidecars(self):
+        write_if_changed(self.path, "abc")
+        for ext in (".gz", ".br"):
+            write_if_changed(self.path + ext, b"old")
+        self.assertFalse(write_if_changed(self.path, "abc"))
+        self.assertTrue(os.path.exists(self.path + ".gz"))
+
+        with AtomicWriter(self.path) as file:
+            file.write("abcd")
+        self.assertEqual(os.listdir(os.path.dirname(self.path)), ["index.html"])
+
+        write_if_changed(self.path + ".gz", b"old")
+        write_if_changed(self.path, "abcde")
+        self.assertEqual(os.listdir(os.path.dirname(self.path)), ["index.html"])
+
+
+if __name__ == "__main__":
+    unittest.main()
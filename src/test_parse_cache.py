@@ -0,0 +1,146 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import css
+import search
+from block_markdown import markdown_to_html_node, parse_markdown
+from parse_cache import (
+    ParseCache,
+    data_to_node,
+    node_to_data,
+    parser_version,
+    read_markdown,
+)
+
+MARKDOWN = """# The **Title**
+
+Some [linked text](/url) and ![alt](/image.png)
+
+```
+code block
+```
+
+- listed _item_
+"""
+
+
+class TestParseCache(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.dir = self.tmp.name
+        self.root = os.path.join(self.dir, "parse")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_round_trip(self):
+        node = markdown_to_html_node(MARKDOWN)
+        copy = data_to_node(node_to_data(node))
+        self.assertEqual(copy.to_html(), node.to_html())
+        self.assertEqual(repr(copy), repr(node))
+
+    def test_get_and_put(self):
+        cache = ParseCache(self.root)
+        self.assertIsNone(cache.get("ab" * 32))
+
+        node, title = parse_markdown(MARKDOWN)
+        cache.put("ab" * 32, node, title, {"title", "code"})
+
+        cached = ParseCache(self.root).get("ab" * 32)
+        self.assertEqual(cached.html, node.to_html())
+        self.assertEqual(cached.title, "The **Title**")
+        self.assertEqual(cached.terms, {"title", "code"})
+        self.assertEqual(
+            cached.tags, {"div", "h1", "b", "p", "a", "img", "pre", "code", "ul", "li", "i"})
+        self.assertEqual(cached.node().to_html(), node.to_html())
+
+    def test_entries_without_tree(self):
+        cache = ParseCache(self.root)
+        cache.put("cd" * 32, None, "Title", None, "<div></div>", {"div"})
+        cached = cache.get("cd" * 32)
+        self.assertEqual(cached.html, "<div></div>")
+        self.assertEqual(cached.tags, {"div"})
+        self.assertIsNone(cached.node())
+
+    def test_entries_without_terms(self):
+        cache = ParseCache(self.root)
+        node, title = parse_markdown(MARKDOWN)
+        cache.put("cd" * 32, node, title, None)
+        self.assertIsNone(cache.get("cd" * 32).terms)
+
+    def test_corrupt_entry(self):
+        cache = ParseCache(self.root)
+        path = cache.path("ef" * 32)
+        os.makedirs(os.path.dirname(path))
+        with open(path, "wb") as file:
+            file.write(b"\x00garbage")
+        self.assertIsNone(cache.get("ef" * 32))
+
+    def test_entries_are_versioned(self):
+        cache = ParseCache(self.root)
+        self.assertEqual(
+            cache.path("ab" * 32),
+            os.path.join(self.root, parser_version(), "ab", "ab" * 32),
+        )
+
+    def test_version_covers_terms_and_tags(self):
+        # the cached terms and tags come from search and css
+        version = parser_version()
+        for module in (search, css):
+            path = os.path.join(self.dir, os.path.basename(module.__file__))
+            with open(module.__file__, "rb") as src, open(path, "wb") as dest:
+                dest.write(src.read() + b"\n")
+            with mock.patch.object(module, "__file__", path):
+                self.assertNotEqual(parser_version(), version)
+
+    def test_prune(self):
+        cache = ParseCache(self.root)
+        node, title = parse_markdown(MARKDOWN)
+        for digest in ("ab" * 32, "ac" * 32, "cd" * 32):
+            cache.put(digest, node, title, None)
+        old_version = os.path.join(self.root, "0" * 16)
+        os.makedirs(old_version)
+
+        cache.prune({"ab" * 32})
+        self.assertEqual(os.listdir(self.root), [parser_version()])
+        self.assertEqual(os.listdir(cache.dir_path), ["ab"])
+        self.assertIsNotNone(cache.get("ab" * 32))
+        self.assertIsNone(cache.get("ac" * 32))
+
+    def test_memory_only(self):
+        cache = ParseCache(None)
+        node, title = parse_markdown(MARKDOWN)
+        cache.put("ab" * 32, node, title, {"title"})
+        cache.put("cd" * 32, node, title, None)
+        self.assertFalse(os.path.exists(self.root))
+        self.assertEqual(cache.get("ab" * 32).terms, {"title"})
+        self.assertEqual(cache.get("ab" * 32).node().to_html(), node.to_html())
+
+        cache.prune({"ab" * 32})
+        self.assertIsNotNone(cache.get("ab" * 32))
+        self.assertIsNone(cache.get("cd" * 32))
+
+    def test_keep_in_memory(self):
+        node, title = parse_markdown(MARKDOWN)
+        ParseCache(self.root).put("ab" * 32, node, title, None)
+
+        cache = ParseCache(self.root, keep=True)
+        cached = cache.get("ab" * 32)
+        os.remove(cache.path("ab" * 32))
+        self.assertIs(cache.get("ab" * 32), cached)
+
+    def test_read_markdown(self):
+        path = os.path.join(self.dir, "page.md")
+        with open(path, "wb") as file:
+            file.write("# Tïtle\r\n\r\ntext\rmore\n".encode())
+        markdown, digest = read_markdown(path)
+        with open(path, "r") as file:
+            self.assertEqual(markdown, file.read())
+        self.assertEqual(len(digest), 64)
+
+
+if __name__ == "__main__":
+    unittest.main()
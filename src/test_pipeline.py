@@ -0,0 +1,115 @@
+import os
+import tempfile
+import threading
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+from pipeline import Pipeline
+
+
+def read_item(item):
+    return item.upper()
+
+
+class TestPipeline(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.dir = self.tmp.name
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def dest(self, item):
+        return os.path.join(self.dir, item, "index.html")
+
+    def render(self, item, data):
+        return self.dest(item), data.encode(), item
+
+    def test_writes_every_item(self):
+        items = [f"page{index}" for index in range(50)]
+        done = []
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            Pipeline(
+                read_item, self.render, executor,
+                lambda info, changed: done.append((info, changed)),
+                io_workers=4, depth=2, batch_size=4,
+            ).run(items, render_workers=2)
+
+        self.assertEqual(sorted(done), sorted((item, True) for item in items))
+        for item in items:
+            with open(self.dest(item)) as file:
+                self.assertEqual(file.read(), item.upper())
+
+    def test_unchanged_outputs(self):
+        done = []
+        pipeline = Pipeline(
+            read_item, self.render, ThreadPoolExecutor(max_workers=1),
+            lambda info, changed: done.append(changed))
+        pipeline.run(["a", "b"])
+        pipeline.run(["a", "b"])
+        self.assertEqual(done, [True, True, False, False])
+
+    def test_skips_data_written_by_render(self):
+        done = []
+        Pipeline(
+            read_item, lambda item, data: (self.dest(item), None, item),
+            ThreadPoolExecutor(max_workers=1),
+            lambda info, changed: done.append((info, changed)),
+        ).run(["a"])
+        self.assertEqual(done, [("a", None)])
+        self.assertFalse(os.path.exists(os.path.join(self.dir, "a")))
+
+    def test_backpressure(self):
+        # while rendering is stuck, reading stops once the queue is full
+        release = threading.Event()
+        read = []
+        read_when_released = []
+
+        def read_counting(item):
+            read.append(item)
+            return item
+
+        def render_blocked(item, data):
+            release.wait()
+            return self.dest(item), b"", item
+
+        def release_renders():
+            read_when_released.append(len(read))
+            release.set()
+
+        timer = threading.Timer(0.2, release_renders)
+        timer.start()
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            Pipeline(
+                read_counting, render_blocked, executor, io_workers=1, depth=2,
+            ).run([str(index) for index in range(100)])
+        timer.join()
+
+        # two queued, one held by the renderer and one waiting to be queued
+        self.assertLessEqual(read_when_released[0], 4)
+        self.assertEqual(len(read), 100)
+
+    def test_render_on_event_loop(self):
+        done = []
+        Pipeline(
+            read_item, self.render, None,
+            lambda info, changed: done.append(info),
+        ).run(["a", "b", "c"])
+        self.assertEqual(sorted(done), ["a", "b", "c"])
+
+    def test_render_error(self):
+        def render_failing(item, data):
+            if item == "b":
+                raise ValueError("no title")
+            return self.dest(item), b"", item
+
+        pipeline = Pipeline(
+            read_item, render_failing, ThreadPoolExecutor(max_workers=1),
+            io_workers=1, depth=1)
+        with self.assertRaises(ValueError):
+            pipeline.run([str(index) for index in range(20)] + ["b"] + ["c"] * 20)
+
+
+if __name__ == "__main__":
+    unittest.main()
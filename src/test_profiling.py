@@ -0,0 +1,68 @@
+import types
+import unittest
+
+from profiling import Profiler, NULL_SPAN
+
+
+class TestProfiler(unittest.TestCase):
+
+    def test_disabled(self):
+        profiler = Profiler()
+        self.assertIs(profiler.span("read"), NULL_SPAN)
+        with profiler.span("read"):
+            pass
+        self.assertEqual(profiler.events, [])
+
+    def test_span(self):
+        profiler = Profiler()
+        profiler.enable()
+        profiler.page = "index.md"
+        with profiler.span("generate_page"):
+            with profiler.span("read"):
+                pass
+
+        self.assertEqual(
+            [(name, page) for name, page, _, _, _ in profiler.events],
+            [("read", "index.md"), ("generate_page", "index.md")],
+        )
+        trace = profiler.to_trace()["traceEvents"]
+        self.assertEqual(
+            [event["name"] for event in trace], ["generate_page", "read"])
+        self.assertEqual(trace[0]["ph"], "X")
+        self.assertEqual(trace[0]["args"], {"page": "index.md"})
+
+    def test_instrument(self):
+        module = types.SimpleNamespace(double=lambda x: x * 2)
+        profiler = Profiler()
+        profiler.enable()
+        profiler.instrument(module, "double")
+        self.assertEqual(module.double(2), 4)
+        self.assertEqual(profiler.events[0][0], "double")
+
+    def test_instrument_method(self):
+        class Doubler:
+            def double(self, x):
+                return x * 2
+
+        profiler = Profiler()
+        profiler.enable()
+        profiler.instrument(Doubler, "double")
+        self.assertEqual(Doubler().double(2), 4)
+        self.assertEqual(profiler.events[0][0], "double")
+
+    def test_summary(self):
+        profiler = Profiler()
+        profiler.enable()
+        for page in ("a.md", "b.md"):
+            profiler.page = page
+            with profiler.span("generate_page"):
+                pass
+        summary = profiler.summary()
+        self.assertIn("generate_page", summary)
+        self.assertIn("a.md", summary)
+        self.assertEqual(profiler.take_events()[0][1], "a.md")
+        self.assertEqual(profiler.events, [])
+
+
+if __name__ == "__main__":
+    unittest.main()
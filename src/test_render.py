@@ -0,0 +1,70 @@
+import glob
+import os
+import unittest
+
+from block_markdown import parse_markdown
+from bench.corpus import CorpusConfig, generate_markdown
+from css import collect_tags
+from render import markdown_to_html
+from search import TermCollector
+
+CONTENT_DIR = os.path.join(os.path.dirname(__file__), "..", "content")
+
+MARKDOWN = """# The **Title**
+
+Some [linked text](/url) and ![alt](/image.png) with `code` and _italic_
+
+```
+code block
+```
+
+> quoted **bold**
+> text
+
+- listed _item_
+- second
+
+1. first
+2. second
+"""
+
+
+def documents():
+    yield MARKDOWN
+    for path in sorted(glob.glob(
+            os.path.join(CONTENT_DIR, "**", "*.md"), recursive=True)):
+        with open(path) as file:
+            yield file.read()
+    for seed in range(8):
+        yield generate_markdown(CorpusConfig(seed=seed, size=8 * 1024))
+
+
+class TestRender(unittest.TestCase):
+
+    def test_matches_html_node(self):
+        for markdown in documents():
+            collector = TermCollector()
+            node, title = parse_markdown(markdown, collector)
+            texts = []
+            tags = set()
+            html, fast_title = markdown_to_html(markdown, texts, tags)
+            self.assertEqual(html, node.to_html())
+            self.assertEqual(fast_title, title)
+            self.assertEqual(tags, collect_tags(node, set()))
+
+            fast_collector = TermCollector()
+            fast_collector.add_texts(texts)
+            self.assertEqual(fast_collector.terms, collector.terms)
+
+    def test_without_collectors(self):
+        html, title = markdown_to_html("# Hi\n\nthere")
+        self.assertEqual(html, "<div><h1>Hi</h1><p>there</p></div>")
+        self.assertEqual(title, "Hi")
+
+    def test_unclosed_delimiter(self):
+        with self.assertRaises(ValueError):
+            markdown_to_html("some **bold")
+
+
+if __name__ == "__main__":
+    unittest.main()
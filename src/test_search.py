@@ -0,0 +1,163 @@
+import json
+import os
+import tempfile
+import unittest
+
+from block_markdown import (
+    iter_markdown_html,
+    markdown_to_html_node,
+    parse_markdown,
+)
+from search import (
+    SearchIndex,
+    TermCollector,
+    load_index,
+    page_path,
+    text_to_terms,
+)
+
+
+class TestSearch(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.dir = self.tmp.name
+        self.out_dir = os.path.join(self.dir, "search")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def read_json(self, *parts):
+        with open(os.path.join(self.out_dir, *parts)) as file:
+            return json.load(file)
+
+    def test_text_to_terms(self):
+        self.assertEqual(
+            text_to_terms("Tom's a *Mistake*, I think: 42!"),
+            ["tom", "mistake", "think", "42"],
+        )
+
+    def test_collector_sees_all_text(self):
+        markdown = "\n\n".join([
+            "# The **Title**",
+            "Some [linked text](/url) and ![alt words](/image.png)",
+            "```\ncode block\n```",
+            "- listed item",
+        ])
+        collector = TermCollector()
+        _, title = parse_markdown(markdown, collector)
+        self.assertEqual(title, "The **Title**")
+        self.assertEqual(collector.terms, {
+            "the", "title", "some", "linked", "text", "and", "alt", "words",
+            "code", "block", "listed", "item",
+        })
+
+        # split like file_lines, so every block is streamed on its own
+        streamed = TermCollector()
+        html = "".join(iter_markdown_html(markdown.split("\n"), streamed))
+        self.assertEqual(html, markdown_to_html_node(markdown).to_html())
+        self.assertEqual(streamed.terms, collector.terms)
+
+    def test_page_path(self):
+        self.assertEqual(page_path("docs/index.html", "docs"), "")
+        self.assertEqual(page_path("docs/blog/tom/index.html", "docs"), "blog/tom/")
+        self.assertEqual(page_path("docs/about.html", "docs"), "about.html")
+
+    def test_write_shards(self):
+        index = SearchIndex()
+        index.update("blog/", "Blog", {"tolkien", "tom"})
+        index.update("", "Home", {"tolkien", "elves"})
+        index.write_shards(self.out_dir, "/boots/")
+
+        self.assertEqual(
+            sorted(os.listdir(os.path.join(self.out_dir, "terms"))),
+            ["el.json", "to.json"],
+        )
+        self.assertEqual(
+            self.read_json("terms", "to.json"), {"tolkien": [0, 1], "tom": [0]})
+        self.assertEqual(self.read_json("pages.json"), {
+            "basepath": "/boots/",
+            "prefix_length": 2,
+            "pages": {"0": ["blog/", "Blog"], "1": ["", "Home"]},
+        })
+
+    def test_incremental_update(self):
+        index = SearchIndex()
+        index.update("a/", "A", {"tolkien", "elves"})
+        index.update("b/", "B", {"tolkien"})
+        index.write_shards(self.out_dir)
+        elves_path = os.path.join(self.out_dir, "terms", "el.json")
+        mtime = os.stat(elves_path).st_mtime_ns
+
+        index.update("b/", "B", {"tolkien", "tom"})
+        self.assertEqual(index.dirty, {"to"})
+        index.write_shards(self.out_dir)
+        self.assertEqual(os.stat(elves_path).st_mtime_ns, mtime)
+        self.assertEqual(
+            self.read_json("terms", "to.json"), {"tolkien": [0, 1], "tom": [1]})
+
+        index.remove("a/")
+        index.write_shards(self.out_dir)
+        self.assertFalse(os.path.exists(elves_path))
+        self.assertEqual(
+            self.read_json("terms", "to.json"), {"tolkien": [1], "tom": [1]})
+        self.assertEqual(self.read_json("pages.json")["pages"], {"1": ["b/", "B"]})
+
+    def test_unchanged_page_is_not_dirty(self):
+        index = SearchIndex()
+        index.update("a/", "A", {"tolkien"})
+        index.write_shards(self.out_dir)
+        index.update("a/", "A", {"tolkien"})
+        self.assertEqual(index.dirty, set())
+        self.assertFalse(index.pages_dirty)
+
+    def test_save_and_load(self):
+        index = SearchIndex()
+        index.update("a/", "A", {"tolkien", "elves"})
+        index.remove("a/")
+        index.update("b/", "B", {"tolkien"})
+        path = os.path.join(self.dir, "search.json")
+        index.save(path)
+
+        loaded = load_index(path)
+        self.assertIn("b/", loaded)
+        self.assertNotIn("a/", loaded)
+        self.assertEqual(loaded.postings, {"tolkien": {1}})
+        loaded.update("c/", "C", {"tolkien"})
+        self.assertEqual(loaded.state["pages"]["c/"]["id"], 2)
+
+    def test_full_write_removes_stale_shards(self):
+        stale_path = os.path.join(self.out_dir, "terms", "zz.json")
+        os.makedirs(os.path.dirname(stale_path))
+        with open(stale_path, "w") as file:
+            file.write("{}")
+        index = SearchIndex()
+        index.update("a/", "A", {"tolkien"})
+        index.write_shards(self.out_dir, full=True)
+        self.assertEqual(
+            os.listdir(os.path.join(self.out_dir, "terms")), ["to.json"])
+
+    def test_removed_shards_take_their_sidecars(self):
+        index = SearchIndex()
+        index.update("a/", "A", {"tolkien", "elves"})
+        index.write_shards(self.out_dir)
+        terms_dir = os.path.join(self.out_dir, "terms")
+        for file_name in ["el.json.gz", "el.json.br", "zz.json.gz"]:
+            with open(os.path.join(terms_dir, file_name), "wb") as file:
+                file.write(b"")
+
+        index.update("a/", "A", {"tolkien"})
+        index.write_shards(self.out_dir)
+        self.assertEqual(
+            sorted(os.listdir(terms_dir)), ["to.json", "zz.json.gz"])
+        # a full write also finds shards that only a sidecar is left of
+        index.write_shards(self.out_dir, full=True)
+        self.assertEqual(os.listdir(terms_dir), ["to.json"])
+
+    def test_load_missing_index(self):
+        index = load_index(os.path.join(self.dir, "missing.json"))
+        self.assertEqual(index.state["pages"], {})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,90 @@
+import argparse
+import os
+import unittest
+
+from manifest import new_manifest
+from shard import merge_manifests, parse_shard, select_shard, shard_of
+
+PAGES = [
+    (f"./content/blog/post{index}/index.md",
+     f"./docs/blog/post{index}/index.html")
+    for index in range(40)
+]
+
+
+def shard_manifest(index, count, pages):
+    manifest = new_manifest("abc", "/")
+    manifest["shard"] = [index, count]
+    manifest["static"] = ["index.css"]
+    for src_path, dest_path in pages:
+        manifest["pages"][src_path] = {"dest": dest_path}
+    return manifest
+
+
+class TestShard(unittest.TestCase):
+
+    def test_parse_shard(self):
+        self.assertEqual(parse_shard("2/4"), (2, 4))
+        for text in ("0/4", "5/4", "1/0", "2", "a/b", "1/2/3"):
+            with self.assertRaises(argparse.ArgumentTypeError):
+                parse_shard(text)
+
+    def test_shard_of_is_stable(self):
+        # the same relative path lands in the same shard wherever the
+        # content directory is
+        self.assertEqual(
+            shard_of("./content/blog/a.md", "./content", 7),
+            shard_of(os.path.join("/srv", "site", "content", "blog", "a.md"),
+                     "/srv/site/content", 7),
+        )
+        self.assertEqual(shard_of("./content/index.md", "./content", 1), 1)
+
+    def test_select_shard_partitions_pages(self):
+        shards = [list(select_shard(PAGES, "./content", index, 4))
+                  for index in range(1, 5)]
+        self.assertEqual(sorted(page for shard in shards for page in shard),
+                         sorted(PAGES))
+        self.assertTrue(all(shards))
+
+    def test_merge(self):
+        manifests = [
+            shard_manifest(index, 3, select_shard(PAGES, "./content", index, 3))
+            for index in range(1, 4)
+        ]
+        merged, problems = merge_manifests(manifests, PAGES)
+        self.assertEqual(problems, [])
+        self.assertEqual(sorted(merged["pages"]), sorted(src for src, _ in PAGES))
+        self.assertEqual(merged["static"], ["index.css"])
+        self.assertNotIn("shard", merged)
+
+    def test_merge_problems(self):
+        manifests = [
+            shard_manifest(1, 3, PAGES[:10]),
+            shard_manifest(2, 3, PAGES[5:20]),
+            shard_manifest(2, 4, [("./content/gone.md", "./docs/gone.html")]),
+        ]
+        _, problems = merge_manifests(manifests, PAGES)
+        self.assertIn("shard 2/4 is not one of 3 shards", problems)
+        self.assertIn("shard 3/3 is missing", problems)
+        self.assertIn(f"{PAGES[30][0]} was not built by any shard", problems)
+        self.assertIn(f"{PAGES[7][0]} was built by shards 1, 2", problems)
+        self.assertIn(
+            "./content/gone.md was built but is not in the content", problems)
+
+    def test_merge_different_filters(self):
+        manifests = [
+            shard_manifest(index, 2, select_shard(PAGES, "./content", index, 2))
+            for index in (1, 2)
+        ]
+        manifests[0]["filter"] = {"include": [], "exclude": ["drafts"]}
+        _, problems = merge_manifests(manifests, PAGES)
+        self.assertEqual(
+            problems, ["shards were built with different --include/--exclude"])
+
+    def test_merge_nothing(self):
+        self.assertEqual(
+            merge_manifests([], PAGES), (None, ["no shard manifests found"]))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,99 @@
+import os
+import tempfile
+import unittest
+
+from sync import list_files, needs_copy, sync_tree
+
+
+class TestSync(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.src = os.path.join(self.tmp.name, "static")
+        self.dst = os.path.join(self.tmp.name, "docs")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def write(self, path, text):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w") as file:
+            file.write(text)
+
+    def read(self, path):
+        with open(path) as file:
+            return file.read()
+
+    def test_list_files(self):
+        self.write(os.path.join(self.src, "b.css"), "b")
+        self.write(os.path.join(self.src, "images", "a.png"), "a")
+        self.assertEqual(
+            list_files(self.src),
+            ["b.css", os.path.join("images", "a.png")],
+        )
+
+    def test_first_sync_copies_everything(self):
+        self.write(os.path.join(self.src, "index.css"), "body {}")
+        self.write(os.path.join(self.src, "images", "a.png"), "png")
+        files, copied, removed = sync_tree(self.src, self.dst)
+        self.assertEqual(len(files), 2)
+        self.assertEqual(len(copied), 2)
+        self.assertEqual(removed, [])
+        self.assertEqual(
+            self.read(os.path.join(self.dst, "images", "a.png")), "png")
+
+    def test_unchanged_files_are_skipped(self):
+        self.write(os.path.join(self.src, "index.css"), "body {}")
+        self.write(os.path.join(self.src, "a.png"), "png")
+        sync_tree(self.src, self.dst)
+
+        self.write(os.path.join(self.src, "index.css"), "body { margin: 0 }")
+        _, copied, _ = sync_tree(self.src, self.dst)
+        self.assertEqual(
+            copied,
+            [(os.path.join(self.src, "index.css"),
+              os.path.join(self.dst, "index.css"))],
+        )
+        self.assertEqual(
+            self.read(os.path.join(self.dst, "index.css")), "body { margin: 0 }")
+
+    def test_copy_removes_sidecars(self):
+        self.write(os.path.join(self.src, "index.css"), "body {}")
+        sync_tree(self.src, self.dst)
+        self.write(os.path.join(self.dst, "index.css.gz"), "old")
+
+        self.write(os.path.join(self.src, "index.css"), "body { margin: 0 }")
+        sync_tree(self.src, self.dst)
+        self.assertEqual(os.listdir(self.dst), ["index.css"])
+
+    def test_checksum_ignores_touched_files(self):
+        src_path = os.path.join(self.src, "index.css")
+        dst_path = os.path.join(self.dst, "index.css")
+        self.write(src_path, "body {}")
+        sync_tree(self.src, self.dst)
+
+        os.utime(src_path, ns=(0, 0))
+        self.assertTrue(needs_copy(src_path, dst_path))
+        self.assertFalse(needs_copy(src_path, dst_path, checksum=True))
+        self.assertFalse(needs_copy(src_path, dst_path))
+
+    def test_removed_files(self):
+        self.write(os.path.join(self.src, "a.png"), "a")
+        self.write(os.path.join(self.src, "b.png"), "b")
+        files, _, _ = sync_tree(self.src, self.dst)
+
+        os.remove(os.path.join(self.src, "b.png"))
+        _, copied, removed = sync_tree(self.src, self.dst, files)
+        self.assertEqual(copied, [])
+        self.assertEqual(removed, [os.path.join(self.dst, "b.png")])
+
+    def test_hardlink(self):
+        src_path = os.path.join(self.src, "a.png")
+        self.write(src_path, "a")
+        sync_tree(self.src, self.dst, link=True)
+        self.assertTrue(
+            os.path.samefile(src_path, os.path.join(self.dst, "a.png")))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,189 @@
+import io
+import os
+import tempfile
+import unittest
+
+from template import (
+    compile_template,
+    load_template,
+    rewrite_urls,
+    find_layout,
+)
+
+
+class TestTemplate(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.dir = self.tmp.name
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def write(self, name, text):
+        path = os.path.join(self.dir, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w") as file:
+            file.write(text)
+        return path
+
+    def test_render(self):
+        path = self.write(
+            "template.html",
+            "<title>{{ Title }}</title><article>{{ Content }}</article>",
+        )
+        template = compile_template(path)
+        self.assertEqual(
+            template.render({"Title": "Hi", "Content": "<p>text</p>"}),
+            "<title>Hi</title><article><p>text</p></article>",
+        )
+
+    def test_write_to(self):
+        path = self.write(
+            "template.html",
+            "<title>{{ Title }}</title><article>{{ Content }}</article>",
+        )
+        template = compile_template(path)
+        file = io.StringIO()
+        template.write_to(file, {
+            "Title": "Hi",
+            "Content": iter(["<p>", "text", "</p>"]),
+        })
+        self.assertEqual(
+            file.getvalue(),
+            "<title>Hi</title><article><p>text</p></article>",
+        )
+
+    def test_segments(self):
+        path = self.write("template.html", "a{{ Title }}b{{ Content }}")
+        template = compile_template(path)
+        self.assertEqual(template.parts, ["a", "{{ Title }}", "b", "{{ Content }}"])
+        self.assertEqual(
+            template.slots,
+            [(1, "Title", "{{ Title }}"), (3, "Content", "{{ Content }}")],
+        )
+
+    def test_unknown_placeholder_is_kept(self):
+        path = self.write("template.html", "{{ Title }} {{ Other }}")
+        template = compile_template(path)
+        self.assertEqual(template.render({"Title": "Hi"}), "Hi {{ Other }}")
+
+    def test_basepath(self):
+        path = self.write(
+            "template.html",
+            '<link href="/index.css" /><img src="/a.png" />{{ Content }}',
+        )
+        template = compile_template(path, "/boots/")
+        self.assertEqual(
+            template.render({"Content": "x"}),
+            '<link href="/boots/index.css" /><img src="/boots/a.png" />x',
+        )
+
+    def test_include(self):
+        self.write("partials/head.html", "<head>{{ Title }}</head>")
+        path = self.write(
+            "template.html",
+            "<html>{{ include partials/head.html }}<body>{{ Content }}</body></html>",
+        )
+        template = compile_template(path)
+        self.assertEqual(
+            template.render({"Title": "Hi", "Content": "text"}),
+            "<html><head>Hi</head><body>text</body></html>",
+        )
+        self.assertEqual(len(template.dependencies), 2)
+
+    def test_include_cycle(self):
+        path = self.write("template.html", "{{ include template.html }}")
+        self.assertRaises(ValueError, compile_template, path)
+
+    def test_load_template_cache(self):
+        path = self.write("template.html", "{{ Content }}")
+        template = load_template(path)
+        self.assertIs(template, load_template(path))
+        self.assertIsNot(template, load_template(path, "/boots/"))
+
+        self.write("template.html", "<p>{{ Content }}</p>")
+        os.utime(path, ns=(0, 0))
+        template = load_template(path)
+        self.assertEqual(template.render({"Content": "x"}), "<p>x</p>")
+
+    def test_minify(self):
+        path = self.write(
+            "template.html",
+            "\n<html>\n  <head>\n    <title>{{ Title }}</title>\n  </head>\n\n"
+            "  <body>\n    <p>a   b</p>\n    <pre>  {{ Code }}\n  </pre>\n"
+            "    <article>{{ Content }}</article>\n  </body>\n</html>\n",
+        )
+        template = compile_template(path, minify=True)
+        values = {
+            "Title": "Hi  there",
+            "Code": "x\n  y",
+            "Content": ["<p>one\n", "two</p>", "<pre>", "  keep\n  this", "</pre>"],
+        }
+        expected = (
+            "<html><head><title>Hi there</title></head><body><p>a b</p>"
+            "<pre>  x\n  y\n  </pre><article><p>one two</p>"
+            "<pre>  keep\n  this</pre></article></body></html>"
+        )
+        file = io.StringIO()
+        template.write_to(file, values)
+        self.assertEqual(file.getvalue(), expected)
+        values["Content"] = "".join(values["Content"])
+        self.assertEqual(template.render(values), expected)
+
+        self.assertIsNot(template, load_template(path))
+        self.assertIs(load_template(path, minify=True), load_template(path, "/", True))
+
+    def test_critical_stylesheet(self):
+        path = self.write(
+            "template.html",
+            '<html><head><link href="https://example.com/a.css" rel="stylesheet" />'
+            '<link href="/index.css" rel="stylesheet" /></head>'
+            "<body>{{ Content }}</body></html>",
+        )
+        template = compile_template(path, "/boots/", critical=True)
+        self.assertEqual(template.stylesheet, "/index.css")
+        self.assertEqual(template.tags, {"html", "head", "link", "body"})
+        self.assertEqual(
+            template.render({"Content": "x", "Stylesheet": "<style></style>"}),
+            '<html><head><link href="https://example.com/a.css" rel="stylesheet" />'
+            "<style></style></head><body>x</body></html>",
+        )
+        self.assertIn(
+            '<link href="/boots/index.css" rel="stylesheet" />',
+            template.render({"Content": "x"}),
+        )
+        self.assertIsNone(compile_template(path).stylesheet)
+
+    def test_rewrite_urls(self):
+        html = '<a href="/blog">x</a><img src="/a.png" alt="" />'
+        self.assertEqual(rewrite_urls(html, "/"), html)
+        self.assertEqual(
+            rewrite_urls(html, "https://example.com/"),
+            '<a href="https://example.com/blog">x</a><img src="https://example.com/a.png" alt="" />',
+        )
+
+    def test_find_layout(self):
+        content = os.path.join(self.dir, "content")
+        layouts = os.path.join(self.dir, "layouts")
+        layout = self.write("layouts/blog.html", "{{ Content }}")
+
+        self.assertEqual(
+            find_layout(os.path.join(content, "blog", "tom", "index.md"),
+                        content, layouts, "template.html"),
+            layout,
+        )
+        self.assertEqual(
+            find_layout(os.path.join(content, "contact", "index.md"),
+                        content, layouts, "template.html"),
+            "template.html",
+        )
+        self.assertEqual(
+            find_layout(os.path.join(content, "index.md"),
+                        content, layouts, "template.html"),
+            "template.html",
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,69 @@
+import os
+import sys
+import tempfile
+import threading
+import unittest
+
+from watch import PollingWatcher, InotifyWatcher, take_snapshot
+
+
+class TestWatch(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.content = os.path.join(self.tmp.name, "content")
+        self.template = os.path.join(self.tmp.name, "template.html")
+        self.write(os.path.join(self.content, "index.md"), "# Home")
+        self.write(self.template, "{{ Content }}")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def write(self, path, text):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w") as file:
+            file.write(text)
+
+    def wait_for(self, watcher, change):
+        # make the change once the watcher is waiting
+        timer = threading.Timer(0.05, change)
+        timer.start()
+        try:
+            return watcher.wait()
+        finally:
+            timer.join()
+
+    def test_take_snapshot(self):
+        snapshot = take_snapshot([self.content, self.template])
+        self.assertEqual(
+            sorted(snapshot),
+            [os.path.join(self.content, "index.md"), self.template],
+        )
+
+    def test_polling_watcher(self):
+        watcher = PollingWatcher([self.content, self.template], 0.01)
+        path = os.path.join(self.content, "blog", "post.md")
+        changes = self.wait_for(watcher, lambda: self.write(path, "# Post"))
+        self.assertEqual(changes.paths, {path})
+
+        changes = self.wait_for(watcher, lambda: os.remove(path))
+        self.assertEqual(changes.paths, {path})
+
+    @unittest.skipUnless(sys.platform.startswith("linux"), "inotify is Linux only")
+    def test_inotify_watcher(self):
+        watcher = InotifyWatcher([self.content, self.template])
+        try:
+            changes = self.wait_for(
+                watcher, lambda: self.write(self.template, "<p>{{ Content }}</p>"))
+            self.assertEqual(changes.paths, {self.template})
+
+            path = os.path.join(self.content, "blog", "post.md")
+            changes = self.wait_for(watcher, lambda: self.write(path, "# Post"))
+            self.assertIn(path, changes.paths)
+            self.assertIn(os.path.dirname(path), changes.paths)
+        finally:
+            watcher.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,193 @@
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import sys
+import time
+
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ISDIR = 0x40000000
+
+WATCH_MASK = (
+    IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO
+    | IN_CREATE | IN_DELETE | IN_DELETE_SELF | IN_MOVE_SELF
+)
+EVENT_HEADER = struct.Struct("iIII")
+
+
+class Changes:
+
+    def __init__(self, paths=None, rescan=None):
+        # paths are files or directories that changed, were created or were
+        # removed; rescan holds roots whose changes could not be tracked file
+        # by file (a moved directory, a queue overflow)
+        self.paths = set() if paths is None else paths
+        self.rescan = set() if rescan is None else rescan
+
+    def __bool__(self):
+        return bool(self.paths or self.rescan)
+
+    def __repr__(self):
+        return f"Changes({sorted(self.paths)}, rescan: {sorted(self.rescan)})"
+
+
+class PollingWatcher:
+
+    def __init__(self, roots, interval=0.05):
+        self.roots = roots
+        self.interval = interval
+        self.snapshot = take_snapshot(roots)
+
+    def wait(self):
+        while True:
+            time.sleep(self.interval)
+            snapshot = take_snapshot(self.roots)
+            paths = set()
+            for path, stat in snapshot.items():
+                if self.snapshot.get(path) != stat:
+                    paths.add(path)
+            for path in self.snapshot:
+                if path not in snapshot:
+                    paths.add(path)
+            self.snapshot = snapshot
+            if paths:
+                return Changes(paths)
+
+    def close(self):
+        pass
+
+
+class InotifyWatcher:
+
+    def __init__(self, roots, debounce=0.01):
+        self.roots = roots
+        self.debounce = debounce
+        self.libc = ctypes.CDLL(
+            ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        self.fd = self.libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self.dirs = {}
+
+        # the parents of the roots are watched without recursion so a root
+        # that is created, replaced or renamed later is still noticed
+        for parent in sorted(set(root_parent(root) for root in roots)):
+            self.add_watch(parent)
+        for root in roots:
+            if os.path.isdir(root):
+                self.add_tree(root)
+
+    def add_watch(self, dir_path):
+        wd = self.libc.inotify_add_watch(
+            self.fd, os.fsencode(dir_path), WATCH_MASK)
+        if wd < 0:
+            return
+        self.dirs[wd] = dir_path
+
+    def add_tree(self, root):
+        for dir_path, _, _ in os.walk(root):
+            self.add_watch(dir_path)
+
+    def wait(self):
+        changes = Changes()
+        select.select([self.fd], [], [])
+        while True:
+            self.read_events(changes)
+            # editors tend to write a file in several steps, so keep reading
+            # until the events stop for a moment
+            ready, _, _ = select.select([self.fd], [], [], self.debounce)
+            if not ready:
+                if changes:
+                    return changes
+                select.select([self.fd], [], [])
+
+    def read_events(self, changes):
+        try:
+            data = os.read(self.fd, 1 << 16)
+        except BlockingIOError:
+            return
+
+        offset = 0
+        while offset < len(data):
+            wd, mask, _, length = EVENT_HEADER.unpack_from(data, offset)
+            offset += EVENT_HEADER.size
+            name = os.fsdecode(data[offset:offset + length].rstrip(b"\0"))
+            offset += length
+
+            if mask & IN_Q_OVERFLOW:
+                changes.rescan.update(self.roots)
+                continue
+            if mask & IN_IGNORED:
+                self.dirs.pop(wd, None)
+                continue
+
+            dir_path = self.dirs.get(wd)
+            if dir_path is None or name == "":
+                continue
+            path = os.path.normpath(os.path.join(dir_path, name))
+            root = self.find_root(path)
+            if root is None:
+                continue
+
+            changes.paths.add(path)
+            if mask & IN_ISDIR:
+                if mask & (IN_CREATE | IN_MOVED_TO) and os.path.isdir(path):
+                    # files written before the new watch existed sent no
+                    # events, so report everything already inside
+                    self.add_tree(path)
+                    changes.paths.update(take_snapshot([path]))
+                if mask & (IN_MOVED_FROM | IN_MOVED_TO):
+                    changes.rescan.add(root)
+
+    def find_root(self, path):
+        for root in self.roots:
+            if path == root or path.startswith(root + os.sep):
+                return root
+        return None
+
+    def close(self):
+        os.close(self.fd)
+
+
+def root_parent(root):
+    return os.path.dirname(root) or "."
+
+
+def take_snapshot(roots):
+    snapshot = {}
+    for root in roots:
+        if os.path.isfile(root):
+            stat = os.stat(root)
+            snapshot[root] = (stat.st_mtime_ns, stat.st_size)
+            continue
+
+        for dir_path, _, file_names in os.walk(root):
+            for file_name in file_names:
+                path = os.path.join(dir_path, file_name)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                snapshot[path] = (stat.st_mtime_ns, stat.st_size)
+    return snapshot
+
+
+def create_watcher(roots, interval=0.05):
+    roots = [os.path.normpath(root) for root in roots]
+    if sys.platform.startswith("linux"):
+        try:
+            return InotifyWatcher(roots)
+        except (OSError, AttributeError):
+            pass
+    return PollingWatcher(roots, interval)